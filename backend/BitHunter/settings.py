@@ -169,6 +169,41 @@ CHANNEL_LAYERS = {
 # Celery: Аналогично, configurable
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://127.0.0.1:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://127.0.0.1:6379/0")
+# Очереди по ролям воркеров: ML-стек (TensorFlow, torch, SB3) загружается только
+# воркерами очередей ml и inference; воркеры default, alerts и news его не импортируют
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "analytics.tasks.train_ml_model": {"queue": "ml"},
+    "analytics.tasks.train_multi_symbol": {"queue": "ml"},
+    "analytics.tasks.train_lstm_model": {"queue": "ml"},
+    "analytics.tasks.resume_training_job": {"queue": "ml"},
+    "analytics.tasks.update_model_from_replay": {"queue": "ml"},
+    "analytics.tasks.sweep_env_parameters": {"queue": "ml"},
+    "analytics.tasks.walk_forward_backtest": {"queue": "ml"},
+    "analytics.tasks.predict_price": {"queue": "inference"},
+    "analytics.tasks.predict_next_prices": {"queue": "inference"},
+    "trading.tasks.run_bot": {"queue": "inference"},
+    "trading.tasks.tick_strategies": {"queue": "inference"},
+    "alerts.tasks.*": {"queue": "alerts"},
+    "news.tasks.*": {"queue": "news"},
+}
+# Пакетный тик всех активных стратегий (trading.tasks.tick_strategies), секунды
+STRATEGY_TICK_INTERVAL = float(os.getenv("STRATEGY_TICK_INTERVAL", 60))
+CELERY_BEAT_SCHEDULE = {
+    "tick-strategies": {
+        "task": "trading.tasks.tick_strategies",
+        "schedule": STRATEGY_TICK_INTERVAL,
+    },
+    # Обновление по интервалу, если порог REPLAY_MIN_NEW не набрался
+    "update-model-from-replay": {
+        "task": "analytics.tasks.update_model_from_replay",
+        "schedule": float(os.getenv("REPLAY_UPDATE_INTERVAL", 900)),
+    },
+    "sync-ohlcv": {
+        "task": "analytics.tasks.fetch_historical_data",
+        "schedule": float(os.getenv("OHLCV_SYNC_INTERVAL", 300)),
+    },
+}
 
 # Cache: Configurable
 CACHES = {
@@ -235,5 +270,76 @@ if not DEBUG:
 
 DEMO_MODE = os.getenv("DEMO_MODE", "True").lower() == "true"
 
+# RL: количество параллельных эпизодов в VecTradingEnv при обучении PPO
+RL_NUM_ENVS = int(os.getenv("RL_NUM_ENVS", 8))
+# Длина эпизода обучения в шагах (0 — весь ряд) и выбор старта: random | stratified
+RL_EPISODE_LENGTH = int(os.getenv("RL_EPISODE_LENGTH", 0))
+RL_EPISODE_START = os.getenv("RL_EPISODE_START", "stratified")
+# Параллельное обучение на нескольких символах (analytics.parallel_training):
+# процессы сред, ядра для них в формате taskset ('0-15'), потоки PyTorch и старт процессов
+RL_TRAIN_WORKERS = int(os.getenv("RL_TRAIN_WORKERS", 0)) or os.cpu_count()
+RL_CPU_AFFINITY = os.getenv("RL_CPU_AFFINITY", "")
+RL_TORCH_THREADS = int(os.getenv("RL_TORCH_THREADS", 0))
+RL_START_METHOD = os.getenv("RL_START_METHOD", "fork")
+
+# Колоночное on-disk хранилище OHLCV (открывается через np.memmap)
+MARKET_DATA_DIR = os.getenv("MARKET_DATA_DIR", os.path.join(BASE_DIR, "market_data"))
+# Сжатые дописываемые снимки признаков для обучения (analytics.feature_cache)
+FEATURE_CACHE_DIR = os.getenv(
+    "FEATURE_CACHE_DIR", os.path.join(BASE_DIR, "market_data", "features")
+)
+# Инкрементальная синхронизация OHLCV (analytics.ohlcv_sync): размер страницы
+# запроса и глубина первой загрузки нового ряда в свечах
+OHLCV_SYNC_PAGE_LIMIT = int(os.getenv("OHLCV_SYNC_PAGE_LIMIT", 1000))
+OHLCV_SYNC_INITIAL_CANDLES = int(os.getenv("OHLCV_SYNC_INITIAL_CANDLES", 1000))
+# Пул клиентов ccxt (analytics.exchange_pool): время жизни неиспользуемого
+# клиента и общих метаданных рынков, секунды
+EXCHANGE_POOL_TTL = int(os.getenv("EXCHANGE_POOL_TTL", 600))
+# Асинхронная загрузка рыночных данных (analytics.async_fetcher): одновременных
+# запросов на биржу (поверх ограничителя частоты ccxt)
+MARKET_FETCH_CONCURRENCY = int(os.getenv("MARKET_FETCH_CONCURRENCY", 20))
+# Поток цен (manage.py run_price_ingestor, analytics.price_stream): Redis, период
+# опроса тикеров (секунды), длина буфера тиков на символ и возраст, после
+# которого цена считается устаревшей и догружается с биржи (секунды)
+PRICE_STREAM_REDIS_URL = os.getenv("PRICE_STREAM_REDIS_URL", "redis://127.0.0.1:6379/2")
+PRICE_STREAM_INTERVAL = float(os.getenv("PRICE_STREAM_INTERVAL", 2))
+PRICE_STREAM_BUFFER = int(os.getenv("PRICE_STREAM_BUFFER", 500))
+PRICE_STREAM_MAX_AGE = float(os.getenv("PRICE_STREAM_MAX_AGE", 30))
+
+# Реестр версий моделей: директория, размер LRU загруженных моделей на процесс
+# и минимальный интервал проверки новой версии (секунды)
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR", os.path.join(BASE_DIR, "models", "registry")
+)
+MODEL_REGISTRY_MAX_MODELS = int(os.getenv("MODEL_REGISTRY_MAX_MODELS", 32))
+MODEL_REGISTRY_CHECK_INTERVAL = float(os.getenv("MODEL_REGISTRY_CHECK_INTERVAL", 5))
+
+# Возобновляемые задачи обучения (analytics.training_jobs): директория записей
+# и чекпоинтов, период чекпоинта PPO в шагах среды (LSTM — после каждой эпохи)
+TRAINING_JOBS_DIR = os.getenv(
+    "TRAINING_JOBS_DIR", os.path.join(BASE_DIR, "models", "jobs")
+)
+TRAINING_CHECKPOINT_INTERVAL = int(os.getenv("TRAINING_CHECKPOINT_INTERVAL", 10000))
+
+# Сервис пакетного инференса (manage.py run_inference_server): транспорт Redis,
+# окно сбора батча, максимальный размер батча и таймаут ожидания ответа клиентом
+INFERENCE_REDIS_URL = os.getenv("INFERENCE_REDIS_URL", "redis://127.0.0.1:6379/2")
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", 5))
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 256))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 2))
+# Локальный predict при недоступном сервисе инференса (грузит SB3/torch в процесс):
+# включать только в окружении Celery-воркеров, не в веб-процессе
+INFERENCE_LOCAL_FALLBACK = os.getenv("INFERENCE_LOCAL_FALLBACK", "False").lower() == "true"
+
+# Буфер опыта сделок и объединённое дообучение PPO (analytics.replay_buffer):
+# обновление после REPLAY_MIN_NEW новых записей или раз в REPLAY_UPDATE_INTERVAL секунд
+REPLAY_REDIS_URL = os.getenv("REPLAY_REDIS_URL", "redis://127.0.0.1:6379/2")
+REPLAY_MAX_SIZE = int(os.getenv("REPLAY_MAX_SIZE", 100000))
+REPLAY_MIN_NEW = int(os.getenv("REPLAY_MIN_NEW", 256))
+REPLAY_UPDATE_INTERVAL = float(os.getenv("REPLAY_UPDATE_INTERVAL", 900))
+REPLAY_SAMPLE_SIZE = int(os.getenv("REPLAY_SAMPLE_SIZE", 4096))
+REPLAY_LEARN_TIMESTEPS = int(os.getenv("REPLAY_LEARN_TIMESTEPS", 2048))
+REPLAY_LOCK_TIMEOUT = int(os.getenv("REPLAY_LOCK_TIMEOUT", 1800))
+
 SECURE_SSL_REDIRECT = True
 SECURE_HSTS_SECONDS = 31536000
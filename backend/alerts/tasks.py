@@ -1,4 +1,3 @@
-import ccxt
 import requests
 from celery import shared_task
 from django.conf import settings
@@ -15,10 +14,16 @@ def check_alerts():
 
     Получает активные правила оповещений, проверяет условия на основе текущих цен
     и создает уведомления при срабатывании правил.
+
+    Цены всех символов правил читаются одним запросом из потока цен
+    (analytics.price_stream), а не запросом к бирже на правило.
     """
-    alert_rules = AlertRule.objects.filter(is_active=True).select_related("user")
+    from analytics.price_stream import latest_prices
+
+    alert_rules = list(AlertRule.objects.filter(is_active=True).select_related("user"))
+    prices = latest_prices({("binance", rule.symbol) for rule in alert_rules})
     for rule in alert_rules:
-        price = get_current_price(rule.symbol)
+        price = prices.get(("binance", rule.symbol))
         if price is None:
             continue
         triggered = False
@@ -90,16 +95,19 @@ def get_current_price(symbol):
     """
     Получает текущую цену криптовалютной пары с Binance.
 
+    Цена читается из потока цен (analytics.price_stream); с биржи она
+    запрашивается, только если в потоке нет свежей цены.
+
     Args:
         symbol (str): Символ криптовалютной пары (например, 'BTC/USDT').
 
     Returns:
         float or None: Текущая цена или None в случае ошибки.
     """
+    from analytics.price_stream import current_price
+
     try:
-        exchange = ccxt.binance()
-        ticker = exchange.fetch_ticker(symbol)
-        return ticker["last"]
+        return current_price(symbol)
     except Exception as e:
         print(f"Error fetching price for {symbol}: {e}")
         return None
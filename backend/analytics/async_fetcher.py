@@ -0,0 +1,235 @@
+"""
+Модуль асинхронной загрузки рыночных данных на ccxt.async_support.
+
+Запросы по всем символам идут параллельно в одном цикле asyncio: время
+обновления набора рядов определяется самым долгим рядом, а не суммой
+запросов. Для каждой биржи создаётся один асинхронный клиент с
+enableRateLimit — его ограничитель частоты общий для всех корутин биржи,
+поэтому лимиты биржи соблюдаются; число одновременных запросов к бирже
+дополнительно ограничено семафором (settings.MARKET_FETCH_CONCURRENCY).
+Биржи обрабатываются независимо и параллельно друг другу.
+
+Результаты записываются после завершения цикла, синхронно и пакетно:
+новые свечи ряда — одной записью в MarketDataset и одним upsert в Candle.
+Поэтому ORM не вызывается из асинхронного контекста.
+
+Асинхронные клиенты привязаны к циклу событий и закрываются в конце
+запуска; пул синхронных клиентов (analytics.exchange_pool) здесь не нужен.
+
+Точки входа для Celery-задач — синхронные sync_series_concurrently()
+и fetch_prices().
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .market_dataset import MarketDataset
+from .ohlcv_sync import (
+    closed_candles,
+    is_last_page,
+    store_candles,
+    sync_since,
+    timeframe_ms,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_since_async(client, symbol, timeframe, since, page_limit, now_ms, limiter):
+    """
+    Свечи с since по текущее время, постранично.
+
+    :param client: Асинхронный экземпляр ccxt-биржи
+    :param symbol: Символ актива
+    :param timeframe: Временной интервал
+    :param since: Начало, timestamp в мс
+    :param page_limit: Размер страницы
+    :param now_ms: Текущее время, мс (незакрытая свеча отбрасывается)
+    :param limiter: asyncio.Semaphore биржи
+    :return: Массив float64 (T, 6) закрытых свечей
+    """
+    step = timeframe_ms(timeframe)
+    pages = []
+    cursor = since
+    while cursor + step <= now_ms:
+        async with limiter:
+            page = await client.fetch_ohlcv(
+                symbol, timeframe=timeframe, since=cursor, limit=page_limit
+            )
+        if not page:
+            break
+        page = np.asarray(page, dtype=np.float64)
+        pages.append(page)
+        last_ts = int(page[-1, 0])
+        if is_last_page(last_ts, cursor, step, now_ms):
+            break
+        cursor = last_ts + 1
+    return closed_candles(pages, step, now_ms)
+
+
+def _group_by_exchange(pairs):
+    by_exchange = defaultdict(set)
+    for exchange, symbol in pairs:
+        by_exchange[exchange].add(symbol)
+    return by_exchange
+
+
+async def _run_per_exchange(by_exchange, concurrency, fetch_exchange):
+    """
+    Запустить fetch_exchange(exchange, client, symbols, limiter) по всем биржам параллельно.
+
+    На биржу — один асинхронный клиент и один семафор; ошибка биржи
+    становится результатом всех её символов.
+
+    :return: Словарь {(биржа, символ): результат или исключение}
+    """
+    import ccxt.async_support as ccxt_async
+
+    async def run_exchange(exchange, symbols):
+        try:
+            client = getattr(ccxt_async, exchange)({"enableRateLimit": True})
+        except AttributeError:
+            error = ValueError(f"unknown exchange {exchange}")
+            return {(exchange, symbol): error for symbol in symbols}
+        try:
+            return await fetch_exchange(
+                exchange, client, sorted(symbols), asyncio.Semaphore(concurrency)
+            )
+        except Exception as e:
+            return {(exchange, symbol): e for symbol in symbols}
+        finally:
+            await client.close()
+
+    results = await asyncio.gather(
+        *(run_exchange(exchange, symbols) for exchange, symbols in by_exchange.items())
+    )
+    return {key: value for result in results for key, value in result.items()}
+
+
+def _concurrency(concurrency):
+    return concurrency or getattr(settings, "MARKET_FETCH_CONCURRENCY", 20)
+
+
+def sync_series_concurrently(
+    series, timeframe="1h", page_limit=None, initial_candles=None, concurrency=None
+):
+    """
+    Догнать набор рядов от их высших отметок, запрашивая все ряды параллельно.
+
+    Повторяющиеся (биржа, символ) синхронизируются один раз; ошибка одного
+    ряда не прерывает остальные.
+
+    :param series: Итерируемое пар (биржа, символ)
+    :param timeframe: Временной интервал
+    :param page_limit: Размер страницы (settings.OHLCV_SYNC_PAGE_LIMIT)
+    :param initial_candles: Глубина первой загрузки пустого ряда, свечей
+    :param concurrency: Одновременных запросов на биржу
+        (settings.MARKET_FETCH_CONCURRENCY)
+    :return: Словарь {(биржа, символ): дописано свечей или текст ошибки}
+    """
+    page_limit = page_limit or getattr(settings, "OHLCV_SYNC_PAGE_LIMIT", 1000)
+    now_ms = int(time.time() * 1000)
+    datasets = {
+        (exchange, symbol): MarketDataset(symbol, timeframe, exchange)
+        for exchange, symbol in series
+    }
+    # Отметки читаются до цикла: ряды, которые уже догнаны, не запрашиваются
+    starts = {
+        key: sync_since(dataset, initial_candles, now_ms)
+        for key, dataset in datasets.items()
+    }
+
+    async def fetch_exchange(exchange, client, symbols, limiter):
+        async def fetch_one(symbol):
+            since = starts[(exchange, symbol)]
+            if since is None:
+                return np.empty((0, 6))
+            return await fetch_since_async(
+                client, symbol, timeframe, since, page_limit, now_ms, limiter
+            )
+
+        rows = await asyncio.gather(
+            *(fetch_one(symbol) for symbol in symbols), return_exceptions=True
+        )
+        return {(exchange, symbol): value for symbol, value in zip(symbols, rows)}
+
+    started = time.perf_counter()
+    fetched = asyncio.run(
+        _run_per_exchange(
+            _group_by_exchange(datasets), _concurrency(concurrency), fetch_exchange
+        )
+    )
+    logger.info(
+        f"Fetched {len(fetched)} series concurrently in {time.perf_counter() - started:.2f}s"
+    )
+
+    result = {}
+    for key, rows in fetched.items():
+        exchange, symbol = key
+        if isinstance(rows, BaseException):
+            logger.error(f"OHLCV sync failed for {exchange} {symbol}: {rows}")
+            result[key] = f"Error: {rows}"
+            continue
+        try:
+            dataset = datasets[key]
+            result[key] = dataset.append(rows) if len(rows) else 0
+            store_candles(dataset)
+        except Exception as e:
+            logger.error(f"OHLCV store failed for {exchange} {symbol}: {e}")
+            result[key] = f"Error: {e}"
+    return result
+
+
+def fetch_prices(pairs, concurrency=None):
+    """
+    Последние цены набора символов, все биржи и символы параллельно.
+
+    Биржа с fetchTickers отвечает на все свои символы одним запросом,
+    иначе запросы fetch_ticker идут параллельно.
+
+    :param pairs: Итерируемое пар (биржа, символ)
+    :param concurrency: Одновременных запросов на биржу
+        (settings.MARKET_FETCH_CONCURRENCY)
+    :return: Словарь {(биржа, символ): цена}; символы с ошибкой пропускаются
+    """
+
+    async def fetch_exchange(exchange, client, symbols, limiter):
+        if client.has.get("fetchTickers") and len(symbols) > 1:
+            async with limiter:
+                tickers = await client.fetch_tickers(symbols)
+            return {
+                (exchange, symbol): tickers[symbol]["last"]
+                for symbol in symbols
+                if symbol in tickers
+            }
+
+        async def fetch_one(symbol):
+            async with limiter:
+                return (await client.fetch_ticker(symbol))["last"]
+
+        prices = await asyncio.gather(
+            *(fetch_one(symbol) for symbol in symbols), return_exceptions=True
+        )
+        return {(exchange, symbol): price for symbol, price in zip(symbols, prices)}
+
+    try:
+        fetched = asyncio.run(
+            _run_per_exchange(
+                _group_by_exchange(pairs), _concurrency(concurrency), fetch_exchange
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error fetching prices: {e}")
+        return {}
+    result = {}
+    for (exchange, symbol), price in fetched.items():
+        if isinstance(price, BaseException) or price is None:
+            logger.error(f"Error fetching price for {exchange} {symbol}: {price}")
+            continue
+        result[(exchange, symbol)] = price
+    return result
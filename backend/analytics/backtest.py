@@ -0,0 +1,264 @@
+"""
+Модуль векторизированного backtesting для TradingEnv.
+
+Ядро симулирует ту же логику, что и TradingEnv.step() (стоп-лосс/тейк-профит,
+комиссии, штраф за hold, компонент риска), но сразу для целого массива действий
+или матрицы из N стратегий. Состояние (позиция, цена входа, баланс) хранится
+в массивах размера N, награды и метрики считаются массовыми операциями NumPy.
+
+Замечание: сама смена позиций последовательна во времени (покупка зависит
+от баланса, выход по SL/TP — от цены входа), поэтому цикл идёт по шагам,
+а векторизация — по оси стратегий. Всё остальное (награды, drawdown, Sharpe,
+VaR) считается без Python-циклов в analytics.metrics.
+"""
+
+import logging
+
+import numpy as np
+
+from .metrics import compute_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMISSION_RATE = 0.001
+
+
+def _prepare_actions(actions, num_steps):
+    """
+    Приводит действия к матрице (N, num_steps) так же, как это делает
+    TradingEnv.backtest(): недостающие шаги заполняются hold (0),
+    лишние отбрасываются.
+
+    :param actions: Массив действий (T,) или матрица (N, T)
+    :param num_steps: Количество шагов симуляции
+    :return: Кортеж (матрица действий int8, был ли вход одномерным)
+    """
+    actions = np.asarray(actions)
+    single = actions.ndim == 1
+    actions = np.atleast_2d(actions)
+    if actions.ndim != 2:
+        raise ValueError("actions must be a 1D array or a 2D matrix")
+
+    prepared = np.zeros((actions.shape[0], num_steps), dtype=np.int8)
+    width = min(actions.shape[1], num_steps)
+    prepared[:, :width] = actions[:, :width]
+    return prepared, single
+
+
+def advance_positions(
+    price,
+    buy,
+    sell,
+    position,
+    entry_price,
+    balance,
+    stop_loss,
+    take_profit,
+    commission_rate=DEFAULT_COMMISSION_RATE,
+):
+    """
+    Один шаг смены позиций для N сред: выход по SL/TP, затем buy/sell.
+    Массивы position, entry_price и balance изменяются на месте.
+
+    :param price: Текущая цена (скаляр или массив длины N)
+    :param buy: Маска сред с действием buy
+    :param sell: Маска сред с действием sell
+    :param position: Позиции (-1, 0, 1)
+    :param entry_price: Цены входа (NaN для закрытых позиций)
+    :param balance: Балансы
+    :return: Награды за выход по SL/TP или None, если выходов не было
+    """
+    exit_reward = None
+
+    # Стоп-лосс/тейк-профит перед действием
+    pnl = position * (price - entry_price) / entry_price
+    hit = (pnl <= -stop_loss) | (pnl >= take_profit)
+    if hit.any():
+        exit_reward = np.where(hit, pnl * 100, 0.0)
+        settlement = np.where(
+            position == 1,
+            price * (1 - commission_rate),
+            -(price * (1 + commission_rate)),
+        )
+        np.add(balance, settlement, out=balance, where=hit)
+        position[hit] = 0
+        entry_price[hit] = np.nan
+
+    # Выполнение действий
+    cost = price * (1 + commission_rate)
+    buy = buy & (position != 1) & (balance >= cost)
+    sell = sell & (position != -1)
+    np.subtract(balance, cost, out=balance, where=buy)
+    np.add(balance, price * (1 - commission_rate), out=balance, where=sell)
+    position[buy] = 1
+    position[sell] = -1
+    np.copyto(entry_price, price, where=buy | sell)
+    return exit_reward
+
+
+def simulate_batch(
+    prices,
+    actions,
+    initial_balance=10000,
+    stop_loss=0.05,
+    take_profit=0.10,
+    hold_penalty=0.1,
+    commission_rate=DEFAULT_COMMISSION_RATE,
+):
+    """
+    Симулирует N стратегий на одном ценовом ряду.
+
+    stop_loss, take_profit и hold_penalty могут быть массивами длины N: так одна
+    последовательность действий оценивается сразу на N наборах параметров.
+
+    :param prices: Цены закрытия длиной T + 1 (последняя цена нужна для награды последнего шага)
+    :param actions: Действия (T,) или (N, T): 0=hold, 1=buy, 2=sell
+    :param initial_balance: Начальный баланс
+    :param stop_loss: Процент для стоп-лосс (скаляр или массив длины N)
+    :param take_profit: Процент для тейк-профит (скаляр или массив длины N)
+    :param hold_penalty: Штраф за hold в убыточной позиции (скаляр или массив длины N)
+    :param commission_rate: Комиссия за сделку
+    :return: Словарь с матрицами (N, T): positions, entry_prices, balances, rewards
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_steps = len(prices) - 1
+    if num_steps < 1:
+        raise ValueError("prices must contain at least two values")
+
+    actions, _ = _prepare_actions(actions, num_steps)
+    stop_loss = np.asarray(stop_loss, dtype=np.float64)
+    take_profit = np.asarray(take_profit, dtype=np.float64)
+    hold_penalty = np.asarray(hold_penalty, dtype=np.float64)
+    (num_envs,) = np.broadcast_shapes(
+        (actions.shape[0],), stop_loss.shape, take_profit.shape, hold_penalty.shape
+    )
+
+    # Маски действий в раскладке (T, N), чтобы строка шага была непрерывной
+    buy_mask = np.ascontiguousarray((actions == 1).T)
+    sell_mask = np.ascontiguousarray((actions == 2).T)
+    price_list = prices[:num_steps].tolist()
+
+    position = np.zeros(num_envs)
+    # NaN вместо None: у закрытых позиций pnl = NaN и все сравнения ложны
+    entry_price = np.full(num_envs, np.nan)
+    balance = np.full(num_envs, float(initial_balance))
+
+    positions = np.empty((num_steps, num_envs))
+    entry_prices = np.empty((num_steps, num_envs))
+    balances = np.empty((num_steps, num_envs))
+    exit_rewards = np.zeros((num_steps, num_envs))
+
+    for step, price in enumerate(price_list):
+        exit_reward = advance_positions(
+            price,
+            buy_mask[step],
+            sell_mask[step],
+            position,
+            entry_price,
+            balance,
+            stop_loss,
+            take_profit,
+            commission_rate,
+        )
+        if exit_reward is not None:
+            exit_rewards[step] = exit_reward
+
+        positions[step] = position
+        entry_prices[step] = entry_price
+        balances[step] = balance
+
+    # Награды целиком массивами (порядок операций совпадает со step())
+    current = prices[:num_steps, None]
+    price_change = (prices[1:, None] - current) / current * 100
+    rewards = exit_rewards + positions * price_change
+
+    hold_pnl = positions * (current - entry_prices) / entry_prices
+    hold_losing = (actions.T == 0) & (hold_pnl < 0)
+    rewards = np.where(hold_losing, rewards - hold_penalty, rewards)
+
+    risk_penalty = np.maximum(
+        0, (initial_balance - balances) / initial_balance * 10
+    )
+    rewards = rewards - risk_penalty
+
+    return {
+        "positions": positions.T.astype(np.int8),
+        "entry_prices": entry_prices.T.copy(),
+        "balances": balances.T.copy(),
+        "rewards": rewards.T.copy(),
+    }
+
+
+def backtest_batch(
+    prices,
+    actions,
+    initial_balance=10000,
+    stop_loss=0.05,
+    take_profit=0.10,
+    hold_penalty=0.1,
+    commission_rate=DEFAULT_COMMISSION_RATE,
+):
+    """
+    Векторизированный аналог TradingEnv.backtest() для массива или матрицы действий.
+
+    Для одномерного actions и скалярных параметров возвращает тот же словарь,
+    что и TradingEnv.backtest(). Для матрицы (N, T) или массивов параметров
+    длины N каждое значение словаря — массив длины N.
+
+    :param prices: Цены закрытия длиной T + 1
+    :param actions: Действия (T,) или (N, T)
+    :return: Словарь с метриками (total_reward, win_rate, max_drawdown, final_balance,
+             num_trades, sharpe_ratio, var_95, sortino_ratio, calmar_ratio,
+             max_drawdown_duration, cvar_95, turnover)
+    """
+    _, single = _prepare_actions(actions, 1)
+    single = single and all(
+        np.ndim(param) == 0 for param in (stop_loss, take_profit, hold_penalty)
+    )
+    result = simulate_batch(
+        prices,
+        actions,
+        initial_balance=initial_balance,
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        hold_penalty=hold_penalty,
+        commission_rate=commission_rate,
+    )
+    rewards = result["rewards"]
+    balances = result["balances"]
+
+    # cumsum суммирует последовательно, как sum() в TradingEnv.backtest()
+    total_reward = np.cumsum(rewards, axis=1)[:, -1]
+    num_trades = np.count_nonzero(rewards, axis=1)
+
+    portfolio_values = np.hstack(
+        [np.full((len(balances), 1), float(initial_balance)), balances]
+    )
+    summary = compute_metrics(
+        equity=portfolio_values, positions=result["positions"], pnl=rewards
+    )
+    sharpe_ratio = summary["sharpe_ratio"]
+
+    metrics = {
+        "total_reward": total_reward,
+        "win_rate": summary["win_rate"],
+        "max_drawdown": summary["max_drawdown"],
+        "final_balance": balances[:, -1],
+        "num_trades": num_trades,
+        "sharpe_ratio": sharpe_ratio,
+        "var_95": summary["var"],
+        "sortino_ratio": summary["sortino_ratio"],
+        "calmar_ratio": summary["calmar_ratio"],
+        "max_drawdown_duration": summary["max_drawdown_duration"],
+        "cvar_95": summary["cvar"],
+        "turnover": summary["turnover"],
+    }
+
+    logger.info(
+        f"Vectorized backtest: {len(balances)} strategies x {balances.shape[1]} steps, "
+        f"best Sharpe {np.max(sharpe_ratio):.2f}"
+    )
+
+    if single:
+        return {key: value[0].item() for key, value in metrics.items()}
+    return metrics
@@ -2,8 +2,46 @@ import json
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .price_stream import group_name
 
-class AnalyticsConsumer(AsyncWebsocketConsumer):
+
+class PriceSubscriptionMixin:
+    """
+    Подписка WebSocket-клиента на тики потока цен (analytics.price_stream).
+
+    Сообщение {"type": "subscribe_prices", "symbols": [...], "exchange": "binance"}
+    добавляет канал в группы символов; тики приходят как {"type": "price", ...}.
+    """
+
+    async def subscribe_prices(self, data):
+        """
+        Добавляет канал в группы тиков запрошенных символов.
+
+        :param data: Сообщение клиента с symbols и необязательным exchange.
+        """
+        exchange = data.get("exchange", "binance")
+        groups = [group_name(exchange, symbol) for symbol in data.get("symbols", [])]
+        self.price_groups = set(getattr(self, "price_groups", ())) | set(groups)
+        for group in groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.send(text_data=json.dumps({"status": "subscribed", "groups": groups}))
+
+    async def unsubscribe_prices(self):
+        """Удаляет канал из всех групп тиков, на которые он подписан."""
+        for group in getattr(self, "price_groups", ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.price_groups = set()
+
+    async def price_tick(self, event):
+        """
+        Отправляет тик цены клиенту.
+
+        :param event: Событие price.tick с полем tick.
+        """
+        await self.send(text_data=json.dumps({"type": "price", **event["tick"]}))
+
+
+class AnalyticsConsumer(PriceSubscriptionMixin, AsyncWebsocketConsumer):
     """
     Потребитель WebSocket для аналитики, обрабатывающий подключения и предсказания цен.
     """
@@ -16,10 +54,17 @@ class AnalyticsConsumer(AsyncWebsocketConsumer):
         await self.accept()
         await self.send(text_data=json.dumps({"message": "Connected to analytics"}))
 
+    async def disconnect(self, close_code):
+        """
+        Обрабатывает отключение клиента: отписка от тиков цен.
+        """
+        await self.unsubscribe_prices()
+
     async def receive(self, text_data):
         """
         Обрабатывает входящие данные от клиента.
-        Если тип сообщения 'predict', вызывает задачу предсказания цены и отправляет результат.
+        Если тип сообщения 'predict', вызывает задачу предсказания цены и отправляет результат;
+        'subscribe_prices' — подписывает на тики цен символов.
 
         :param text_data: Входящие данные в формате JSON.
         """
@@ -29,3 +74,5 @@ class AnalyticsConsumer(AsyncWebsocketConsumer):
 
             prediction = predict_price.delay(data["exchange"], data["symbol"]).get()
             await self.send(text_data=json.dumps({"prediction": prediction}))
+        elif data["type"] == "subscribe_prices":
+            await self.subscribe_prices(data)
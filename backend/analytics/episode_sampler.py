@@ -0,0 +1,80 @@
+"""
+Модуль выбора стартовых точек эпизодов для обучения на длинной истории.
+
+Вместо одного эпизода от начала до конца ряда эпизод имеет фиксированную
+длину и начинается со случайного смещения. Признаки уже нормализованы
+целиком (TradingEnv._features), поэтому сброс — это только выбор индекса, O(1).
+
+Режимы:
+- random: смещение равномерно по всей допустимой области
+- stratified: история делится на страты, страты обходятся в случайном
+  порядке без повторов до полного круга — все режимы рынка покрываются
+  равномерно даже при малом числе эпизодов
+"""
+
+import numpy as np
+
+EPISODE_START_MODES = ("random", "stratified")
+
+
+class EpisodeSampler:
+    """
+    Генератор стартовых шагов эпизодов фиксированной длины.
+    """
+
+    def __init__(self, num_steps, episode_length, mode="random", num_strata=None, seed=None):
+        """
+        :param num_steps: Количество шагов в ряду (TradingEnv.max_steps)
+        :param episode_length: Длина эпизода в шагах
+        :param mode: Режим выбора старта: 'random' или 'stratified'
+        :param num_strata: Количество страт (по умолчанию num_steps // episode_length)
+        :param seed: Seed генератора случайных чисел
+        """
+        if mode not in EPISODE_START_MODES:
+            raise ValueError(f"Unknown episode start mode: {mode}")
+        if not 0 < episode_length <= num_steps:
+            raise ValueError(
+                f"episode_length must be in [1, {num_steps}], got {episode_length}"
+            )
+        self.episode_length = int(episode_length)
+        self.mode = mode
+        self.max_start = num_steps - self.episode_length
+        num_strata = num_strata or max(1, num_steps // self.episode_length)
+        # Каждая страта должна содержать хотя бы одну стартовую точку
+        self.num_strata = min(num_strata, self.max_start + 1)
+        self._edges = (
+            np.arange(self.num_strata + 1) * (self.max_start + 1)
+        ) // self.num_strata
+        self._pending = np.empty(0, dtype=np.int64)
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Пересоздать генератор случайных чисел и начать новый обход страт."""
+        self.rng = np.random.default_rng(seed)
+        self._pending = np.empty(0, dtype=np.int64)
+
+    def _next_strata(self, size):
+        """Следующие size страт из случайных перестановок без повторов внутри круга."""
+        while len(self._pending) < size:
+            self._pending = np.concatenate(
+                [self._pending, self.rng.permutation(self.num_strata)]
+            )
+        strata, self._pending = self._pending[:size], self._pending[size:]
+        return strata
+
+    def sample(self, size=None):
+        """
+        Выбрать стартовые шаги эпизодов.
+
+        :param size: Количество стартов (None — один старт числом)
+        :return: int или массив int64 длины size
+        """
+        count = 1 if size is None else size
+        if self.mode == "random":
+            starts = self.rng.integers(0, self.max_start + 1, count)
+        else:
+            strata = self._next_strata(count)
+            low = self._edges[strata]
+            width = self._edges[strata + 1] - low
+            starts = low + (self.rng.random(count) * width).astype(np.int64)
+        return int(starts[0]) if size is None else starts
@@ -0,0 +1,165 @@
+"""
+Модуль пула клиентов бирж ccxt.
+
+Клиент ccxt держит HTTP-сессию (keep-alive), состояние ограничителя частоты
+запросов и загруженные метаданные рынков. Пул хранит по одному клиенту
+на процесс для каждой пары (биржа, отпечаток учётных данных), поэтому
+повторные вызовы используют уже открытые соединения и не перечитывают рынки.
+
+Отпечаток — SHA-256 от учётных данных (или их зашифрованной формы), сами ключи
+в ключ пула не попадают. Конфигурацию клиента можно передать функцией: она
+вызывается только при создании клиента, так что расшифровка ключей
+происходит один раз на клиент, а не на каждое обращение.
+
+load_markets остаётся ленивым: рынки загружает первый запрос, которому они
+нужны, после чего они передаются новым клиентам той же биржи (set_markets).
+Клиенты, не использовавшиеся дольше EXCHANGE_POOL_TTL секунд, закрываются
+и удаляются; рынки биржи живут столько же.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PUBLIC = ""
+
+
+def credential_fingerprint(*parts):
+    """
+    Отпечаток учётных данных для ключа пула.
+
+    :param parts: Части учётных данных (ключ, секрет, ...); None пропускаются
+    :return: Шестнадцатеричная строка или PUBLIC для публичного клиента
+    """
+    parts = [str(part) for part in parts if part is not None]
+    if not parts:
+        return PUBLIC
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:32]
+
+
+class ExchangePool:
+    """
+    Пул клиентов ccxt по (биржа, отпечаток) с вытеснением по TTL.
+    """
+
+    def __init__(self, ttl=None):
+        """
+        :param ttl: Время жизни неиспользуемого клиента, секунды
+            (по умолчанию settings.EXCHANGE_POOL_TTL)
+        """
+        self.ttl = ttl if ttl is not None else getattr(settings, "EXCHANGE_POOL_TTL", 600)
+        self._clients = {}  # (биржа, отпечаток) -> [клиент, время последнего использования]
+        self._markets = {}  # биржа -> (markets, currencies, время загрузки)
+        self._lock = threading.Lock()
+
+    def get(self, exchange, fingerprint=PUBLIC, config=None):
+        """
+        Клиент биржи из пула; создаётся при первом обращении.
+
+        :param exchange: Название биржи ccxt (например, 'binance')
+        :param fingerprint: Отпечаток учётных данных (credential_fingerprint)
+        :param config: Конфигурация клиента ccxt или функция без аргументов,
+            возвращающая её (вызывается только при создании клиента)
+        :return: Экземпляр ccxt-биржи
+        """
+        key = (exchange, fingerprint)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                self._collect_markets(exchange, now)
+                entry = self._clients[key] = [self._create(exchange, config), now]
+            # Создание клиента ccxt заметно по времени — отметка после него
+            entry[1] = time.monotonic()
+            return entry[0]
+
+    def _create(self, exchange, config):
+        import ccxt
+
+        exchange_class = getattr(ccxt, exchange)
+        config = config() if callable(config) else dict(config or {})
+        config.setdefault("enableRateLimit", True)
+        client = exchange_class(config)
+        shared = self._markets.get(exchange)
+        if shared is not None:
+            client.set_markets(shared[0], shared[1])
+        logger.info(f"Created pooled {exchange} client ({len(self._clients) + 1} in pool)")
+        return client
+
+    def _collect_markets(self, exchange, now):
+        # Рынки, уже загруженные любым клиентом биржи, становятся общими
+        if exchange in self._markets:
+            return
+        for (name, _), (client, _) in self._clients.items():
+            if name == exchange and getattr(client, "markets", None):
+                self._markets[exchange] = (client.markets, client.currencies, now)
+                return
+
+    def _evict(self, now):
+        for key, (client, last_used) in list(self._clients.items()):
+            if now - last_used > self.ttl:
+                del self._clients[key]
+                _close(client)
+        for exchange, (_, _, loaded_at) in list(self._markets.items()):
+            if now - loaded_at > self.ttl:
+                del self._markets[exchange]
+
+    def evict_expired(self):
+        """Закрыть и удалить клиенты, не использовавшиеся дольше TTL."""
+        with self._lock:
+            self._evict(time.monotonic())
+
+    def clear(self):
+        """Закрыть и удалить все клиенты и общие рынки."""
+        with self._lock:
+            for client, _ in self._clients.values():
+                _close(client)
+            self._clients.clear()
+            self._markets.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+def _close(client):
+    session = getattr(client, "session", None)
+    if session is not None:
+        try:
+            session.close()
+        except Exception as e:
+            logger.warning(f"Failed to close exchange session: {e}")
+
+
+_pool = None
+
+
+def get_pool():
+    """Пул клиентов процесса (создаётся при первом обращении)."""
+    global _pool
+    if _pool is None:
+        _pool = ExchangePool()
+    return _pool
+
+
+def get_exchange(exchange="binance", api_key=None, secret=None):
+    """
+    Клиент биржи из пула процесса.
+
+    :param exchange: Название биржи ccxt
+    :param api_key: API-ключ (опционально, для приватных методов)
+    :param secret: Секрет API-ключа
+    :return: Экземпляр ccxt-биржи
+    """
+    if api_key is None:
+        return get_pool().get(exchange)
+    return get_pool().get(
+        exchange,
+        credential_fingerprint(api_key, secret),
+        {"apiKey": api_key, "secret": secret},
+    )
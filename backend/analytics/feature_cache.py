@@ -0,0 +1,314 @@
+"""
+Модуль кэша снимков признаков для обучения.
+
+Снимок — рассчитанные признаки ряда (цена, объём, sentiment, SMA, RSI)
+одной биржи, символа и таймфрейма для версии набора признаков:
+
+    FEATURE_CACHE_DIR/<exchange>/<SYMBOL_QUOTE>/<timeframe>/v<версия>/
+        meta.json        — части, диапазон, состояние индикаторов
+        part-00000.npz   — сжатые колонки (np.savez_compressed)
+
+Снимок дописывается: новые свечи (из MarketDataset или переданные явно)
+продолжают индикаторы с сохранённого состояния IndicatorCache за O(новых
+точек). Они сливаются с последней частью, только если она меньше
+TAIL_PART_ROWS строк (перезапись ограничена), иначе пишутся новой частью;
+когда хвостовые маленькие части набирают PART_ROWS строк, они сжимаются
+в одну. Перезапись части — O(TAIL_PART_ROWS), сжатие — O(PART_ROWS) раз
+на PART_ROWS строк, поэтому дописывание в среднем O(новых точек).
+Писатели снимка сериализуются блокировкой fcntl.flock, читатели берут
+разделяемую. Чтение диапазона распаковывает только пересекающиеся части.
+
+В снимке хранятся ненормализованные значения: нормализация зависит
+от диапазона обучения, и её делает тренер (TradingEnv, MinMaxScaler)
+одним векторным проходом.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+from django.conf import settings
+
+from .indicators import IndicatorCache
+from .market_dataset import MarketDataset, file_lock
+
+logger = logging.getLogger(__name__)
+
+# Версия набора признаков: меняется при изменении состава или расчёта колонок,
+# снимки старой версии остаются в своей директории и не смешиваются с новыми
+FEATURE_SET_VERSION = 1
+SMA_WINDOWS = (5, 10, 20)
+RSI_PERIOD = 14
+FEATURE_COLUMNS = (
+    ("timestamp", "close", "volume", "sentiment")
+    + tuple(f"ma_{window}" for window in SMA_WINDOWS)
+    + (f"rsi_{RSI_PERIOD}",)
+)
+# Размер части после сжатия хвостовых частей
+PART_ROWS = 65536
+# Последняя часть перезаписывается вместе с новыми свечами, только пока она меньше
+TAIL_PART_ROWS = 4096
+
+
+def feature_cache_root():
+    """Корневая директория снимков (settings.FEATURE_CACHE_DIR)."""
+    return getattr(
+        settings,
+        "FEATURE_CACHE_DIR",
+        os.path.join(settings.BASE_DIR, "market_data", "features"),
+    )
+
+
+class FeatureSnapshot:
+    """
+    Дописываемый сжатый снимок признаков одного ряда.
+    """
+
+    def __init__(self, symbol, timeframe="1h", exchange="binance", root=None):
+        """
+        :param symbol: Символ актива (например, 'BTC/USDT')
+        :param timeframe: Временной интервал
+        :param exchange: Название биржи ccxt
+        :param root: Корневая директория (по умолчанию feature_cache_root())
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange = exchange
+        self.path = os.path.join(
+            root or feature_cache_root(),
+            exchange,
+            symbol.replace("/", "_"),
+            timeframe,
+            f"v{FEATURE_SET_VERSION}",
+        )
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def meta(self):
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"length": 0, "parts": [], "state": None}
+
+    def exists(self):
+        return os.path.exists(self._meta_path())
+
+    def __len__(self):
+        return self.meta()["length"]
+
+    def last_timestamp(self):
+        parts = self.meta()["parts"]
+        return parts[-1]["end"] if parts else None
+
+    def append(self, ohlcv, sentiment=None):
+        """
+        Дописать свечи: индикаторы продолжаются с сохранённого состояния.
+
+        :param ohlcv: Строки [timestamp, open, high, low, close, volume]
+            (свечи не новее последней в снимке отбрасываются)
+        :param sentiment: Sentiment на свечу (по умолчанию нули)
+        :return: Количество дописанных свечей
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        sentiment = (
+            np.zeros(len(rows))
+            if sentiment is None
+            else np.asarray(sentiment, dtype=np.float64).reshape(-1)
+        )
+        with file_lock(os.path.join(self.path, ".lock")):
+            meta = self.meta()
+            if meta["parts"]:
+                fresh = rows[:, 0] > meta["parts"][-1]["end"]
+                rows, sentiment = rows[fresh], sentiment[fresh]
+            if len(rows) == 0:
+                return 0
+
+            close = rows[:, 4]
+            if meta["state"] is None:
+                indicators = IndicatorCache(close, SMA_WINDOWS, rsi_period=RSI_PERIOD)
+            else:
+                indicators = IndicatorCache.from_state(meta["state"]).update(close)
+            columns = {
+                "timestamp": rows[:, 0].astype(np.int64),
+                "close": close,
+                "volume": rows[:, 5],
+                "sentiment": sentiment,
+                f"rsi_{RSI_PERIOD}": indicators.rsi[-len(rows) :],
+            }
+            for window in SMA_WINDOWS:
+                columns[f"ma_{window}"] = indicators.sma[window][-len(rows) :]
+
+            parts = meta["parts"]
+            next_part = meta.get("next_part", len(parts))
+            removed = []
+            if parts and parts[-1]["length"] < TAIL_PART_ROWS:
+                # Маленькая последняя часть перезаписывается вместе с новыми свечами
+                last = parts.pop()
+                removed.append(last["file"])
+                columns = self._merge([last], columns)
+            filename = f"part-{next_part:05d}.npz"
+            next_part += 1
+            self._write_part(filename, columns)
+            parts.append(self._part_entry(filename, columns))
+
+            # Хвост маленьких частей, набравший PART_ROWS строк, сжимается в одну
+            tail = 0
+            while tail < len(parts) and parts[-tail - 1]["length"] < PART_ROWS:
+                tail += 1
+            if tail > 1 and sum(part["length"] for part in parts[-tail:]) >= PART_ROWS:
+                merged = self._merge(parts[-tail:])
+                removed.extend(part["file"] for part in parts[-tail:])
+                del parts[-tail:]
+                filename = f"part-{next_part:05d}.npz"
+                next_part += 1
+                self._write_part(filename, merged)
+                parts.append(self._part_entry(filename, merged))
+
+            meta = {
+                "version": FEATURE_SET_VERSION,
+                "columns": list(FEATURE_COLUMNS),
+                "length": sum(part["length"] for part in parts),
+                "parts": parts,
+                "next_part": next_part,
+                "state": indicators.state(),
+            }
+            tmp_path = f"{self._meta_path()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path())
+            # Файлы удаляются после публикации meta без них
+            for filename in removed:
+                if filename not in {part["file"] for part in parts}:
+                    os.remove(os.path.join(self.path, filename))
+        logger.info(f"Appended {len(rows)} rows to feature snapshot {self.path}")
+        return len(rows)
+
+    def sync(self, dataset=None):
+        """
+        Дописать из MarketDataset свечи, которых ещё нет в снимке.
+
+        :param dataset: MarketDataset (по умолчанию ряд того же символа)
+        :return: self
+        """
+        dataset = dataset or MarketDataset(self.symbol, self.timeframe, self.exchange)
+        if not dataset.exists():
+            return self
+        columns = dataset.open(("timestamp", "open", "high", "low", "close", "volume"))
+        last_ts = self.last_timestamp()
+        start = (
+            0
+            if last_ts is None
+            else int(np.searchsorted(columns["timestamp"], last_ts, side="right"))
+        )
+        if start < len(columns["timestamp"]):
+            self.append(
+                np.column_stack([column[start:] for column in columns.values()])
+            )
+        return self
+
+    def read(self, columns=FEATURE_COLUMNS, start=None, end=None, tail=None):
+        """
+        Прочитать колонки снимка за диапазон.
+
+        :param columns: Имена колонок
+        :param start: Начало диапазона, timestamp в мс включительно (опционально)
+        :param end: Конец диапазона, timestamp в мс не включительно (опционально)
+        :param tail: Только последние tail строк диапазона (опционально)
+        :return: Словарь {колонка: массив}
+        """
+        # Разделяемая блокировка: писатель не удалит сжатые части во время чтения
+        with file_lock(os.path.join(self.path, ".lock"), shared=True):
+            parts = self._select_parts(self.meta(), start, end, tail)
+            loaded = [self._load_part(part["file"]) for part in parts]
+        timestamps = np.concatenate([part["timestamp"] for part in loaded])
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end))
+        if tail is not None:
+            lo = max(lo, hi - tail)
+        return {
+            name: np.concatenate([part[name] for part in loaded])[lo:hi]
+            for name in columns
+        }
+
+    def _select_parts(self, meta, start, end, tail):
+        parts = [
+            part
+            for part in meta["parts"]
+            if (start is None or part["end"] >= start)
+            and (end is None or part["start"] < end)
+        ]
+        if tail is not None:
+            # С конца берутся только части, покрывающие tail строк
+            needed, selected = 0, []
+            for part in reversed(parts):
+                selected.insert(0, part)
+                needed += part["length"]
+                if needed >= tail:
+                    break
+            parts = selected
+        if not parts:
+            raise FileNotFoundError(f"Feature snapshot has no rows in range: {self.path}")
+        return parts
+
+    def _merge(self, parts, columns=None):
+        # Колонки частей подряд (и новые колонки в конце)
+        loaded = [self._load_part(part["file"]) for part in parts]
+        if columns is not None:
+            loaded.append(columns)
+        return {
+            name: np.concatenate([part[name] for part in loaded])
+            for name in FEATURE_COLUMNS
+        }
+
+    @staticmethod
+    def _part_entry(filename, columns):
+        return {
+            "file": filename,
+            "start": int(columns["timestamp"][0]),
+            "end": int(columns["timestamp"][-1]),
+            "length": len(columns["timestamp"]),
+        }
+
+    def _load_part(self, filename):
+        with np.load(os.path.join(self.path, filename)) as part:
+            return {name: part[name] for name in part.files}
+
+    def _write_part(self, filename, columns):
+        # np.savez_compressed дописывает .npz, поэтому временное имя тоже с .npz
+        tmp_path = os.path.join(self.path, f".tmp-{filename}")
+        np.savez_compressed(tmp_path, **columns)
+        os.replace(tmp_path, os.path.join(self.path, filename))
+
+
+def load_features(
+    symbol, timeframe="1h", exchange="binance", columns=FEATURE_COLUMNS, tail=None
+):
+    """
+    Признаки ряда из снимка, предварительно дописанного из MarketDataset.
+
+    :param symbol: Символ актива
+    :param timeframe: Временной интервал
+    :param exchange: Биржа ряда
+    :param columns: Имена колонок
+    :param tail: Только последние tail строк (опционально)
+    :return: Словарь {колонка: массив}
+    """
+    return FeatureSnapshot(symbol, timeframe, exchange).sync().read(columns, tail=tail)
+
+
+def indicator_cache(features):
+    """
+    IndicatorCache для TradingEnv из колонок снимка (без пересчёта индикаторов).
+
+    :param features: Словарь колонок из FeatureSnapshot.read()
+    :return: IndicatorCache
+    """
+    return IndicatorCache.from_arrays(
+        features["close"],
+        sma={window: features[f"ma_{window}"] for window in SMA_WINDOWS},
+        rsi=features[f"rsi_{RSI_PERIOD}"],
+        rsi_period=RSI_PERIOD,
+    )
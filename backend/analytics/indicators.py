@@ -0,0 +1,371 @@
+"""
+Модуль технических индикаторов (SMA, EMA, RSI) для TradingEnv и ModelTrainer.
+
+Все индикаторы считаются за один векторизированный проход: SMA — через
+кумулятивные суммы, EMA и RSI — через экспоненциальное сглаживание
+(для RSI — сглаживание Уайлдера) блоками в замкнутой форме, без Python-цикла
+по каждой точке. IndicatorCache хранит рассчитанные ряды и умеет дописывать
+их по новым свечам за амортизированное O(новых точек).
+
+Первые точки, для которых окна ещё не хватает, заполняются NaN.
+"""
+
+import numpy as np
+
+# Ограничение роста множителя (1 - alpha)^-k внутри блока замкнутой формы
+_MAX_BLOCK_GROWTH = 1e8
+# Размер блока кумулятивной суммы для SMA
+_SMA_BLOCK = 4096
+
+
+def _ewm(values, alpha, initial):
+    """
+    Рекуррентное сглаживание y[t] = (1 - alpha) * y[t-1] + alpha * x[t].
+
+    Считается блоками в замкнутой форме через кумулятивные суммы, размер блока
+    ограничен так, чтобы множители не теряли точность.
+
+    :param values: Массив x
+    :param alpha: Коэффициент сглаживания (0, 1]
+    :param initial: Значение y[-1] перед первой точкой
+    :return: Массив y той же длины
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+
+    block = max(1, int(np.log(_MAX_BLOCK_GROWTH) / -np.log(decay)))
+    powers = decay ** np.arange(1, block + 1)  # decay^(k+1)
+    inverse = decay ** -np.arange(block)  # decay^(-k)
+
+    prev = float(initial)
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        n = len(chunk)
+        weighted = np.cumsum(chunk * inverse[:n])
+        out[start : start + n] = powers[:n] * prev + alpha * powers[:n] / decay * weighted
+        prev = out[start + n - 1]
+    return out
+
+
+def sma(values, window):
+    """
+    Простое скользящее среднее через кумулятивные суммы.
+
+    :param values: Массив значений
+    :param window: Размер окна
+    :return: Массив SMA, первые window - 1 точек — NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    # Кумулятивная сумма накапливает ошибку на длинных рядах,
+    # поэтому она пересчитывается заново для каждого блока
+    for start in range(window - 1, len(values), _SMA_BLOCK):
+        stop = min(start + _SMA_BLOCK, len(values))
+        chunk = values[start - window + 1 : stop]
+        csum = np.cumsum(np.concatenate(([0.0], chunk)))
+        out[start:stop] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def ema(values, span, initial=None):
+    """
+    Экспоненциальное скользящее среднее (alpha = 2 / (span + 1)).
+
+    :param values: Массив значений
+    :param span: Период EMA
+    :param initial: Предыдущее значение EMA (по умолчанию первая точка ряда)
+    :return: Массив EMA
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.empty(0)
+    if initial is None:
+        initial = values[0]
+    return _ewm(values, 2.0 / (span + 1), initial)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    """RSI по сглаженным средним прибыли и убытка."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    return rsi
+
+
+def _wilder_averages(values, period):
+    """
+    Сглаженные по Уайлдеру средние прибыли и убытка.
+
+    :return: Кортеж (avg_gain, avg_loss) длиной len(values), первые period точек — NaN
+    """
+    avg_gain = np.full(len(values), np.nan)
+    avg_loss = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return avg_gain, avg_loss
+
+    delta = np.diff(values)
+    gains = np.maximum(delta, 0)
+    losses = np.maximum(-delta, 0)
+
+    # Первое значение — простое среднее за period, дальше сглаживание 1/period
+    first_gain = gains[:period].mean()
+    first_loss = losses[:period].mean()
+    avg_gain[period] = first_gain
+    avg_loss[period] = first_loss
+    avg_gain[period + 1 :] = _ewm(gains[period:], 1.0 / period, first_gain)
+    avg_loss[period + 1 :] = _ewm(losses[period:], 1.0 / period, first_loss)
+    return avg_gain, avg_loss
+
+
+def rsi(values, period=14):
+    """
+    RSI со сглаживанием Уайлдера.
+
+    :param values: Массив цен
+    :param period: Период RSI
+    :return: Массив RSI от 0 до 100, первые period точек — NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    avg_gain, avg_loss = _wilder_averages(values, period)
+    return _rsi_from_averages(avg_gain, avg_loss)
+
+
+class IndicatorCache:
+    """
+    Кэш индикаторов для ценового ряда с инкрементальным дополнением.
+
+    Один экземпляр можно передавать нескольким TradingEnv на одном ряду,
+    чтобы не пересчитывать индикаторы для каждой среды.
+
+    Ряды хранятся в буферах с запасом ёмкости (удвоение при нехватке), а
+    атрибуты prices, sma, ema и rsi — представления их заполненной части,
+    поэтому update() не копирует весь ряд на каждой новой свече.
+    """
+
+    def __init__(self, prices, sma_windows=(5, 10), ema_spans=(), rsi_period=14):
+        """
+        Расчёт индикаторов по всему ряду.
+
+        :param prices: Массив цен
+        :param sma_windows: Окна SMA
+        :param ema_spans: Периоды EMA
+        :param rsi_period: Период RSI
+        """
+        self.sma_windows = tuple(sma_windows)
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_period = rsi_period
+        self._compute(np.asarray(prices, dtype=np.float64))
+
+    def _compute(self, prices):
+        """Полный расчёт индикаторов."""
+        avg_gain, avg_loss = _wilder_averages(prices, self.rsi_period)
+        self._assign(
+            prices,
+            {window: sma(prices, window) for window in self.sma_windows},
+            {span: ema(prices, span) for span in self.ema_spans},
+            avg_gain,
+            avg_loss,
+            _rsi_from_averages(avg_gain, avg_loss),
+        )
+
+    def _assign(self, prices, sma, ema, avg_gain, avg_loss, rsi):
+        """
+        Установить ряды кэша одинаковой длины (ёмкость буферов равна длине).
+
+        Переданные массивы не изменяются: при первом update() они копируются
+        в новые буферы большего размера.
+        """
+        self._size = self._capacity = len(prices)
+        self._prices = prices
+        self._sma = dict(sma)
+        self._ema = dict(ema)
+        self._avg_gain = avg_gain
+        self._avg_loss = avg_loss
+        self._rsi = rsi
+
+    def _reserve(self, extra):
+        """Увеличить ёмкость буферов минимум вдвое, если extra точек не помещается."""
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity)
+
+        def grow(buffer):
+            if buffer is None:
+                return None
+            grown = np.empty(capacity)
+            grown[: self._size] = buffer[: self._size]
+            return grown
+
+        self._prices = grow(self._prices)
+        self._sma = {window: grow(buffer) for window, buffer in self._sma.items()}
+        self._ema = {span: grow(buffer) for span, buffer in self._ema.items()}
+        self._avg_gain = grow(self._avg_gain)
+        self._avg_loss = grow(self._avg_loss)
+        self._rsi = grow(self._rsi)
+        self._capacity = capacity
+
+    @property
+    def prices(self):
+        return self._prices[: self._size]
+
+    @property
+    def sma(self):
+        return {window: buffer[: self._size] for window, buffer in self._sma.items()}
+
+    @property
+    def ema(self):
+        return {span: buffer[: self._size] for span, buffer in self._ema.items()}
+
+    @property
+    def rsi(self):
+        return self._rsi[: self._size]
+
+    @classmethod
+    def from_arrays(cls, prices, sma=None, ema=None, rsi=None, rsi_period=14):
+        """
+        Кэш из уже рассчитанных рядов (например, из снимка признаков) без пересчёта.
+
+        Состояния сглаживания RSI в рядах нет, поэтому update() такого кэша
+        пересчитывает индикаторы по всему ряду, а state() сохраняет его как None.
+
+        :param prices: Массив цен
+        :param sma: Словарь {окно: ряд SMA}
+        :param ema: Словарь {период: ряд EMA}
+        :param rsi: Ряд RSI
+        :param rsi_period: Период RSI
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        cache = cls.__new__(cls)
+        cache.sma_windows = tuple(sma or ())
+        cache.ema_spans = tuple(ema or ())
+        cache.rsi_period = rsi_period
+        cache._assign(
+            prices,
+            {window: np.asarray(values) for window, values in (sma or {}).items()},
+            {span: np.asarray(values) for span, values in (ema or {}).items()},
+            None,
+            None,
+            np.full(len(prices), np.nan)
+            if rsi is None
+            else np.asarray(rsi, dtype=np.float64),
+        )
+        return cache
+
+    def state(self):
+        """
+        Минимальное состояние для продолжения расчёта по новым свечам:
+        хвост цен на самое длинное окно и последние сглаженные значения.
+
+        Если сглаженных значений ещё нет (ряд короче периода RSI или кэш
+        собран через from_arrays), вместо них сохраняется None.
+
+        :return: Словарь, сериализуемый в JSON
+        """
+        tail = max(self.sma_windows + (self.rsi_period + 1,))
+        last = self._size - 1
+        has_averages = self._avg_gain is not None and self._size > self.rsi_period
+        return {
+            "sma_windows": list(self.sma_windows),
+            "ema_spans": list(self.ema_spans),
+            "rsi_period": self.rsi_period,
+            "prices": self.prices[-tail:].tolist(),
+            "ema": {
+                str(span): float(self._ema[span][last]) if self._size else None
+                for span in self.ema_spans
+            },
+            "avg_gain": float(self._avg_gain[last]) if has_averages else None,
+            "avg_loss": float(self._avg_loss[last]) if has_averages else None,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Кэш из state(): update() дописывает индикаторы точно так же, как по
+        всему ряду, но ряды кэша содержат только хвост и новые свечи
+        (сглаженные ряды на хвосте известны лишь в последней точке, остальные — NaN).
+
+        Если в состоянии нет сглаженных значений, индикаторы считаются по хвосту заново.
+        """
+        prices = np.asarray(state["prices"], dtype=np.float64)
+        ema_state = state.get("ema", {})
+        if (
+            len(prices) <= state["rsi_period"]
+            or state.get("avg_gain") is None
+            or state.get("avg_loss") is None
+            or any(ema_state.get(str(span)) is None for span in state["ema_spans"])
+        ):
+            # Продолжать нечем (или хвост — это весь ряд): обычный полный расчёт
+            return cls(
+                prices, state["sma_windows"], state["ema_spans"], state["rsi_period"]
+            )
+
+        def last_only(value):
+            series = np.full(len(prices), np.nan)
+            series[-1] = value
+            return series
+
+        cache = cls.__new__(cls)
+        cache.sma_windows = tuple(state["sma_windows"])
+        cache.ema_spans = tuple(state["ema_spans"])
+        cache.rsi_period = state["rsi_period"]
+        avg_gain = last_only(state["avg_gain"])
+        avg_loss = last_only(state["avg_loss"])
+        cache._assign(
+            prices,
+            {window: sma(prices, window) for window in cache.sma_windows},
+            {span: last_only(ema_state[str(span)]) for span in cache.ema_spans},
+            avg_gain,
+            avg_loss,
+            _rsi_from_averages(avg_gain, avg_loss),
+        )
+        return cache
+
+    def __len__(self):
+        return self._size
+
+    def update(self, new_prices):
+        """
+        Дописать индикаторы по новым свечам без пересчёта всего ряда.
+
+        :param new_prices: Массив новых цен
+        :return: self
+        """
+        new_prices = np.asarray(new_prices, dtype=np.float64)
+        count = len(new_prices)
+        if count == 0:
+            return self
+
+        # Пока ряд короче периода RSI, пересчёт дешевле отдельной ветки
+        if self._size <= self.rsi_period or self._avg_gain is None:
+            self._compute(np.concatenate((self.prices, new_prices)))
+            return self
+
+        start, stop = self._size, self._size + count
+        self._reserve(count)
+        self._prices[start:stop] = new_prices
+        prices = self._prices[:stop]
+
+        for window, buffer in self._sma.items():
+            tail = prices[-(count + window - 1) :]
+            buffer[start:stop] = sma(tail, window)[-count:]
+        for span, buffer in self._ema.items():
+            buffer[start:stop] = ema(new_prices, span, initial=buffer[start - 1])
+
+        delta = np.diff(prices[start - 1 :])
+        alpha = 1.0 / self.rsi_period
+        gain = _ewm(np.maximum(delta, 0), alpha, self._avg_gain[start - 1])
+        loss = _ewm(np.maximum(-delta, 0), alpha, self._avg_loss[start - 1])
+        self._avg_gain[start:stop] = gain
+        self._avg_loss[start:stop] = loss
+        self._rsi[start:stop] = _rsi_from_averages(gain, loss)
+
+        self._size = stop
+        return self
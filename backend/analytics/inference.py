@@ -0,0 +1,376 @@
+"""
+Модуль сервиса пакетного инференса RL-моделей.
+
+Вместо Celery-задачи и model.predict() на одно наблюдение запросы всех
+стратегий идут в долгоживущий процесс (manage.py run_inference_server):
+
+- клиент кладёт запрос в Redis-очередь и ждёт ответ в своём ключе (BLPOP);
+- сервер забирает первый запрос, в течение окна batch_window_ms добирает
+  остальные (до max_batch), группирует их по модели и выполняет один
+  батчевый forward pass на модель;
+- модели берутся из реестра (analytics.model_registry): загружаются один раз
+  и подменяются при публикации новой версии; стратегии без своей модели
+  попадают в батч общей модели символа.
+
+У запроса есть срок (deadline = отправка + таймаут клиента): клиент, не
+дождавшийся ответа, убирает свой запрос из очереди, а сервер отбрасывает
+просроченные запросы, не вычисляя их. Локальный predict в процессе клиента —
+только по явному разрешению (INFERENCE_LOCAL_FALLBACK, для воркеров):
+веб-запросы и бот при недоступном сервисе сразу получают InferenceUnavailable,
+не загружая SB3/torch.
+
+Сервер считает задержку запросов (от отправки клиентом до ответа)
+и публикует p50/p99, средний размер батча и пропускную способность
+в Redis-хэш INFERENCE_STATS_KEY.
+"""
+
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict, deque
+
+import numpy as np
+import redis
+from django.conf import settings
+
+from .model_registry import ModelKey, get_registry, make_key
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_QUEUE_KEY = "inference:requests"
+INFERENCE_REPLY_PREFIX = "inference:reply:"
+INFERENCE_STATS_KEY = "inference:stats"
+# Ответ, который никто не забрал (клиент ушёл по таймауту), удаляется
+REPLY_TTL = 30
+
+
+class InferenceUnavailable(RuntimeError):
+    """Сервис инференса не ответил вовремя или недоступен, локальный откат запрещён."""
+
+
+def get_redis():
+    """Клиент Redis для транспорта инференса (settings.INFERENCE_REDIS_URL)."""
+    return redis.Redis.from_url(
+        getattr(settings, "INFERENCE_REDIS_URL", "redis://127.0.0.1:6379/2")
+    )
+
+
+def request_action(
+    observation, symbol=None, timeframe="1h", strategy=None, timeout=None, client=None
+):
+    """
+    Запросить действие модели у сервиса инференса.
+
+    :param observation: Наблюдение TradingEnv (7 значений)
+    :param symbol: Символ актива (None — общая модель)
+    :param timeframe: Временной интервал
+    :param strategy: ID стратегии (None — общая модель)
+    :param timeout: Время ожидания ответа, секунды (settings.INFERENCE_TIMEOUT)
+    :param client: Клиент Redis (по умолчанию get_redis())
+    :return: Действие (0=hold, 1=buy, 2=sell)
+    :raises TimeoutError: Сервис не ответил за timeout
+    """
+    client = client or get_redis()
+    timeout = timeout or getattr(settings, "INFERENCE_TIMEOUT", 2.0)
+    request_id = uuid.uuid4().hex
+    reply_key = f"{INFERENCE_REPLY_PREFIX}{request_id}"
+    now = time.time()
+    payload = json.dumps(
+        {
+            "reply": reply_key,
+            "key": list(make_key(symbol, timeframe, strategy)),
+            "obs": np.asarray(observation, dtype=np.float32).tolist(),
+            "ts": now,
+            "deadline": now + timeout,
+        }
+    )
+    client.rpush(INFERENCE_QUEUE_KEY, payload)
+    reply = client.blpop([reply_key], timeout=timeout)
+    if reply is None:
+        # Запрос, который сервер ещё не забрал, больше не нужен
+        client.lrem(INFERENCE_QUEUE_KEY, 1, payload)
+        raise TimeoutError("Inference service did not respond")
+    result = json.loads(reply[1])
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result["action"]
+
+
+def predict_local(observation, symbol=None, timeframe="1h", strategy=None):
+    """
+    Действие модели в текущем процессе.
+
+    Загружает SB3/torch и модель в процесс — только для воркеров.
+    """
+    model = get_registry().get_nearest(make_key(symbol, timeframe, strategy))
+    action, _ = model.predict(
+        np.asarray(observation, dtype=np.float32), deterministic=True
+    )
+    return int(action)
+
+
+def predict_action(
+    observation, symbol=None, timeframe="1h", strategy=None, local_fallback=None
+):
+    """
+    Действие модели через сервис инференса.
+
+    :param local_fallback: При недоступном сервисе предсказать в текущем процессе
+        (settings.INFERENCE_LOCAL_FALLBACK; веб-процессу и боту не включать)
+    :return: Действие (0=hold, 1=buy, 2=sell)
+    :raises InferenceUnavailable: Сервис недоступен и локальный откат выключен
+    """
+    if local_fallback is None:
+        local_fallback = getattr(settings, "INFERENCE_LOCAL_FALLBACK", False)
+    try:
+        return request_action(observation, symbol, timeframe, strategy)
+    except (TimeoutError, redis.RedisError) as e:
+        if not local_fallback:
+            raise InferenceUnavailable(f"Inference service unavailable: {e}") from e
+        logger.warning(f"Inference service unavailable, predicting locally: {e}")
+        return predict_local(observation, symbol, timeframe, strategy)
+
+
+def predict_batch(observations, keys, registry=None):
+    """
+    Действия для матрицы наблюдений: один forward pass на каждую различную модель.
+
+    Ключи, которые через fallback разрешаются в одну модель (например, стратегии
+    без своей модели), попадают в общий батч. Наблюдение, форма которого не
+    совпадает с observation_space модели, получает ошибку только в своей строке.
+
+    :param observations: Матрица наблюдений (N, 7) или список наблюдений
+    :param keys: Список ModelKey длины N
+    :param registry: Реестр моделей (по умолчанию get_registry())
+    :return: Кортеж (действия int64 длины N, -1 для строк с ошибкой; {строка: ошибка})
+    """
+    registry = registry or get_registry()
+    actions = np.full(len(keys), -1, dtype=np.int64)
+    errors = {}
+
+    models = {}
+    rows = defaultdict(list)
+    for row, key in enumerate(keys):
+        try:
+            if key not in models:
+                models[key] = registry.get_nearest(key)
+            rows[id(models[key])].append(row)
+        except Exception as e:
+            errors[row] = str(e)
+    by_id = {id(model): model for model in models.values()}
+
+    for model_id, group in rows.items():
+        model = by_id[model_id]
+        shape = tuple(model.observation_space.shape)
+        valid = []
+        for row in group:
+            try:
+                obs = np.asarray(observations[row], dtype=np.float32)
+            except (TypeError, ValueError) as e:
+                errors[row] = f"Invalid observation: {e}"
+                continue
+            if obs.shape != shape:
+                errors[row] = f"Observation shape {obs.shape} does not match model {shape}"
+                continue
+            valid.append((row, obs))
+        if not valid:
+            continue
+        group = [row for row, _ in valid]
+        try:
+            predicted, _ = model.predict(
+                np.stack([obs for _, obs in valid]), deterministic=True
+            )
+            actions[group] = np.asarray(predicted).reshape(-1)
+        except Exception as e:
+            logger.error(f"Inference error: {e}")
+            errors.update((row, str(e)) for row in group)
+    return actions, errors
+
+
+class InferenceServer:
+    """
+    Долгоживущий обработчик запросов инференса с микробатчингом.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        registry=None,
+        batch_window_ms=None,
+        max_batch=None,
+        stats_interval=10.0,
+    ):
+        """
+        :param client: Клиент Redis (по умолчанию get_redis())
+        :param registry: Реестр моделей (по умолчанию get_registry())
+        :param batch_window_ms: Окно сбора батча после первого запроса, мс
+        :param max_batch: Максимальный размер батча
+        :param stats_interval: Период публикации статистики, секунды
+        """
+        self.client = client or get_redis()
+        self.registry = registry or get_registry()
+        self.batch_window = (
+            batch_window_ms
+            if batch_window_ms is not None
+            else getattr(settings, "INFERENCE_BATCH_WINDOW_MS", 5)
+        ) / 1000
+        self.max_batch = max_batch or getattr(settings, "INFERENCE_MAX_BATCH", 256)
+        self.stats_interval = stats_interval
+        self.latencies = deque(maxlen=10000)
+        self.batch_sizes = deque(maxlen=1000)
+        self._served = 0
+        self.expired = 0
+        self._stats_started = time.monotonic()
+
+    def collect(self, block_timeout=1):
+        """
+        Собрать батч: ждать первый запрос, затем добирать остальные в пределах окна.
+
+        :param block_timeout: Ожидание первого запроса, секунды
+        :return: Список запросов (пустой, если очередь пуста)
+        """
+        first = self.client.blpop([INFERENCE_QUEUE_KEY], timeout=block_timeout)
+        if first is None:
+            return []
+        batch = [first[1]]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            more = self.client.lpop(INFERENCE_QUEUE_KEY, self.max_batch - len(batch))
+            if more:
+                batch.extend(more)
+                continue
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(min(0.0005, max(0.0, deadline - time.monotonic())))
+        requests = []
+        expired = 0
+        now = time.time()
+        for raw in batch:
+            try:
+                request = json.loads(raw)
+            except ValueError as e:
+                # Без разобранного запроса неизвестен ключ ответа — запрос отбрасывается
+                logger.error(f"Dropping malformed inference request: {e}")
+                continue
+            if not (isinstance(request, dict) and "reply" in request):
+                logger.error("Dropping inference request without reply key")
+                continue
+            deadline = request.get("deadline")
+            if isinstance(deadline, (int, float)) and deadline < now:
+                # Клиент уже ушёл по таймауту — ответ никто не прочитает
+                expired += 1
+                continue
+            requests.append(request)
+        if expired:
+            self.expired += expired
+            logger.warning(f"Dropped {expired} expired inference requests")
+        return requests
+
+    def process(self, requests):
+        """
+        Выполнить батч: один forward pass на модель, ответы — одним pipeline.
+
+        Ошибка в запросе отвечается ошибкой только этому запросу; если батч
+        упал целиком, каждый запрос батча получает ответ с ошибкой.
+
+        :param requests: Список запросов из collect()
+        """
+        if not requests:
+            return
+        try:
+            replies = self._predict_replies(requests)
+        except Exception as e:
+            logger.exception(f"Inference batch failed: {e}")
+            replies = [{"error": f"Inference batch failed: {e}"}] * len(requests)
+
+        pipe = self.client.pipeline(transaction=False)
+        for request, reply in zip(requests, replies):
+            pipe.rpush(request["reply"], json.dumps(reply))
+            pipe.expire(request["reply"], REPLY_TTL)
+        pipe.execute()
+
+        now = time.time()
+        self.latencies.extend(
+            (now - r["ts"]) * 1000 for r in requests if isinstance(r.get("ts"), (int, float))
+        )
+        self.batch_sizes.append(len(requests))
+        self._served += len(requests)
+
+    def _predict_replies(self, requests):
+        keys, invalid = [], {}
+        for row, request in enumerate(requests):
+            try:
+                keys.append(ModelKey(*request["key"]))
+            except (KeyError, TypeError) as e:
+                invalid[row] = f"Invalid request: {e!r}"
+                keys.append(None)
+        valid = [row for row in range(len(requests)) if row not in invalid]
+        actions, errors = predict_batch(
+            [requests[row].get("obs") for row in valid],
+            [keys[row] for row in valid],
+            self.registry,
+        )
+        replies = [None] * len(requests)
+        for row, message in invalid.items():
+            replies[row] = {"error": message}
+        for i, row in enumerate(valid):
+            replies[row] = (
+                {"error": errors[i]} if i in errors else {"action": int(actions[i])}
+            )
+        return replies
+
+    def stats(self):
+        """
+        Статистика задержек и пропускной способности.
+
+        :return: Словарь: p50_ms, p99_ms, mean_batch, throughput (запросов/с), served,
+            expired (отброшено просроченных)
+        """
+        elapsed = max(time.monotonic() - self._stats_started, 1e-9)
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, float), [50, 99])
+        else:
+            p50 = p99 = 0.0
+        return {
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3),
+            "mean_batch": round(float(np.mean(self.batch_sizes)), 2)
+            if self.batch_sizes
+            else 0.0,
+            "throughput": round(self._served / elapsed, 1),
+            "served": self._served,
+            "expired": self.expired,
+        }
+
+    def publish_stats(self):
+        """Записать статистику в Redis и в лог, начать новый интервал."""
+        stats = self.stats()
+        try:
+            self.client.hset(INFERENCE_STATS_KEY, mapping=stats)
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish inference stats: {e}")
+        logger.info(f"Inference stats: {stats}")
+        self._served = 0
+        self.expired = 0
+        self._stats_started = time.monotonic()
+        return stats
+
+    def serve_forever(self):
+        """Основной цикл сервера."""
+        logger.info(
+            f"Inference server started: window {self.batch_window * 1000:.1f} ms, "
+            f"max batch {self.max_batch}"
+        )
+        last_stats = time.monotonic()
+        while True:
+            try:
+                self.process(self.collect())
+            except redis.RedisError as e:
+                logger.error(f"Inference transport error: {e}")
+                time.sleep(1)
+            except Exception as e:
+                logger.exception(f"Inference loop error: {e}")
+            if time.monotonic() - last_stats >= self.stats_interval:
+                self.publish_stats()
+                last_stats = time.monotonic()
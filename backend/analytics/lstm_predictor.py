@@ -0,0 +1,146 @@
+"""
+Модуль быстрого инференса LSTM-модели.
+
+model.predict() на каждый запрос несёт накладные расходы Keras (создание
+итератора данных, callbacks, трассировка) — десятки миллисекунд на одно окно.
+LSTMPredictor загружает модель и скейлер один раз, компилирует tf.function
+с фиксированной сигнатурой (None, look_back, C) и прогревает граф при создании:
+последующие вызовы выполняют готовый граф за миллисекунды.
+
+Предиктор — загружаемый объект реестра для kind='lstm'
+(analytics.model_registry), поэтому в процессе он создаётся один раз
+и подменяется при публикации новой версии.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from .window_dataset import build_features
+
+logger = logging.getLogger(__name__)
+
+
+class LSTMPredictor:
+    """
+    Предсказание цены LSTM-моделью через скомпилированный граф.
+    """
+
+    def __init__(self, model, scaler, features=("close",), look_back=None):
+        """
+        :param model: Keras-модель
+        :param scaler: Массив [min_, scale_] MinMaxScaler (по каналам)
+        :param features: Имена каналов входа (analytics.window_dataset)
+        :param look_back: Длина окна (по умолчанию из input_shape модели)
+        """
+        import tensorflow as tf
+
+        self.model = model
+        self.features = tuple(features)
+        self.look_back = look_back or model.input_shape[1]
+        scaler = np.asarray(scaler, dtype=np.float32).reshape(2, -1)
+        self.scale_min, self.scale = scaler[0], scaler[1]
+        self.latencies = deque(maxlen=10000)
+        self.last_latency_ms = None
+
+        signature = tf.TensorSpec(
+            shape=(None, self.look_back, len(self.features)), dtype=tf.float32
+        )
+        self._forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[signature],
+            reduce_retracing=True,
+        )
+        # Прогрев: трассировка графа при загрузке, а не на первом запросе
+        self._forward(
+            np.zeros((1, self.look_back, len(self.features)), dtype=np.float32)
+        )
+
+    @classmethod
+    def from_files(cls, model_path, scaler_path=None, features_path=None):
+        """
+        Загрузить пару lstm_model.h5 / scaler.npy (и features.json, если есть).
+
+        :param model_path: Путь к файлу модели
+        :param scaler_path: Путь к scaler.npy (по умолчанию рядом с моделью)
+        :param features_path: Путь к features.json (по умолчанию рядом с моделью)
+        :return: LSTMPredictor
+        """
+        from tensorflow.keras.models import load_model
+
+        directory = os.path.dirname(model_path)
+        scaler_path = scaler_path or os.path.join(directory, "scaler.npy")
+        features_path = features_path or os.path.join(directory, "features.json")
+
+        model = load_model(model_path, compile=False)
+        scaler = np.load(scaler_path)
+        features, look_back = ("close",), None
+        if os.path.exists(features_path):
+            with open(features_path) as f:
+                meta = json.load(f)
+            features = meta.get("features", features)
+            look_back = meta.get("look_back")
+        return cls(model, scaler, features, look_back)
+
+    def prepare_window(self, close):
+        """
+        Окно входа модели по истории цен закрытия.
+
+        :param close: Цены закрытия; нужно не меньше look_back точек после
+            прогрева индикаторов
+        :return: Массив float32 (look_back, C) в масштабе скейлера
+        """
+        matrix = build_features(close, self.features)
+        if len(matrix) < self.look_back:
+            raise ValueError(
+                f"Need {self.look_back} points after indicator warm-up, got {len(matrix)}"
+            )
+        return matrix[-self.look_back :] * self.scale + self.scale_min
+
+    def predict_batch(self, windows):
+        """
+        Предсказание для батча окон одним вызовом графа.
+
+        :param windows: Массив (N, look_back, C) из prepare_window()
+        :return: Предсказанные цены закрытия (N,)
+        """
+        started = time.perf_counter()
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[None]
+        scaled = self._forward(windows).numpy().reshape(-1)
+        # Цель — первый канал (close): обратное преобразование только по нему
+        prices = (scaled - self.scale_min[0]) / self.scale[0]
+        self.last_latency_ms = (time.perf_counter() - started) * 1000
+        self.latencies.append(self.last_latency_ms)
+        return prices
+
+    def predict(self, close):
+        """
+        Предсказание следующей цены по истории цен закрытия одного символа.
+
+        :param close: Цены закрытия
+        :return: Предсказанная цена
+        """
+        return float(self.predict_batch(self.prepare_window(close))[0])
+
+    def stats(self):
+        """
+        Задержка вызовов predict_batch.
+
+        :return: Словарь: p50_ms, p99_ms, last_ms, calls
+        """
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, float), [50, 99])
+        else:
+            p50 = p99 = 0.0
+        return {
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3),
+            "last_ms": round(self.last_latency_ms or 0.0, 3),
+            "calls": len(self.latencies),
+        }
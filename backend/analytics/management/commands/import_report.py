@@ -0,0 +1,134 @@
+"""
+Management-команда для отчёта о стоимости импорта модулей приложений.
+
+Каждый модуль импортируется в отдельном чистом процессе после django.setup(),
+поэтому время — это холодный старт модуля со всеми его зависимостями.
+Для каждого модуля выводятся время импорта, прирост памяти и тяжёлые
+пакеты (TensorFlow, torch, ...), которые он подтягивает.
+
+Пример:
+    python manage.py import_report
+    python manage.py import_report analytics.tasks api.views --json
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Пакеты, импорт которых заметен по времени и памяти
+HEAVY_PACKAGES = (
+    "tensorflow",
+    "torch",
+    "stable_baselines3",
+    "gym",
+    "gymnasium",
+    "sklearn",
+    "pandas",
+    "textblob",
+    "ccxt",
+    "boto3",
+)
+
+# Импорт одного модуля в чистом процессе; результат — JSON в stdout
+_PROBE = """
+import importlib, json, resource, sys, time
+import django
+
+django.setup()
+heavy = sys.argv[2].split(",")
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+error = None
+try:
+    importlib.import_module(sys.argv[1])
+except Exception as e:
+    error = repr(e)
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024,
+    "heavy": [name for name in heavy if name in sys.modules],
+    "error": error,
+}))
+"""
+
+
+def app_modules():
+    """Модули верхнего уровня локальных приложений проекта (models, views, tasks, ...)."""
+    base_dir = os.path.realpath(str(settings.BASE_DIR))
+    modules = []
+    for config in apps.get_app_configs():
+        if not os.path.realpath(config.path).startswith(base_dir):
+            continue
+        for filename in sorted(os.listdir(config.path)):
+            name, ext = os.path.splitext(filename)
+            if ext == ".py" and name != "__init__":
+                modules.append(f"{config.name}.{name}")
+    return modules
+
+
+def probe(module):
+    """
+    Холодный импорт модуля в отдельном процессе.
+
+    :param module: Имя модуля
+    :return: Словарь: seconds, rss_mb, heavy, error
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, module, ",".join(HEAVY_PACKAGES)],
+        capture_output=True,
+        text=True,
+        cwd=str(settings.BASE_DIR),
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "BitHunter.settings"
+            ),
+        },
+    )
+    lines = result.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        error = result.stderr.strip().splitlines()
+        return {
+            "seconds": None,
+            "rss_mb": None,
+            "heavy": [],
+            "error": error[-1] if error else "probe failed",
+        }
+
+
+class Command(BaseCommand):
+    help = "Холодное время импорта модулей приложений и тяжёлые зависимости, которые они тянут"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules",
+            nargs="*",
+            help="Модули для проверки (по умолчанию все модули приложений проекта)",
+        )
+        parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or app_modules()
+        report = {module: probe(module) for module in modules}
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        ordered = sorted(report.items(), key=lambda item: -(item[1]["seconds"] or 0))
+        width = max(len(module) for module in modules)
+        self.stdout.write(f"{'module':<{width}}  {'seconds':>8}  {'rss_mb':>8}  heavy")
+        for module, row in ordered:
+            if row["error"]:
+                self.stdout.write(self.style.ERROR(f"{module:<{width}}  {row['error']}"))
+                continue
+            self.stdout.write(
+                f"{module:<{width}}  {row['seconds']:>8.3f}  {row['rss_mb']:>8.1f}  "
+                f"{', '.join(row['heavy']) or '-'}"
+            )
@@ -0,0 +1,40 @@
+"""
+Management-команда для запуска сервиса пакетного инференса RL-моделей.
+
+Пример:
+    python manage.py run_inference_server --window-ms 5 --max-batch 256
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.inference import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Долгоживущий сервис инференса: микробатчинг запросов стратегий через Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window-ms",
+            type=float,
+            default=None,
+            help="Окно сбора батча после первого запроса, мс",
+        )
+        parser.add_argument("--max-batch", type=int, default=None)
+        parser.add_argument(
+            "--stats-interval",
+            type=float,
+            default=10.0,
+            help="Период публикации p50/p99 и пропускной способности, секунды",
+        )
+
+    def handle(self, *args, **options):
+        server = InferenceServer(
+            batch_window_ms=options["window_ms"],
+            max_batch=options["max_batch"],
+            stats_interval=options["stats_interval"],
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(str(server.publish_stats()))
@@ -0,0 +1,44 @@
+"""
+Management-команда для запуска потока цен одной биржи.
+
+Пример:
+    python manage.py run_price_ingestor --exchange binance --interval 2
+    python manage.py run_price_ingestor --fake --symbols BTC/USDT ETH/USDT
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.price_stream import FakeExchange, PriceIngestor
+
+
+class Command(BaseCommand):
+    help = "Долгоживущий опрос тикеров биржи: последние цены в Redis и тики в channel layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exchange", default="binance", help="Биржа ccxt")
+        parser.add_argument(
+            "--symbols",
+            nargs="*",
+            default=None,
+            help="Символы (по умолчанию символы активных стратегий и алертов)",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=None, help="Период опроса, секунды"
+        )
+        parser.add_argument(
+            "--fake",
+            action="store_true",
+            help="Локальная биржа со случайным блужданием цен вместо ccxt",
+        )
+
+    def handle(self, *args, **options):
+        ingestor = PriceIngestor(
+            exchange=options["exchange"],
+            symbols=options["symbols"],
+            interval=options["interval"],
+            client=FakeExchange() if options["fake"] else None,
+        )
+        try:
+            ingestor.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,69 @@
+"""
+Management-команда для перебора параметров TradingEnv на истории символа.
+
+История берётся из локального ряда MarketDataset (его наполняет синхронизация OHLCV).
+
+Пример:
+    python manage.py sweep_env_params BTC/USDT --start 2024-01-01 --end 2025-01-01 \
+        --stop-loss 0.02 0.05 --take-profit 0.05 0.1 --hold-penalty 0 0.1 --workers 8
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.tasks import sweep_env_parameters
+
+
+class Command(BaseCommand):
+    help = "Параллельный перебор stop_loss / take_profit / hold_penalty с рейтингом по Sharpe"
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbol", help="Символ актива, например BTC/USDT")
+        parser.add_argument("--start", required=True, help="Начало периода (ISO-дата)")
+        parser.add_argument("--end", required=True, help="Конец периода (ISO-дата)")
+        parser.add_argument("--timeframe", default="1h")
+        parser.add_argument("--exchange", default="binance")
+        parser.add_argument(
+            "--stop-loss", nargs="+", type=float, default=[0.02, 0.05, 0.1]
+        )
+        parser.add_argument(
+            "--take-profit", nargs="+", type=float, default=[0.05, 0.1, 0.2]
+        )
+        parser.add_argument(
+            "--hold-penalty", nargs="+", type=float, default=[0.0, 0.1, 0.5]
+        )
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Выполняется в текущем процессе, без брокера
+        table = sweep_env_parameters(
+            options["symbol"],
+            options["start"],
+            options["end"],
+            timeframe=options["timeframe"],
+            stop_losses=options["stop_loss"],
+            take_profits=options["take_profit"],
+            hold_penalties=options["hold_penalty"],
+            workers=options["workers"],
+            top=options["top"],
+            exchange=options["exchange"],
+        )
+        if isinstance(table, str):
+            raise CommandError(table)
+
+        self.stdout.write(
+            "Действия модели посчитаны один раз и одинаковы для всех параметров: "
+            "оценивается фиксированная последовательность сигналов, а не реакция "
+            "политики на выходы по SL/TP."
+        )
+        self.stdout.write(
+            f"{'stop_loss':>10} {'take_profit':>12} {'hold_pen':>9} "
+            f"{'sharpe':>8} {'max_dd':>8} {'var_95':>9} {'final_balance':>14}"
+        )
+        for row in table:
+            self.stdout.write(
+                f"{row['stop_loss']:>10.4f} {row['take_profit']:>12.4f} "
+                f"{row['hold_penalty']:>9.3f} {row['sharpe_ratio']:>8.3f} "
+                f"{row['max_drawdown']:>8.4f} {row['var_95']:>9.5f} "
+                f"{row['final_balance']:>14.2f}"
+            )
@@ -0,0 +1,46 @@
+"""
+Management-команда для параллельного обучения PPO на нескольких символах.
+
+В отличие от задачи Celery в prefork-воркере, команда выполняется в обычном
+(не демоническом) процессе, поэтому среды обучаются в SubprocVecEnv.
+
+Пример:
+    python manage.py train_multi_symbol BTC/USDT ETH/USDT SOL/USDT \
+        --episode-lengths 512 2048 --timesteps 500000 --workers 8
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.tasks import train_multi_symbol
+
+
+class Command(BaseCommand):
+    help = "Обучение общей PPO-модели на нескольких символах в параллельных процессах"
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbols", nargs="+", help="Символы, например BTC/USDT")
+        parser.add_argument("--timeframe", default="1h")
+        parser.add_argument("--exchange", default="binance")
+        parser.add_argument(
+            "--episode-lengths",
+            nargs="+",
+            type=int,
+            default=None,
+            help="Длины эпизода (по умолчанию весь ряд)",
+        )
+        parser.add_argument("--timesteps", type=int, default=100000)
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        # Выполняется в текущем процессе, без брокера
+        result = train_multi_symbol(
+            options["symbols"],
+            timeframe=options["timeframe"],
+            exchange=options["exchange"],
+            episode_lengths=options["episode_lengths"] or (None,),
+            total_timesteps=options["timesteps"],
+            workers=options["workers"],
+        )
+        if not result.startswith("Multi-symbol model trained"):
+            raise CommandError(result)
+        self.stdout.write(result)
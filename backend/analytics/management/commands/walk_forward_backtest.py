@@ -0,0 +1,61 @@
+"""
+Management-команда для walk-forward backtesting PPO-модели на истории символа.
+
+В отличие от задачи Celery в prefork-воркере, окна считаются в пуле процессов.
+
+Пример:
+    python manage.py walk_forward_backtest BTC/USDT --start 2023-01-01 --end 2025-01-01 \
+        --train-size 2000 --test-size 500 --workers 8
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.tasks import walk_forward_backtest
+
+
+class Command(BaseCommand):
+    help = "Walk-forward backtesting по скользящим окнам train/test в пуле процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbol", help="Символ актива, например BTC/USDT")
+        parser.add_argument("--start", required=True, help="Начало периода (ISO-дата)")
+        parser.add_argument("--end", required=True, help="Конец периода (ISO-дата)")
+        parser.add_argument("--timeframe", default="1h")
+        parser.add_argument("--train-size", type=int, default=2000)
+        parser.add_argument("--test-size", type=int, default=500)
+        parser.add_argument("--step", type=int, default=None)
+        parser.add_argument(
+            "--retrain", action="store_true", help="Дообучать модель на каждом окне"
+        )
+        parser.add_argument("--train-timesteps", type=int, default=10000)
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        # Выполняется в текущем процессе, без брокера
+        report = walk_forward_backtest(
+            options["symbol"],
+            options["start"],
+            options["end"],
+            timeframe=options["timeframe"],
+            train_size=options["train_size"],
+            test_size=options["test_size"],
+            step=options["step"],
+            retrain=options["retrain"],
+            train_timesteps=options["train_timesteps"],
+            workers=options["workers"],
+        )
+        if isinstance(report, str):
+            raise CommandError(report)
+
+        self.stdout.write(
+            f"{'train_start':>12} {'test_start':>11} {'test_end':>9} "
+            f"{'sharpe':>8} {'max_dd':>8} {'final_balance':>14}"
+        )
+        for row in report["windows"]:
+            self.stdout.write(
+                f"{row['train_start']:>12} {row['test_start']:>11} {row['test_end']:>9} "
+                f"{row['sharpe_ratio']:>8.3f} {row['max_drawdown']:>8.4f} "
+                f"{row['final_balance']:>14.2f}"
+            )
+        for name, value in report["summary"].items():
+            self.stdout.write(f"{name}: {value}")
@@ -0,0 +1,70 @@
+"""
+Модуль загрузки рыночных данных (OHLCV) за диапазон дат.
+
+Используется задачами, которым нужен ценовой ряд по символу и периоду
+(перебор параметров TradingEnv, backtesting).
+"""
+
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def to_milliseconds(value):
+    """
+    Приводит дату к timestamp в миллисекундах.
+
+    :param value: datetime, ISO-строка ('2024-01-01' или с временем) или число миллисекунд
+    :return: int, миллисекунды UTC
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def fetch_ohlcv_range(symbol, since, until, timeframe="1h", exchange=None, limit=1000):
+    """
+    Загружает свечи за период постранично через fetch_ohlcv(since=...).
+
+    :param symbol: Символ актива (например, 'BTC/USDT')
+    :param since: Начало периода, timestamp в миллисекундах
+    :param until: Конец периода (не включительно), timestamp в миллисекундах
+    :param timeframe: Временной интервал
+    :param exchange: Экземпляр ccxt-биржи (по умолчанию binance)
+    :param limit: Размер страницы
+    :return: Массив float64 формы (T, 6) с колонками OHLCV_COLUMNS
+    """
+    if exchange is None:
+        from .exchange_pool import get_exchange
+
+        exchange = get_exchange("binance")
+    pages = []
+    cursor = since
+    while cursor < until:
+        page = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=limit)
+        if not page:
+            break
+        pages.append(np.asarray(page, dtype=np.float64))
+        last_ts = int(page[-1][0])
+        if last_ts < cursor:
+            break
+        cursor = last_ts + 1
+
+    if not pages:
+        return np.empty((0, len(OHLCV_COLUMNS)))
+
+    data = np.concatenate(pages)
+    data = data[data[:, 0] < until]
+    # Страницы могут пересекаться на границе
+    _, unique_idx = np.unique(data[:, 0], return_index=True)
+    logger.info(f"Loaded {len(unique_idx)} candles for {symbol} {timeframe}")
+    return data[unique_idx]
@@ -0,0 +1,188 @@
+"""
+Модуль колоночного on-disk хранилища рыночных данных (OHLCV).
+
+Каждый ряд (биржа, символ, таймфрейм) хранится в отдельной директории:
+по одному бинарному файлу на колонку и meta.json с длиной ряда и dtype.
+Колонки открываются через np.memmap без копирования, поэтому несколько
+процессов обучения используют одни и те же страницы через кэш ОС.
+
+Запись только дописывает новые свечи в конец файлов; длина в meta.json
+обновляется атомарно после записи данных, так что читатели всегда видят
+согласованный ряд. Писатели ряда из разных процессов сериализуются
+блокировкой fcntl.flock на файле .lock в директории ряда.
+"""
+
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "timestamp": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """
+    Межпроцессная блокировка (fcntl.flock) на файле path.
+
+    Блокировка снимается при выходе из блока или при завершении процесса.
+
+    :param path: Путь к файлу блокировки (создаётся при необходимости)
+    :param shared: Разделяемая блокировка (читатели) вместо эксклюзивной
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def market_data_root():
+    """Корневая директория хранилища (settings.MARKET_DATA_DIR)."""
+    return getattr(
+        settings, "MARKET_DATA_DIR", os.path.join(settings.BASE_DIR, "market_data")
+    )
+
+
+class MarketDataset:
+    """
+    Ряд OHLCV одной биржи, символа и таймфрейма на диске.
+    """
+
+    def __init__(self, symbol, timeframe="1h", exchange="binance", root=None):
+        """
+        :param symbol: Символ актива (например, 'BTC/USDT')
+        :param timeframe: Временной интервал
+        :param exchange: Название биржи ccxt
+        :param root: Корневая директория (по умолчанию market_data_root())
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange = exchange
+        self.path = os.path.join(
+            root or market_data_root(),
+            exchange,
+            symbol.replace("/", "_"),
+            timeframe,
+        )
+
+    def _column_path(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def exists(self):
+        return os.path.exists(self._meta_path())
+
+    def __len__(self):
+        if not self.exists():
+            return 0
+        with open(self._meta_path()) as f:
+            return json.load(f)["length"]
+
+    def last_timestamp(self):
+        """Timestamp последней свечи (мс) или None для пустого ряда."""
+        length = len(self)
+        if not length:
+            return None
+        column = np.memmap(
+            self._column_path("timestamp"),
+            dtype=COLUMNS["timestamp"],
+            mode="r",
+            offset=(length - 1) * COLUMNS["timestamp"].itemsize,
+            shape=(1,),
+        )
+        return int(column[0])
+
+    def append(self, ohlcv):
+        """
+        Дописать свечи в конец ряда. Свечи не новее последней сохранённой отбрасываются.
+
+        :param ohlcv: Список или массив строк [timestamp, open, high, low, close, volume]
+        :return: Количество дописанных свечей
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(COLUMNS))
+        if len(rows) == 0:
+            return 0
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        _, unique_idx = np.unique(rows[:, 0], return_index=True)
+        rows = rows[unique_idx]
+
+        # Длина, отметка, колонки и meta.json — под одной блокировкой ряда
+        with file_lock(os.path.join(self.path, ".lock")):
+            last_ts = self.last_timestamp()
+            if last_ts is not None:
+                rows = rows[rows[:, 0] > last_ts]
+            if len(rows) == 0:
+                return 0
+
+            length = len(self)
+            for i, (column, dtype) in enumerate(COLUMNS.items()):
+                with open(self._column_path(column), "r+b" if length else "wb") as f:
+                    # Обрезаем хвост, оставшийся от прерванной записи
+                    f.truncate(length * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(rows[:, i].astype(dtype).tobytes())
+
+            meta = {
+                "length": length + len(rows),
+                "columns": {column: dtype.str for column, dtype in COLUMNS.items()},
+            }
+            tmp_path = f"{self._meta_path()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path())
+
+        logger.info(f"Appended {len(rows)} candles to {self.path}")
+        return len(rows)
+
+    def open(self, columns=("timestamp", "close", "volume")):
+        """
+        Открыть колонки только для чтения через np.memmap (без копирования).
+
+        :param columns: Имена колонок
+        :return: Словарь {колонка: np.memmap}
+        """
+        length = len(self)
+        if not length:
+            raise FileNotFoundError(f"Market dataset is empty: {self.path}")
+        return {
+            column: np.memmap(
+                self._column_path(column),
+                dtype=COLUMNS[column],
+                mode="r",
+                shape=(length,),
+            )
+            for column in columns
+        }
+
+    def open_range(self, since, until, columns=("timestamp", "close", "volume")):
+        """
+        Колонки свечей периода [since, until) как срезы np.memmap (без копирования).
+
+        :param since: Начало периода, timestamp в мс
+        :param until: Конец периода (не включительно), timestamp в мс
+        :param columns: Имена колонок
+        :return: Словарь {колонка: срез np.memmap} (пустые срезы, если свечей нет)
+        """
+        opened = self.open(tuple(dict.fromkeys(("timestamp",) + tuple(columns))))
+        timestamps = opened["timestamp"]
+        start = int(np.searchsorted(timestamps, since, side="left"))
+        end = int(np.searchsorted(timestamps, until, side="left"))
+        return {column: opened[column][start:end] for column in columns}
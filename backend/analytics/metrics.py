@@ -0,0 +1,259 @@
+"""
+Модуль метрик производительности стратегий.
+
+Все функции принимают одномерный ряд (T,) или матрицу (N, T) из N рядов
+и считают метрики массовыми операциями NumPy по оси времени, без циклов
+Python. Для одномерного входа возвращается число, для матрицы — массив длины N.
+
+Используется векторизированным backtesting (analytics.backtest),
+TradingEnv.backtest() и метриками стратегий (trading.tasks.calculate_metrics).
+"""
+
+import numpy as np
+
+# Годовая нормировка Sharpe/Sortino/Calmar (торговые дни)
+PERIODS_PER_YEAR = 252
+
+
+def _as_2d(values):
+    """
+    :return: Кортеж (матрица float64 (N, T), был ли вход одномерным)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    single = values.ndim == 1
+    values = np.atleast_2d(values)
+    if values.ndim != 2:
+        raise ValueError("values must be a 1D array or a 2D matrix")
+    return values, single
+
+
+def _output(value, single):
+    return value[0].item() if single else value
+
+
+def _returns(equity):
+    return np.diff(equity, axis=1) / equity[:, :-1]
+
+
+def _drawdown(equity):
+    """Глубина и длительность (в шагах) максимальной просадки."""
+    if equity.shape[1] == 0:
+        zeros = np.zeros(len(equity))
+        return zeros, zeros.astype(np.int64)
+    peak = np.maximum.accumulate(equity, axis=1)
+    depth = np.max((peak - equity) / peak, axis=1)
+    # Длительность: шагов с момента последнего обновления пика
+    steps = np.arange(equity.shape[1])
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, steps, 0), axis=1)
+    duration = np.max(steps - last_peak, axis=1)
+    return depth, duration
+
+
+def _sharpe(returns, periods_per_year):
+    mean = np.mean(returns, axis=1)
+    std = np.std(returns, axis=1)
+    return np.divide(mean, std, out=np.zeros(len(std)), where=std > 0) * np.sqrt(
+        periods_per_year
+    )
+
+
+def _sortino(returns, periods_per_year):
+    mean = np.mean(returns, axis=1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=1))
+    return np.divide(
+        mean, downside, out=np.zeros(len(downside)), where=downside > 0
+    ) * np.sqrt(periods_per_year)
+
+
+def _calmar(equity, depth, periods_per_year):
+    num_periods = equity.shape[1] - 1
+    if num_periods < 1:
+        return np.zeros(len(equity))
+    growth = equity[:, -1] / equity[:, 0]
+    annual_return = (
+        np.power(np.maximum(growth, 0), periods_per_year / num_periods) - 1
+    )
+    return np.divide(
+        annual_return, depth, out=np.zeros(len(depth)), where=depth > 0
+    )
+
+
+def _var_cvar(returns, level):
+    # round: (1 - 0.95) * 100 даёт 5.000000000000004
+    var = np.percentile(returns, round((1 - level) * 100, 10), axis=1)
+    tail = returns <= var[:, None]
+    cvar = np.sum(returns, axis=1, where=tail) / np.count_nonzero(tail, axis=1)
+    return var, cvar
+
+
+def _win_rate(pnl, ignore_zero):
+    wins = np.count_nonzero(pnl > 0, axis=1)
+    if ignore_zero:
+        total = np.count_nonzero(pnl, axis=1)
+    else:
+        total = np.full(len(pnl), pnl.shape[1])
+    return np.divide(wins, total, out=np.zeros(len(wins)), where=total > 0)
+
+
+def _turnover(positions):
+    changes = np.abs(np.diff(positions, axis=1, prepend=0))
+    return changes.mean(axis=1) if positions.shape[1] else np.zeros(len(positions))
+
+
+def equity_to_returns(equity):
+    """
+    Доходности по шагам из ряда капитала.
+
+    :param equity: Капитал (T,) или (N, T)
+    :return: Доходности (T - 1,) или (N, T - 1)
+    """
+    equity, single = _as_2d(equity)
+    returns = _returns(equity)
+    return returns[0] if single else returns
+
+
+def max_drawdown(equity):
+    """
+    Максимальная просадка и её длительность.
+
+    :param equity: Капитал (T,) или (N, T)
+    :return: Кортеж (глубина в долях от пика, длительность в шагах)
+    """
+    equity, single = _as_2d(equity)
+    depth, duration = _drawdown(equity)
+    return _output(depth, single), _output(duration, single)
+
+
+def sharpe_ratio(returns, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Годовой Sharpe ratio (безрисковая ставка 0); 0 при нулевой волатильности.
+
+    :param returns: Доходности (T,) или (N, T)
+    """
+    returns, single = _as_2d(returns)
+    return _output(_sharpe(returns, periods_per_year), single)
+
+
+def sortino_ratio(returns, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Годовой Sortino ratio: как Sharpe, но риск — только отрицательные доходности.
+
+    :param returns: Доходности (T,) или (N, T)
+    """
+    returns, single = _as_2d(returns)
+    return _output(_sortino(returns, periods_per_year), single)
+
+
+def calmar_ratio(equity, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Calmar ratio: годовая доходность, делённая на максимальную просадку.
+
+    :param equity: Капитал (T,) или (N, T)
+    """
+    equity, single = _as_2d(equity)
+    depth, _ = _drawdown(equity)
+    return _output(_calmar(equity, depth, periods_per_year), single)
+
+
+def value_at_risk(returns, level=0.95):
+    """
+    Исторические VaR и CVaR (expected shortfall).
+
+    :param returns: Доходности (T,) или (N, T)
+    :param level: Уровень доверия
+    :return: Кортеж (VaR, CVaR) — доходности на нижнем квантиле и средняя за ним
+    """
+    returns, single = _as_2d(returns)
+    var, cvar = _var_cvar(returns, level)
+    return _output(var, single), _output(cvar, single)
+
+
+def win_rate(pnl, ignore_zero=True):
+    """
+    Доля прибыльных значений.
+
+    :param pnl: Прибыль по сделкам или наградам (T,) или (N, T)
+    :param ignore_zero: Не учитывать нулевые значения в знаменателе
+    """
+    pnl, single = _as_2d(pnl)
+    return _output(_win_rate(pnl, ignore_zero), single)
+
+
+def turnover(positions):
+    """
+    Средний модуль изменения позиции за шаг (начальная позиция — 0).
+
+    :param positions: Позиции (T,) или (N, T)
+    """
+    positions, single = _as_2d(positions)
+    return _output(_turnover(positions), single)
+
+
+def compute_metrics(
+    equity=None,
+    returns=None,
+    positions=None,
+    pnl=None,
+    periods_per_year=PERIODS_PER_YEAR,
+    var_level=0.95,
+):
+    """
+    Все метрики за один проход по общим промежуточным массивам.
+
+    Нужен equity или returns; без equity капитал восстанавливается из
+    доходностей от 1.0.
+
+    :param equity: Капитал (T,) или (N, T)
+    :param returns: Доходности (T,) или (N, T)
+    :param positions: Позиции для turnover (опционально)
+    :param pnl: Прибыль по сделкам/шагам для win_rate (опционально)
+    :param periods_per_year: Периодов в году для годовой нормировки
+    :param var_level: Уровень доверия VaR/CVaR
+    :return: Словарь: total_return, sharpe_ratio, sortino_ratio, calmar_ratio,
+             max_drawdown, max_drawdown_duration, var, cvar
+             (+ win_rate и turnover, если переданы pnl и positions)
+    """
+    if equity is not None:
+        equity, single = _as_2d(equity)
+        returns = _returns(equity)
+    elif returns is not None:
+        returns, single = _as_2d(returns)
+        equity = np.cumprod(
+            np.hstack([np.ones((len(returns), 1)), 1 + returns]), axis=1
+        )
+    else:
+        raise ValueError("equity or returns is required")
+
+    count = len(equity)
+    depth, duration = _drawdown(equity)
+    if returns.shape[1]:
+        var, cvar = _var_cvar(returns, var_level)
+        total_return = equity[:, -1] / equity[:, 0] - 1
+        metrics = {
+            "total_return": total_return,
+            "sharpe_ratio": _sharpe(returns, periods_per_year),
+            "sortino_ratio": _sortino(returns, periods_per_year),
+            "calmar_ratio": _calmar(equity, depth, periods_per_year),
+        }
+    else:
+        var = cvar = np.zeros(count)
+        metrics = {
+            key: np.zeros(count)
+            for key in ("total_return", "sharpe_ratio", "sortino_ratio", "calmar_ratio")
+        }
+    metrics.update(
+        {
+            "max_drawdown": depth,
+            "max_drawdown_duration": duration,
+            "var": var,
+            "cvar": cvar,
+        }
+    )
+    if pnl is not None:
+        metrics["win_rate"] = _win_rate(_as_2d(pnl)[0], ignore_zero=True)
+    if positions is not None:
+        metrics["turnover"] = _turnover(_as_2d(positions)[0])
+
+    if single:
+        return {key: value[0].item() for key, value in metrics.items()}
+    return metrics
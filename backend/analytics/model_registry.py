@@ -0,0 +1,351 @@
+"""
+Модуль реестра версий моделей (PPO, LSTM).
+
+Модели хранятся по ключу (symbol, timeframe, strategy, kind) в директориях
+версий:
+
+    MODEL_REGISTRY_DIR/<kind>/<SYMBOL_QUOTE>/<timeframe>/<strategy>/v<N>/
+
+Публикация пишет артефакты во временную директорию, атомарно переименовывает
+её в v<N> и только затем сдвигает указатель последней версии (файл LATEST
+и ключ в Redis через Django cache). Читатель никогда не видит недописанную версию.
+
+В каждом процессе ModelRegistry держит ограниченный LRU загруженных моделей.
+Новая версия обнаруживается не чаще раза в check_interval секунд одним
+запросом к Redis (или stat файла LATEST) и подменяет старую атомарно:
+вызывающий код получает либо старую, либо полностью загруженную новую модель.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .market_dataset import file_lock
+
+logger = logging.getLogger(__name__)
+
+ModelKey = namedtuple("ModelKey", ["symbol", "timeframe", "strategy", "kind"])
+
+DEFAULT_SYMBOL = "default"
+DEFAULT_STRATEGY = "default"
+# Файл модели до появления реестра; используется, пока не опубликована ни одна версия
+LEGACY_PPO_PATH = "ppo_trading_model.zip"
+
+
+def _load_ppo(path):
+    from stable_baselines3 import PPO
+
+    return PPO.load(path)
+
+
+def _load_lstm(path):
+    from .lstm_predictor import LSTMPredictor
+
+    return LSTMPredictor.from_files(path)
+
+
+# kind -> (имя файла модели в директории версии, загрузчик)
+MODEL_KINDS = {
+    "ppo": ("model.zip", _load_ppo),
+    "lstm": ("model.h5", _load_lstm),
+}
+
+
+def make_key(symbol=None, timeframe="1h", strategy=None, kind="ppo"):
+    """
+    Ключ модели в реестре.
+
+    :param symbol: Символ актива (None — общая модель)
+    :param timeframe: Временной интервал
+    :param strategy: ID или имя стратегии (None — общая модель)
+    :param kind: Тип модели: 'ppo' или 'lstm'
+    :return: ModelKey
+    """
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown model kind: {kind}")
+    return ModelKey(
+        symbol or DEFAULT_SYMBOL, timeframe, str(strategy or DEFAULT_STRATEGY), kind
+    )
+
+
+def fallback_keys(key):
+    """
+    Ключи для поиска модели: модель стратегии, затем общая модель символа,
+    затем общая модель.
+    """
+    keys = [key]
+    if key.strategy != DEFAULT_STRATEGY:
+        keys.append(key._replace(strategy=DEFAULT_STRATEGY))
+    if key.symbol != DEFAULT_SYMBOL:
+        keys.append(key._replace(symbol=DEFAULT_SYMBOL, strategy=DEFAULT_STRATEGY))
+    return keys
+
+
+def registry_root():
+    """Корневая директория реестра (settings.MODEL_REGISTRY_DIR)."""
+    return getattr(
+        settings,
+        "MODEL_REGISTRY_DIR",
+        os.path.join(settings.BASE_DIR, "models", "registry"),
+    )
+
+
+class ModelRegistry:
+    """
+    Реестр версий моделей с LRU-кэшем загруженных моделей процесса.
+    """
+
+    def __init__(self, root=None, max_models=None, check_interval=None):
+        """
+        :param root: Корневая директория (по умолчанию registry_root())
+        :param max_models: Максимум загруженных моделей в процессе
+        :param check_interval: Минимальный интервал проверки новой версии, секунды
+        """
+        self.root = root or registry_root()
+        self.max_models = max_models or getattr(
+            settings, "MODEL_REGISTRY_MAX_MODELS", 32
+        )
+        if check_interval is None:
+            check_interval = getattr(settings, "MODEL_REGISTRY_CHECK_INTERVAL", 5.0)
+        self.check_interval = check_interval
+
+        # (ModelKey, version) -> модель, порядок — от давно использованных к недавним
+        self._models = OrderedDict()
+        # ModelKey -> (время проверки, версия, mtime_ns файла LATEST)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def key_path(self, key):
+        return os.path.join(
+            self.root, key.kind, key.symbol.replace("/", "_"), key.timeframe, key.strategy
+        )
+
+    def version_path(self, key, version):
+        return os.path.join(self.key_path(key), f"v{version}")
+
+    def _pointer_path(self, key):
+        return os.path.join(self.key_path(key), "LATEST")
+
+    @staticmethod
+    def _cache_key(key):
+        return "model_registry:" + ":".join(key)
+
+    def versions(self, key):
+        """Опубликованные версии ключа по возрастанию."""
+        try:
+            names = os.listdir(self.key_path(key))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(name[1:]) for name in names if name.startswith("v") and name[1:].isdigit()
+        )
+
+    def publish(self, key, save, model=None):
+        """
+        Опубликовать новую версию модели.
+
+        :param key: ModelKey
+        :param save: Функция save(directory), записывающая артефакты версии
+        :param model: Уже загруженная модель этой версии — сразу кладётся в LRU
+        :return: Номер опубликованной версии
+        """
+        base = self.key_path(key)
+        os.makedirs(base, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".publish-", dir=base)
+        try:
+            save(tmp_dir)
+            version = (self.versions(key) or [0])[-1] + 1
+            while True:
+                try:
+                    os.rename(tmp_dir, self.version_path(key, version))
+                    break
+                except OSError:
+                    # Версию занял параллельный публикатор
+                    if not os.path.exists(self.version_path(key, version)):
+                        raise
+                    version += 1
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._write_pointer(key, version)
+        if model is not None:
+            self._store(key, version, model)
+        logger.info(f"Published model {key} version {version}")
+        return version
+
+    def publish_model(self, key, model):
+        """Опубликовать PPO-модель (или любую модель с методом save(path))."""
+        filename, _ = MODEL_KINDS[key.kind]
+        return self.publish(
+            key, lambda directory: model.save(os.path.join(directory, filename)), model
+        )
+
+    def publish_files(self, key, model_file, extra_files=()):
+        """
+        Опубликовать уже сохранённые на диск артефакты (например, LSTM и scaler).
+
+        :param model_file: Путь к файлу модели
+        :param extra_files: Дополнительные файлы версии (копируются с теми же именами)
+        """
+        filename, _ = MODEL_KINDS[key.kind]
+
+        def save(directory):
+            shutil.copyfile(model_file, os.path.join(directory, filename))
+            for path in extra_files:
+                shutil.copyfile(path, os.path.join(directory, os.path.basename(path)))
+
+        return self.publish(key, save)
+
+    def _write_pointer(self, key, version):
+        # Сравнение и замена указателя — под файловой блокировкой ключа, иначе
+        # два публикующих процесса могут сдвинуть указатель назад
+        pointer = self._pointer_path(key)
+        with file_lock(f"{pointer}.lock"):
+            current = self._read_file_pointer(key)
+            if current is not None and current >= version:
+                return
+            tmp_path = f"{pointer}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(str(version))
+            os.replace(tmp_path, pointer)
+            try:
+                cache.set(self._cache_key(key), version, timeout=None)
+            except Exception as e:
+                logger.warning(f"Could not update model version pointer in cache: {e}")
+
+    def _read_file_pointer(self, key):
+        try:
+            with open(self._pointer_path(key)) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def latest_version(self, key):
+        """
+        Последняя опубликованная версия (None, если версий нет).
+
+        Проверяется не чаще раза в check_interval секунд: сначала указатель
+        в Redis, при его отсутствии — mtime файла LATEST.
+        """
+        now = time.monotonic()
+        state = self._versions.get(key)
+        if state is not None and now - state[0] < self.check_interval:
+            return state[1]
+
+        try:
+            version = cache.get(self._cache_key(key))
+        except Exception:
+            version = None
+        mtime = None
+        if version is None:
+            try:
+                mtime = os.stat(self._pointer_path(key)).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is not None and state is not None and state[2] == mtime:
+                version = state[1]
+            elif mtime is not None:
+                version = self._read_file_pointer(key)
+
+        version = int(version) if version is not None else None
+        self._versions[key] = (now, version, mtime)
+        return version
+
+    def model_file(self, key, version=None):
+        """
+        Путь к файлу модели версии (по умолчанию последней).
+
+        :return: Путь или None, если модели нет
+        """
+        version = version or self.latest_version(key)
+        if version is None:
+            if key.kind == "ppo" and os.path.exists(LEGACY_PPO_PATH):
+                return LEGACY_PPO_PATH
+            return None
+        filename, _ = MODEL_KINDS[key.kind]
+        return os.path.join(self.version_path(key, version), filename)
+
+    def get(self, key, version=None):
+        """
+        Загруженная модель версии (по умолчанию последней), из LRU или с диска.
+
+        :param key: ModelKey
+        :param version: Конкретная версия (опционально)
+        :return: Модель (для LSTM — LSTMPredictor)
+        """
+        version = version or self.latest_version(key) or 0
+        with self._lock:
+            model = self._models.get((key, version))
+            if model is not None:
+                self._models.move_to_end((key, version))
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Загрузка одной модели не блокирует выдачу остальных
+        with load_lock:
+            with self._lock:
+                model = self._models.get((key, version))
+            if model is None:
+                path = self.model_file(key, version or None)
+                if path is None or not os.path.exists(path):
+                    raise FileNotFoundError(f"No published model for {key}")
+                _, loader = MODEL_KINDS[key.kind]
+                model = loader(path)
+                self._store(key, version, model)
+                logger.info(f"Loaded model {key} version {version}")
+        return model
+
+    def get_nearest(self, key):
+        """
+        Модель ключа или, если она не опубликована, ближайшая общая (fallback_keys()).
+
+        :param key: ModelKey
+        :return: Модель
+        """
+        keys = fallback_keys(key)
+        for candidate in keys:
+            if self.latest_version(candidate) is not None:
+                return self.get(candidate)
+        return self.get(keys[-1])
+
+    def _store(self, key, version, model):
+        """Положить модель в LRU, вытеснив старые версии ключа и лишние модели."""
+        with self._lock:
+            for cached_key, cached_version in list(self._models):
+                if cached_key == key and cached_version < version:
+                    del self._models[(cached_key, cached_version)]
+            self._models[(key, version)] = model
+            self._models.move_to_end((key, version))
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            if version >= (self._versions.get(key, (0, None, None))[1] or 0):
+                self._versions[key] = (time.monotonic(), version, None)
+
+    def clear(self):
+        """Выгрузить все модели процесса."""
+        with self._lock:
+            self._models.clear()
+            self._versions.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Реестр моделей текущего процесса (создаётся лениво)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
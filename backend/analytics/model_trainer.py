@@ -1,12 +1,20 @@
+import json
 import os
+import time
 
-import ccxt
 import numpy as np
 import pandas as pd  # Добавлено для предобработки больших данных
 import tensorflow as tf  # Для GPU-проверки
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.layers import LSTM, Dense
-from tensorflow.keras.models import Sequential
+from tensorflow.keras.models import Sequential, load_model
+
+from .exchange_pool import get_exchange
+from .feature_cache import FeatureSnapshot
+from .lstm_predictor import LSTMPredictor
+from .market_data import fetch_ohlcv_range
+from .market_dataset import MarketDataset
+from .window_dataset import DEFAULT_FEATURES, WindowDataset, build_features
 
 
 class ModelTrainer:
@@ -23,6 +31,7 @@ class ModelTrainer:
         self.base_dir = base_dir
         self.model_path = os.path.join(self.base_dir, "models/lstm_model.h5")
         self.scaler_path = os.path.join(self.base_dir, "models/scaler.npy")
+        self.features_path = os.path.join(self.base_dir, "models/features.json")
 
     def load_data_from_csv(self, use_ccxt=True, limit=1000):
         """
@@ -33,8 +42,7 @@ class ModelTrainer:
         :return: Массив цен закрытия или None.
         """
         if use_ccxt:
-            exchange = ccxt.binance()
-            ohlcv = exchange.fetch_ohlcv("BTC/USDT", "1m", limit=limit)
+            ohlcv = get_exchange("binance").fetch_ohlcv("BTC/USDT", "1m", limit=limit)
             # Вместо сырых циклов: используем pandas для быстрой обработки (векторизировано)
             df = pd.DataFrame(
                 ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
@@ -43,14 +51,60 @@ class ModelTrainer:
             return closes
         return None
 
-    def train_model(self, data, look_back=60, epochs=100, batch_size=32):
+    def load_features(
+        self, symbol="BTC/USDT", timeframe="1m", exchange="binance", limit=1000
+    ):
+        """
+        Загружает признаки из снимка (analytics.feature_cache) вместо полной загрузки с биржи.
+
+        С биржи запрашиваются только свечи новее последней в MarketDataset;
+        индикаторы дописываются в снимок инкрементально.
+
+        :param symbol: Символ актива.
+        :param timeframe: Временной интервал.
+        :param exchange: Название биржи ccxt.
+        :param limit: Количество последних записей для обучения.
+        :return: Словарь колонок снимка (close, volume, ma_*, rsi_*, ...).
+        """
+        dataset = MarketDataset(symbol, timeframe, exchange)
+        last_ts = dataset.last_timestamp()
+        client = get_exchange(exchange)
+        if last_ts is None:
+            ohlcv = client.fetch_ohlcv(symbol, timeframe, limit=limit)
+        else:
+            ohlcv = fetch_ohlcv_range(
+                symbol, last_ts + 1, int(time.time() * 1000), timeframe, client
+            )
+        dataset.append(ohlcv)
+        return FeatureSnapshot(symbol, timeframe, exchange).sync(dataset).read(tail=limit)
+
+    def train_model(
+        self,
+        data,
+        look_back=60,
+        epochs=100,
+        batch_size=32,
+        features=DEFAULT_FEATURES,
+        base_dir=None,
+        job=None,
+    ):
         """
         Обучает модель LSTM на предоставленных данных.
 
-        :param data: Массив данных для обучения.
+        Окна look-back строятся без копирования (analytics.window_dataset) и
+        подаются в Keras батчами через tf.data, поэтому память не растёт
+        с look_back.
+
+        :param data: Массив цен закрытия или колонки снимка признаков для обучения.
         :param look_back: Количество предыдущих шагов для предсказания.
         :param epochs: Количество эпох обучения (уменьшено до 100 по умолчанию для тестов).
         :param batch_size: Размер батча (добавлено для гибкости).
+        :param features: Каналы входа: 'close', 'ma_<окно>', 'rsi_<период>'
+            (первый — цена закрытия, она же цель).
+        :param base_dir: Директория версии модели (model.h5, scaler.npy, features.json)
+            для дообучения; скейлер, каналы и look_back берутся из неё.
+        :param job: TrainingJob: чекпоинт после каждой эпохи и продолжение
+            с последнего чекпоинта задачи.
         :return: Кортеж из обученной модели и скейлера.
         """
         # GPU-проверка: TensorFlow автоматически использует GPU, если CUDA доступна
@@ -60,61 +114,91 @@ class ModelTrainer:
         else:
             print("GPU не найден. Обучение на CPU (может быть медленнее).")
 
-        # Предобработка с pandas (вместо сырых циклов for i in range — векторизировано)
-        df = pd.DataFrame(data, columns=["close"])
-        # Нормализация
+        resume = job is not None and job.has_checkpoint()
+        source = job.path if resume else base_dir
         scaler = MinMaxScaler()
-        df["scaled_close"] = scaler.fit_transform(df[["close"]])
-        # Создание X/y векторизированно (shift и rolling — в 10–50 раз быстрее для больших данных)
-        df["y"] = df["scaled_close"].shift(-1)  # Следующая цена как target
-        df.dropna(inplace=True)
-        # Rolling windows для X (look_back шагов)
-        for i in range(1, look_back + 1):
-            df[f"lag_{i}"] = df["scaled_close"].shift(i)
-        df.dropna(inplace=True)
-        # Сбор X и y
-        X = df[[f"lag_{i}" for i in range(1, look_back + 1)]].values
-        y = df["y"].values
-        X = X.reshape(X.shape[0], look_back, 1)  # Для LSTM
-
-        # Пример дополнительных индикаторов для "больших данных" (pandas rolling — адаптируй под нужды)
-        df["ma_20"] = df["close"].rolling(window=20).mean()  # Moving Average
-        df["rsi"] = self._calculate_rsi(df["close"])  # RSI
-        # Если хочешь добавить в модель: X = np.concatenate([X, df[['ma_20', 'rsi']].fillna(0).values.reshape(-1, 2, 1)], axis=1)
-
-        model = Sequential(
-            [
-                LSTM(50, return_sequences=True, input_shape=(look_back, 1)),
-                LSTM(50),
-                Dense(1),
-            ]
+        if source:
+            # Продолжение: тот же скейлер и те же каналы, что у исходной модели
+            with open(os.path.join(source, "features.json")) as f:
+                meta = json.load(f)
+            features, look_back = meta["features"], meta["look_back"]
+            scaler.min_, scaler.scale_ = np.load(os.path.join(source, "scaler.npy"))
+            matrix = build_features(data, features)
+        else:
+            features = list(features)
+            matrix = build_features(data, features)
+            scaler.fit(matrix)
+        # Нормализация каждого канала на месте (без копии матрицы)
+        matrix *= scaler.scale_.astype(np.float32)
+        matrix += scaler.min_.astype(np.float32)
+        dataset = WindowDataset(matrix, look_back=look_back)
+
+        if source:
+            model = load_model(os.path.join(source, "model.h5"))
+        else:
+            model = Sequential(
+                [
+                    LSTM(
+                        50,
+                        return_sequences=True,
+                        input_shape=(look_back, dataset.num_features),
+                    ),
+                    LSTM(50),
+                    Dense(1),
+                ]
+            )
+            model.compile(optimizer="adam", loss="mean_squared_error")
+
+        callbacks = []
+        if job is not None:
+            self._save_preprocessing(job.path, scaler, features, look_back)
+            callbacks.append(job.keras_callback())
+        model.fit(
+            dataset.to_tf_dataset(batch_size),
+            epochs=epochs,
+            initial_epoch=job.done_steps if resume else 0,
+            callbacks=callbacks,
+            verbose=1,
         )
-        model.compile(optimizer="adam", loss="mean_squared_error")
-        model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
 
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         model.save(self.model_path)
-        np.save(self.scaler_path, [scaler.min_, scaler.scale_])
+        self._save_preprocessing(
+            os.path.dirname(self.model_path), scaler, features, look_back
+        )
         return model, scaler
 
-    def _calculate_rsi(self, series, period=14):
+    def _save_preprocessing(self, directory, scaler, features, look_back):
         """
-        Простой расчёт RSI с pandas для больших данных (rolling mean).
+        Сохраняет скейлер и описание каналов входа рядом с моделью.
+        """
+        np.save(os.path.join(directory, "scaler.npy"), [scaler.min_, scaler.scale_])
+        with open(os.path.join(directory, "features.json"), "w") as f:
+            json.dump({"features": features, "look_back": look_back}, f)
+
+    def load_predictor(self):
         """
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        Загружает сохранённые модель и скейлер в LSTMPredictor.
+
+        :return: LSTMPredictor с прогретым графом инференса.
+        """
+        return LSTMPredictor.from_files(
+            self.model_path, self.scaler_path, self.features_path
+        )
 
     def predict_price(self, input_data, scaler, model):
         """
         Предсказывает цену на основе входных данных с использованием модели и скейлера.
 
-        :param input_data: Подготовленные входные данные для предсказания.
+        Для серии запросов используйте load_predictor(): он компилирует граф
+        один раз, а не платит накладные расходы Keras на каждый вызов.
+
+        :param input_data: Подготовленные входные данные для предсказания
+            (1, look_back, C) в масштабе скейлера.
         :param scaler: Скейлер для обратного преобразования.
         :param model: Обученная модель.
         :return: Предсказанная цена.
         """
-        prediction = model.predict(input_data)
-        return scaler.inverse_transform(prediction)[0][0]
+        prediction = model(np.asarray(input_data, dtype=np.float32), training=False)
+        # Цель — первый канал (close): обратное преобразование только по нему
+        return float((prediction.numpy()[0][0] - scaler.min_[0]) / scaler.scale_[0])
@@ -1,7 +1,11 @@
+import numpy as np
 from django.contrib.auth.models import User
 from django.db import models
 from news.models import News
 
+# Колонки свечи в порядке ccxt fetch_ohlcv
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
 
 class AnalyticsData(models.Model):
     """
@@ -39,6 +43,142 @@ class AnalyticsData(models.Model):
         return f"{self.user.username} - {self.symbol} at {self.created_at}"
 
 
+class CandleQuerySet(models.QuerySet):
+    """
+    Запросы к свечам: выборка ряда и чтение диапазона сразу в массивы NumPy.
+    """
+
+    def series(self, symbol, timeframe="1h", exchange="binance"):
+        return self.filter(exchange=exchange, symbol=symbol, timeframe=timeframe)
+
+    def arrays(
+        self,
+        symbol,
+        timeframe="1h",
+        exchange="binance",
+        start=None,
+        end=None,
+        tail=None,
+        columns=CANDLE_COLUMNS,
+    ):
+        """
+        Свечи ряда за диапазон как массивы NumPy.
+
+        Запрос — один проход по диапазону уникального индекса ряда
+        (values_list, объекты модели не создаются).
+
+        :param symbol: Символ актива
+        :param timeframe: Временной интервал
+        :param exchange: Биржа ряда
+        :param start: Начало диапазона, timestamp в мс включительно (опционально)
+        :param end: Конец диапазона, timestamp в мс не включительно (опционально)
+        :param tail: Только последние tail свечей диапазона (опционально)
+        :param columns: Имена колонок из CANDLE_COLUMNS
+        :return: Словарь {колонка: массив} по возрастанию времени;
+            timestamp — int64, остальные — float64
+        """
+        queryset = self.series(symbol, timeframe, exchange)
+        if start is not None:
+            queryset = queryset.filter(ts__gte=start)
+        if end is not None:
+            queryset = queryset.filter(ts__lt=end)
+        fields = ["ts" if name == "timestamp" else name for name in columns]
+        if tail is not None:
+            rows = list(queryset.order_by("-ts").values_list(*fields)[:tail])
+            rows.reverse()
+        else:
+            rows = list(queryset.order_by("ts").values_list(*fields))
+        matrix = np.array(rows, dtype=np.float64).reshape(-1, len(fields))
+        result = {name: matrix[:, i] for i, name in enumerate(columns)}
+        if "timestamp" in result:
+            result["timestamp"] = result["timestamp"].astype(np.int64)
+        return result
+
+    def last_timestamp(self, symbol, timeframe="1h", exchange="binance"):
+        return (
+            self.series(symbol, timeframe, exchange)
+            .order_by("-ts")
+            .values_list("ts", flat=True)
+            .first()
+        )
+
+    def upsert(self, symbol, timeframe, exchange, ohlcv, batch_size=1000):
+        """
+        Записать свечи пакетами; существующие свечи ряда перезаписываются.
+
+        :param symbol: Символ актива
+        :param timeframe: Временной интервал
+        :param exchange: Биржа ряда
+        :param ohlcv: Строки [timestamp, open, high, low, close, volume]
+        :param batch_size: Размер пакета INSERT
+        :return: Количество записанных свечей
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        candles = [
+            Candle(
+                exchange=exchange,
+                symbol=symbol,
+                timeframe=timeframe,
+                ts=int(ts),
+                open=o,
+                high=h,
+                low=l,
+                close=c,
+                volume=v,
+            )
+            for ts, o, h, l, c, v in rows.tolist()
+        ]
+        self.bulk_create(
+            candles,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["exchange", "symbol", "timeframe", "ts"],
+            update_fields=["open", "high", "low", "close", "volume"],
+        )
+        return len(candles)
+
+
+class Candle(models.Model):
+    """
+    Свеча OHLCV ряда (биржа, символ, таймфрейм), общая для всех пользователей.
+
+    Уникальный индекс (exchange, symbol, timeframe, ts) покрывает цены и объём
+    (INCLUDE в PostgreSQL), поэтому чтение диапазона ряда — index-only scan.
+    """
+
+    exchange = models.CharField(max_length=32, verbose_name="Биржа")
+    symbol = models.CharField(max_length=20, verbose_name="Символ")
+    timeframe = models.CharField(max_length=8, verbose_name="Таймфрейм")
+    ts = models.BigIntegerField(verbose_name="Время открытия, мс")
+    open = models.FloatField(verbose_name="Открытие")
+    high = models.FloatField(verbose_name="Максимум")
+    low = models.FloatField(verbose_name="Минимум")
+    close = models.FloatField(verbose_name="Закрытие")
+    volume = models.FloatField(verbose_name="Объём")
+
+    objects = CandleQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Ключ ряда и покрывающий индекс одновременно; INCLUDE — PostgreSQL
+            models.UniqueConstraint(
+                fields=["exchange", "symbol", "timeframe", "ts"],
+                include=["open", "high", "low", "close", "volume"],
+                name="candle_series_ts_uniq",
+            ),
+        ]
+        verbose_name = "Свеча"
+        verbose_name_plural = "Свечи"
+
+    def __str__(self):
+        """
+        Возвращает строковое представление объекта.
+
+        :return: Строка с биржей, символом, таймфреймом и временем свечи.
+        """
+        return f"{self.exchange} {self.symbol} {self.timeframe} @ {self.ts}"
+
+
 class Prediction(models.Model):
     """
     Модель для хранения предсказаний цен и рекомендаций действий по активам.
@@ -0,0 +1,104 @@
+"""
+Модуль инкрементальной синхронизации OHLCV с биржами.
+
+Для каждого ряда (биржа, символ, таймфрейм) высшая отметка (high-water mark) —
+timestamp последней сохранённой свечи MarketDataset; она хранится в том же
+meta.json/файлах, что и сам ряд, поэтому не расходится с данными.
+Синхронизация запрашивает свечи с since = отметка + 1 и листает вперёд,
+пока не догонит текущее время; ряд, который уже догнан, стоит одного
+короткого запроса. Незакрытая текущая свеча не сохраняется, чтобы
+отметка не ушла дальше окончательных данных.
+
+Здесь — общая логика отметок, листания и записи; сами запросы к биржам
+выполняет analytics.async_fetcher (sync_series_concurrently), все ряды
+параллельно. Стратегии с одинаковым символом на одной бирже синхронизируют
+ряд один раз; новые свечи ряда дописываются одной пакетной записью.
+Вслед за MarketDataset свечи переносятся в общую таблицу Candle (графики, API) пакетным upsert'ом
+от её собственной отметки, так что таблица догоняет ряд и после пропусков.
+"""
+
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import CANDLE_COLUMNS, Candle
+
+logger = logging.getLogger(__name__)
+
+
+def timeframe_ms(timeframe):
+    """Длительность свечи таймфрейма ccxt ('1m', '1h', '1d', ...) в миллисекундах."""
+    import ccxt
+
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def is_last_page(last_ts, cursor, step, now_ms):
+    """
+    Страница с последней свечой last_ts завершает листание.
+
+    Следующая свеча ещё не закрыта — ряд догнан (размер страницы биржа может
+    урезать, поэтому короткая страница не признак конца).
+    """
+    return last_ts < cursor or last_ts + 2 * step > now_ms
+
+
+def closed_candles(pages, step, now_ms):
+    """Страницы свечей одним массивом (T, 6) без незакрытой текущей свечи."""
+    if not pages:
+        return np.empty((0, 6))
+    rows = np.concatenate(pages)
+    return rows[rows[:, 0] + step <= now_ms]
+
+
+def sync_since(dataset, initial_candles=None, now_ms=None):
+    """
+    Начало запроса для ряда от его высшей отметки.
+
+    :param dataset: MarketDataset ряда
+    :param initial_candles: Глубина первой загрузки пустого ряда, свечей
+        (settings.OHLCV_SYNC_INITIAL_CANDLES)
+    :param now_ms: Текущее время, мс
+    :return: timestamp since в мс или None, если следующая после отметки
+        свеча ещё не закрылась и запрос не нужен
+    """
+    initial_candles = initial_candles or getattr(
+        settings, "OHLCV_SYNC_INITIAL_CANDLES", 1000
+    )
+    now_ms = now_ms or int(time.time() * 1000)
+    step = timeframe_ms(dataset.timeframe)
+    high_water_mark = dataset.last_timestamp()
+    if high_water_mark is None:
+        return now_ms - initial_candles * step
+    if high_water_mark + 2 * step > now_ms:
+        return None
+    return high_water_mark + 1
+
+
+def store_candles(dataset):
+    """
+    Перенести в таблицу Candle свечи ряда новее её последней свечи.
+
+    :param dataset: MarketDataset ряда
+    :return: Количество записанных свечей
+    """
+    if not dataset.exists():
+        return 0
+    last_ts = Candle.objects.last_timestamp(
+        dataset.symbol, dataset.timeframe, dataset.exchange
+    )
+    columns = dataset.open(CANDLE_COLUMNS)
+    start = (
+        0
+        if last_ts is None
+        else int(np.searchsorted(columns["timestamp"], last_ts, side="right"))
+    )
+    if start == len(columns["timestamp"]):
+        return 0
+    rows = np.column_stack([columns[name][start:] for name in CANDLE_COLUMNS])
+    return Candle.objects.upsert(
+        dataset.symbol, dataset.timeframe, dataset.exchange, rows
+    )
+
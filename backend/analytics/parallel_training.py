@@ -0,0 +1,260 @@
+"""
+Модуль параллельного обучения PPO на нескольких символах.
+
+Каждый символ (и, опционально, несколько длин эпизода на символ) — отдельный
+ряд TradingEnv. Ряды распределяются по процессам SubprocVecEnv: процесс
+держит свои ряды в MultiSeriesEnv и переключает их по кругу на каждом reset().
+Ряд и его матрица признаков float32 (T, 7) считаются в главном процессе
+один раз, кладутся в shared memory и подключаются процессами без
+сериализации и без пересчёта индикаторов; количество процессов и привязка
+к ядрам CPU настраиваются (RL_TRAIN_WORKERS, RL_CPU_AFFINITY).
+
+Демонический процесс не может порождать дочерние, поэтому в prefork-воркере
+Celery обучение идёт в одном процессе (DummyVecEnv). Для параллельного
+обучения воркер очереди ml запускается с -P solo или -P threads, либо
+обучение запускается командой manage.py train_multi_symbol.
+"""
+
+import logging
+import multiprocessing
+import os
+
+import gymnasium
+import numpy as np
+import torch
+from django.conf import settings
+from stable_baselines3 import PPO
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from .shared_arrays import attach, release, to_shared
+from .trading_env import TradingEnv
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cpu_list(value):
+    """
+    Разбор списка ядер в формате taskset: '0-7,16,18-19'.
+
+    :param value: Строка, список номеров или None
+    :return: Список номеров ядер (пустой — без привязки)
+    """
+    if not value:
+        return []
+    if not isinstance(value, str):
+        return [int(cpu) for cpu in value]
+    cpus = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus(cpus):
+    """
+    Ядра из списка, доступные текущему процессу (os.sched_getaffinity).
+
+    Недоступные ядра отбрасываются с предупреждением: привязка к ним
+    завершилась бы OSError в процессе среды.
+
+    :param cpus: Список номеров ядер
+    :return: Список доступных ядер в исходном порядке
+    """
+    if not cpus or not hasattr(os, "sched_getaffinity"):
+        return list(cpus)
+    allowed = os.sched_getaffinity(0)
+    available = [cpu for cpu in cpus if cpu in allowed]
+    if len(available) < len(cpus):
+        logger.warning(
+            f"Ignoring unavailable CPUs {sorted(set(cpus) - allowed)} "
+            f"(allowed: {sorted(allowed)})"
+        )
+    return available
+
+
+class MultiSeriesEnv(gymnasium.Env):
+    """
+    gymnasium-среда над несколькими рядами TradingEnv одного процесса.
+
+    На каждом reset() берётся следующий ряд по кругу, так что один процесс
+    обучает на нескольких символах/длинах эпизода.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, items, env_params=None, seed=None):
+        """
+        :param items: Список (spec, features_spec, episode_length); spec — из
+            to_shared() для массива (T, 3): price, volume, sentiment,
+            features_spec — для матрицы признаков float32 (T, 7) этого ряда
+        :param env_params: Параметры TradingEnv (stop_loss, take_profit, ...)
+        :param seed: Seed выбора стартов эпизодов
+        """
+        super().__init__()
+        self._blocks = []
+        self.envs = []
+        for i, (spec, features_spec, episode_length) in enumerate(items):
+            shm, data = attach(spec)
+            features_shm, features = attach(features_spec)
+            self._blocks.extend((shm, features_shm))
+            if episode_length:
+                episode_length = min(episode_length, len(data) - 1)
+            self.envs.append(
+                TradingEnv(
+                    data[:, :2],
+                    data[:, 2],
+                    episode_length=episode_length,
+                    episode_start="stratified",
+                    seed=None if seed is None else seed + i,
+                    features=features,
+                    **(env_params or {}),
+                )
+            )
+        self.observation_space = gymnasium.spaces.Box(
+            low=0, high=1, shape=(7,), dtype=np.float32
+        )
+        self.action_space = gymnasium.spaces.Discrete(3)
+        self._index = -1
+        self.env = None
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        self._index = (self._index + 1) % len(self.envs)
+        self.env = self.envs[self._index]
+        return self.env.reset().copy(), {}
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(int(action))
+        # Эпизод фиксированной длины обрывается по лимиту (truncated),
+        # эпизод на весь ряд завершается терминально
+        truncated = done and self.env.episode_sampler is not None
+        return obs.copy(), float(reward), done and not truncated, truncated, info
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+        self._blocks = []
+
+
+def _make_env(items, env_params, seed, cpu):
+    """
+    Фабрика среды для процесса SubprocVecEnv (с привязкой к ядру).
+
+    cpu задаётся только для дочерних процессов: в DummyVecEnv фабрика
+    выполняется в вызывающем процессе, и привязка осталась бы на нём.
+    """
+
+    def _init():
+        if cpu is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {cpu})
+        return Monitor(MultiSeriesEnv(items, env_params=env_params, seed=seed))
+
+    return _init
+
+
+def run_parallel_training(
+    series,
+    episode_lengths=(None,),
+    total_timesteps=100000,
+    workers=None,
+    cpu_affinity=None,
+    model_path=None,
+    env_params=None,
+    seed=None,
+):
+    """
+    Обучение одной PPO-модели на нескольких рядах в параллельных процессах.
+
+    :param series: Словарь {имя: массив (T, 3) price, volume, sentiment}
+    :param episode_lengths: Длины эпизода на каждый ряд (None — весь ряд);
+        каждая длина даёт отдельную среду ряда
+    :param total_timesteps: Шагов обучения
+    :param workers: Количество процессов (settings.RL_TRAIN_WORKERS или os.cpu_count())
+    :param cpu_affinity: Ядра для процессов сред, '0-7,16' (settings.RL_CPU_AFFINITY)
+    :param model_path: Модель для продолжения обучения (опционально)
+    :param env_params: Параметры TradingEnv
+    :param seed: Seed
+    :return: Обученная модель PPO
+    """
+    workers = workers or getattr(settings, "RL_TRAIN_WORKERS", None) or os.cpu_count()
+    if cpu_affinity is None:
+        cpu_affinity = getattr(settings, "RL_CPU_AFFINITY", "")
+    cpus = available_cpus(parse_cpu_list(cpu_affinity))
+    # Потоки PyTorch для градиентного шага PPO в главном процессе
+    torch_threads = getattr(settings, "RL_TORCH_THREADS", 0)
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+
+    blocks = []
+    items = []
+    try:
+        for name, data in series.items():
+            data = np.asarray(data, dtype=np.float64)
+            if data.ndim != 2 or data.shape[1] != 3 or len(data) < 2:
+                logger.warning(f"Skipping series {name}: expected (T, 3) with T >= 2")
+                continue
+            # Индикаторы и нормализация — один раз на ряд, а не в каждом процессе
+            features = TradingEnv(data[:, :2], data[:, 2])._features
+            shm, spec = to_shared(data)
+            blocks.append(shm)
+            features_shm, features_spec = to_shared(features)
+            blocks.append(features_shm)
+            items.extend((spec, features_spec, length) for length in episode_lengths)
+        if not items:
+            raise ValueError("No usable series for training")
+
+        # Ряды распределяются по процессам по кругу
+        num_envs = min(workers, len(items))
+        assignments = [items[i::num_envs] for i in range(num_envs)]
+
+        # Демонические процессы (prefork-воркеры Celery) не могут порождать дочерние
+        daemon = multiprocessing.current_process().daemon
+        if daemon and num_envs > 1:
+            logger.warning(
+                "Training in a daemonic process (Celery prefork pool): "
+                f"{num_envs} envs run serially; use -P solo/threads for the ml "
+                "queue or manage.py train_multi_symbol"
+            )
+        in_subprocesses = num_envs > 1 and not daemon
+        # Привязка к ядрам — только для дочерних процессов SubprocVecEnv:
+        # в DummyVecEnv фабрики выполняются в вызывающем процессе (воркере)
+        if not in_subprocesses:
+            cpus = []
+        factories = [
+            _make_env(
+                assigned,
+                env_params,
+                None if seed is None else seed + 1000 * i,
+                cpus[i % len(cpus)] if cpus else None,
+            )
+            for i, assigned in enumerate(assignments)
+        ]
+
+        if not in_subprocesses:
+            vec_env = DummyVecEnv(factories)
+        else:
+            vec_env = SubprocVecEnv(
+                factories,
+                start_method=getattr(settings, "RL_START_METHOD", "fork"),
+            )
+        logger.info(
+            f"Parallel training: {len(series)} series, {len(items)} envs "
+            f"in {num_envs} workers, affinity {cpus or 'none'}"
+        )
+
+        try:
+            if model_path and os.path.exists(model_path):
+                model = PPO.load(model_path, env=vec_env, seed=seed)
+            else:
+                model = PPO("MlpPolicy", vec_env, verbose=1, seed=seed)
+            model.learn(total_timesteps=total_timesteps)
+        finally:
+            vec_env.close()
+    finally:
+        release(*blocks)
+    return model
@@ -0,0 +1,93 @@
+"""
+Модуль буферизированной записи предсказаний (Prediction) в БД.
+
+PredictionSink накапливает объекты Prediction в памяти и пишет их через
+bulk_create пачками, вместо одного save() на каждый шаг TradingEnv.
+В асинхронном режиме запись выполняется в фоновом потоке, и шаг среды
+никогда не ждёт базу данных.
+"""
+
+import logging
+import queue
+import threading
+
+from django.db import connection
+
+from .models import Prediction
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionSink:
+    """
+    Буфер предсказаний с пакетной записью через bulk_create.
+
+    - chunk_size: при заполнении буфера пачка записывается (или ставится в очередь)
+    - async_write: запись в фоновом потоке-писателе
+    """
+
+    def __init__(self, chunk_size=500, async_write=False):
+        """
+        :param chunk_size: Размер пачки для bulk_create
+        :param async_write: Писать в фоновом потоке
+        """
+        self.chunk_size = chunk_size
+        self.async_write = async_write
+        self._buffer = []
+        self._queue = None
+        self._writer = None
+        if async_write:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="prediction-sink", daemon=True
+            )
+            self._writer.start()
+
+    def add(self, prediction):
+        """
+        Добавить предсказание в буфер.
+
+        :param prediction: Несохранённый объект Prediction
+        """
+        self._buffer.append(prediction)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Записать накопленные предсказания. В асинхронном режиме пачка
+        только ставится в очередь писателя.
+        """
+        if not self._buffer:
+            return
+        chunk, self._buffer = self._buffer, []
+        if self.async_write:
+            self._queue.put(chunk)
+        else:
+            self._write(chunk)
+
+    def close(self):
+        """Записать остаток буфера и дождаться фонового писателя."""
+        self.flush()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write(self, chunk):
+        try:
+            Prediction.objects.bulk_create(chunk, batch_size=self.chunk_size)
+        except Exception as e:
+            logger.error(f"Error saving {len(chunk)} Predictions: {e}")
+
+    def _writer_loop(self):
+        """Цикл фонового потока: пишет пачки из очереди до получения None."""
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                self._write(chunk)
+        finally:
+            # У потока своё соединение с БД, его нужно закрыть явно
+            connection.close()
@@ -0,0 +1,340 @@
+"""
+Модуль живого потока цен.
+
+Один долгоживущий ingestor на биржу (manage.py run_price_ingestor) опрашивает
+тикеры отслеживаемых символов одним запросом fetch_tickers и пишет:
+
+    price:last:<биржа>:<символ>   — последняя цена и время (JSON), на каждом
+                                    опросе, даже если цена не изменилась
+    price:ticks:<биржа>:<символ>  — кольцевой буфер последних тиков (список
+                                    Redis, PRICE_STREAM_BUFFER записей), только
+                                    при изменении цены
+
+Изменившаяся цена также рассылается в группу channel layer
+price_<биржа>_<символ> (событие price.tick). Алерты, демо-торговля, WebSocket трейдинга и аналитика читают
+цену из Redis (PriceStore) вместо собственных запросов к бирже; если ingestor
+не запущен или цена устарела, latest_prices() один раз догружает недостающие
+цены с биржи и кладёт их в тот же Redis.
+
+Для локального запуска без биржи есть FakeExchange (случайное блуждание цен).
+"""
+
+import json
+import logging
+import random
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LAST_KEY = "price:last:{exchange}:{symbol}"
+TICKS_KEY = "price:ticks:{exchange}:{symbol}"
+
+
+def get_redis():
+    """Клиент Redis потока цен (settings.PRICE_STREAM_REDIS_URL)."""
+    return redis.Redis.from_url(
+        getattr(settings, "PRICE_STREAM_REDIS_URL", "redis://127.0.0.1:6379/2")
+    )
+
+
+def group_name(exchange, symbol):
+    """Группа channel layer тиков символа (допустимые символы имени группы)."""
+    return f"price_{exchange}_{symbol.replace('/', '-').replace(':', '-')}"
+
+
+class PriceStore:
+    """
+    Последние цены и кольцевые буферы тиков в Redis.
+    """
+
+    def __init__(self, client=None, buffer_size=None):
+        """
+        :param client: Клиент Redis (по умолчанию get_redis())
+        :param buffer_size: Длина кольцевого буфера тиков на символ
+            (settings.PRICE_STREAM_BUFFER)
+        """
+        self.client = client or get_redis()
+        self.buffer_size = buffer_size or getattr(settings, "PRICE_STREAM_BUFFER", 500)
+
+    def publish(self, ticks, refreshed=()):
+        """
+        Записать тики одним pipeline.
+
+        :param ticks: Список словарей {"exchange", "symbol", "price", "ts"}
+            (ts — время тика, мс)
+        :param refreshed: Тики без изменения цены в том же формате: обновляется
+            только последняя цена (время), буфер тиков не меняется
+        """
+        pipe = self.client.pipeline(transaction=False)
+        for tick in refreshed:
+            pipe.set(
+                LAST_KEY.format(exchange=tick["exchange"], symbol=tick["symbol"]),
+                json.dumps([tick["ts"], tick["price"]]),
+            )
+        for tick in ticks:
+            key = {"exchange": tick["exchange"], "symbol": tick["symbol"]}
+            record = json.dumps([tick["ts"], tick["price"]])
+            pipe.set(LAST_KEY.format(**key), record)
+            pipe.lpush(TICKS_KEY.format(**key), record)
+            pipe.ltrim(TICKS_KEY.format(**key), 0, self.buffer_size - 1)
+        pipe.execute()
+
+    def latest(self, pairs, max_age=None):
+        """
+        Последние цены набора символов одним MGET.
+
+        :param pairs: Список пар (биржа, символ)
+        :param max_age: Максимальный возраст цены, секунды (старые не возвращаются)
+        :return: Словарь {(биржа, символ): цена} для известных цен
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return {}
+        records = self.client.mget(
+            [LAST_KEY.format(exchange=exchange, symbol=symbol) for exchange, symbol in pairs]
+        )
+        now_ms = time.time() * 1000
+        result = {}
+        for pair, record in zip(pairs, records):
+            if record is None:
+                continue
+            ts, price = json.loads(record)
+            if max_age is None or now_ms - ts <= max_age * 1000:
+                result[pair] = price
+        return result
+
+    def history(self, exchange, symbol, limit=None):
+        """
+        Последние тики символа из кольцевого буфера.
+
+        :param exchange: Биржа
+        :param symbol: Символ актива
+        :param limit: Количество тиков (по умолчанию весь буфер)
+        :return: Список [ts, цена] по возрастанию времени
+        """
+        records = self.client.lrange(
+            TICKS_KEY.format(exchange=exchange, symbol=symbol),
+            0,
+            (limit or self.buffer_size) - 1,
+        )
+        return [json.loads(record) for record in reversed(records)]
+
+
+def latest_prices(pairs, max_age=None, store=None):
+    """
+    Последние цены из потока; недостающие догружаются с биржи одним проходом.
+
+    :param pairs: Итерируемое пар (биржа, символ)
+    :param max_age: Максимальный возраст цены из Redis, секунды
+        (settings.PRICE_STREAM_MAX_AGE)
+    :param store: PriceStore (по умолчанию в Redis потока цен)
+    :return: Словарь {(биржа, символ): цена}; символы без цены пропускаются
+    """
+    from .async_fetcher import fetch_prices
+
+    pairs = set(pairs)
+    max_age = max_age if max_age is not None else getattr(settings, "PRICE_STREAM_MAX_AGE", 30)
+    store = store or PriceStore()
+    try:
+        prices = store.latest(pairs, max_age)
+    except redis.RedisError as e:
+        logger.warning(f"Price stream unavailable, fetching from exchange: {e}")
+        return fetch_prices(pairs)
+
+    missing = pairs - prices.keys()
+    if missing:
+        fetched = fetch_prices(missing)
+        now_ms = int(time.time() * 1000)
+        store.publish(
+            [
+                {"exchange": exchange, "symbol": symbol, "price": price, "ts": now_ms}
+                for (exchange, symbol), price in fetched.items()
+            ]
+        )
+        prices.update(fetched)
+    return prices
+
+
+def current_price(symbol, exchange="binance", max_age=None):
+    """
+    Последняя цена символа (latest_prices для одного символа).
+
+    :return: Цена или None
+    """
+    return latest_prices([(exchange, symbol)], max_age).get((exchange, symbol))
+
+
+def tracked_symbols(exchange):
+    """
+    Символы, которые нужны потребителям цен на бирже.
+
+    Символы активных стратегий биржи и, для binance, активных правил алертов
+    (алерты проверяются по ценам Binance).
+
+    :param exchange: Биржа
+    :return: Отсортированный список символов
+    """
+    from alerts.models import AlertRule
+    from trading.models import Strategy
+
+    symbols = set(
+        Strategy.objects.filter(is_active=True, api_key__exchange=exchange).values_list(
+            "symbol", flat=True
+        )
+    )
+    if exchange == "binance":
+        symbols.update(
+            AlertRule.objects.filter(is_active=True).values_list("symbol", flat=True)
+        )
+    return sorted(symbols)
+
+
+class FakeExchange:
+    """
+    Локальная биржа для разработки: случайное блуждание цен без сети.
+
+    Реализует только то, что нужно PriceIngestor (has, fetch_tickers).
+    """
+
+    has = {"fetchTickers": True}
+
+    def __init__(self, start_price=100.0, volatility=0.001, seed=None):
+        self.start_price = start_price
+        self.volatility = volatility
+        self.prices = {}
+        self.rng = random.Random(seed)
+
+    def fetch_tickers(self, symbols):
+        now_ms = int(time.time() * 1000)
+        tickers = {}
+        for symbol in symbols:
+            price = self.prices.get(symbol, self.start_price)
+            price *= 1 + self.rng.gauss(0, self.volatility)
+            self.prices[symbol] = price
+            tickers[symbol] = {"symbol": symbol, "last": price, "timestamp": now_ms}
+        return tickers
+
+
+class PriceIngestor:
+    """
+    Долгоживущий опрос тикеров одной биржи с публикацией в Redis и channel layer.
+    """
+
+    def __init__(
+        self,
+        exchange="binance",
+        symbols=None,
+        interval=None,
+        client=None,
+        store=None,
+        channel_layer=None,
+        refresh_interval=60.0,
+    ):
+        """
+        :param exchange: Название биржи ccxt
+        :param symbols: Символы (по умолчанию tracked_symbols(), перечитываются
+            раз в refresh_interval секунд)
+        :param interval: Период опроса, секунды (settings.PRICE_STREAM_INTERVAL)
+        :param client: Экземпляр биржи (по умолчанию из analytics.exchange_pool)
+        :param store: PriceStore
+        :param channel_layer: Channel layer (по умолчанию get_channel_layer())
+        :param refresh_interval: Период обновления списка символов, секунды
+        """
+        self.exchange = exchange
+        self.fixed_symbols = sorted(symbols) if symbols else None
+        self.symbols = self.fixed_symbols or []
+        self.interval = interval or getattr(settings, "PRICE_STREAM_INTERVAL", 2.0)
+        if client is None:
+            from .exchange_pool import get_exchange
+
+            client = get_exchange(exchange)
+        self.client = client
+        self.store = store or PriceStore()
+        if channel_layer is None:
+            from channels.layers import get_channel_layer
+
+            channel_layer = get_channel_layer()
+        self.channel_layer = channel_layer
+        self.refresh_interval = refresh_interval
+        self._symbols_refreshed = 0.0
+        self._last = {}
+
+    def refresh_symbols(self):
+        if self.fixed_symbols is None:
+            self.symbols = tracked_symbols(self.exchange)
+        self._symbols_refreshed = time.monotonic()
+
+    def fetch(self):
+        """
+        Текущие цены отслеживаемых символов.
+
+        :return: Словарь {символ: (цена, ts в мс)}
+        """
+        if self.client.has.get("fetchTickers"):
+            tickers = self.client.fetch_tickers(self.symbols)
+        else:
+            tickers = {symbol: self.client.fetch_ticker(symbol) for symbol in self.symbols}
+        now_ms = int(time.time() * 1000)
+        return {
+            symbol: (ticker["last"], ticker.get("timestamp") or now_ms)
+            for symbol, ticker in tickers.items()
+            if symbol in self.symbols and ticker.get("last") is not None
+        }
+
+    def poll_once(self):
+        """
+        Один опрос: обновить последние цены всех символов, записать в буфер
+        и разослать изменившиеся.
+
+        Время последней цены обновляется и без изменения цены, иначе цены
+        спокойных символов считались бы устаревшими (PRICE_STREAM_MAX_AGE).
+
+        :return: Список тиков с изменившейся ценой
+        """
+        from asgiref.sync import async_to_sync
+
+        if time.monotonic() - self._symbols_refreshed > self.refresh_interval:
+            self.refresh_symbols()
+        if not self.symbols:
+            return []
+
+        now_ms = int(time.time() * 1000)
+        ticks = []
+        refreshed = []
+        for symbol, (price, ts) in self.fetch().items():
+            tick = {"exchange": self.exchange, "symbol": symbol, "price": price, "ts": ts}
+            if self._last.get(symbol) != price:
+                ticks.append(tick)
+            else:
+                refreshed.append({**tick, "ts": now_ms})
+        if not ticks and not refreshed:
+            return []
+        self.store.publish(ticks, refreshed)
+        for tick in ticks:
+            self._last[tick["symbol"]] = tick["price"]
+            if self.channel_layer is not None:
+                async_to_sync(self.channel_layer.group_send)(
+                    group_name(self.exchange, tick["symbol"]),
+                    {"type": "price.tick", "tick": tick},
+                )
+        return ticks
+
+    def run_forever(self, max_polls=None):
+        """
+        Цикл опроса с периодом interval; ошибка опроса не останавливает цикл.
+
+        :param max_polls: Остановиться после стольких опросов (по умолчанию — бесконечно)
+        """
+        polls = 0
+        logger.info(f"Price ingestor for {self.exchange} started")
+        while max_polls is None or polls < max_polls:
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Price poll failed for {self.exchange}: {e}")
+            polls += 1
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,179 @@
+"""
+Модуль буфера опыта (replay buffer) и объединённого онлайн-дообучения PPO.
+
+Результаты сделок не запускают обучение по одному: каждый исход
+дописывается в персистентный буфер в Redis (список с ограниченной длиной).
+Дообучение выполняет один обновитель (single-flight через Redis-lock):
+когда накопилось REPLAY_MIN_NEW новых записей или прошёл REPLAY_UPDATE_INTERVAL,
+он делает learn() на последних записях буфера и публикует новую версию
+модели через реестр (атомарно, без гонок за файл).
+
+Записи группируются по символу: ряд символа — его сделки в порядке времени,
+цены разных символов не склеиваются. Исход сделки (прибыль в процентах цены
+и направление) становится наградой за действие на шаге сделки: повторить
+прибыльную сделку выгодно, убыточную — штрафуется.
+"""
+
+import json
+import logging
+import time
+
+import numpy as np
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REPLAY_KEY = "replay:trades"
+# Счётчики: всего добавлено записей и сколько было учтено последним обновлением
+REPLAY_ADDED_KEY = "replay:trades:added"
+REPLAY_TRAINED_KEY = "replay:trades:trained"
+REPLAY_LAST_UPDATE_KEY = "replay:trades:last_update"
+REPLAY_SCHEDULED_KEY = "replay:update_scheduled"
+REPLAY_LOCK_KEY = "replay:updater"
+
+DEFAULT_SYMBOL = "default"
+# Направление сделки (Trade.action): +1 — long, −1 — short
+TRADE_DIRECTIONS = {"long": 1, "short": -1}
+
+
+def get_redis():
+    """Клиент Redis буфера опыта (settings.REPLAY_REDIS_URL)."""
+    return redis.Redis.from_url(
+        getattr(settings, "REPLAY_REDIS_URL", "redis://127.0.0.1:6379/2")
+    )
+
+
+class ReplayBuffer:
+    """
+    Персистентный буфер исходов сделок в Redis.
+
+    Запись: {"symbol": str, "rows": [[price, volume], ...], "sentiment": float,
+    "profit": float, "action": "long" | "short" | None, "ts": float}
+    """
+
+    def __init__(self, client=None, max_size=None):
+        """
+        :param client: Клиент Redis (по умолчанию get_redis())
+        :param max_size: Максимум хранимых записей (старые вытесняются)
+        """
+        self.client = client or get_redis()
+        self.max_size = max_size or getattr(settings, "REPLAY_MAX_SIZE", 100000)
+
+    def add(self, rows, sentiment=0.0, profit=0.0, symbol=None, action=None):
+        """
+        Дописать исход сделки.
+
+        :param rows: Рыночные данные сделки [[price, volume], ...]
+        :param sentiment: Средний sentiment новостей
+        :param profit: Прибыль сделки
+        :param symbol: Символ сделки
+        :param action: Направление сделки ('long'/'short'; None — неизвестно)
+        :return: Количество новых записей с последнего обновления модели
+        """
+        record = json.dumps(
+            {
+                "symbol": symbol or DEFAULT_SYMBOL,
+                "rows": np.asarray(rows, dtype=np.float64).reshape(-1, 2).tolist(),
+                "sentiment": float(sentiment),
+                "profit": float(profit),
+                "action": action,
+                "ts": time.time(),
+            }
+        )
+        pipe = self.client.pipeline()
+        pipe.rpush(REPLAY_KEY, record)
+        pipe.ltrim(REPLAY_KEY, -self.max_size, -1)
+        pipe.incr(REPLAY_ADDED_KEY)
+        pipe.get(REPLAY_TRAINED_KEY)
+        *_, added, trained = pipe.execute()
+        return added - int(trained or 0)
+
+    def __len__(self):
+        return self.client.llen(REPLAY_KEY)
+
+    def pending(self):
+        """Количество записей, ещё не учтённых обновлением модели."""
+        added, trained = self.client.mget(REPLAY_ADDED_KEY, REPLAY_TRAINED_KEY)
+        return int(added or 0) - int(trained or 0)
+
+    def recent(self, size):
+        """
+        Последние записи буфера в виде рядов TradingEnv по символам.
+
+        Записи символа упорядочены по времени. outcome — исход сделки на
+        последней строке записи: прибыль в процентах цены сделки со знаком
+        направления (+ для long, − для short), 0 на остальных строках.
+
+        :param size: Количество записей
+        :return: Словарь {символ: (данные (T, 2) [price, volume], sentiment (T,),
+            outcome (T,))}
+        """
+        raw_records = self.client.lrange(REPLAY_KEY, -size, -1)
+        by_symbol = {}
+        for raw in raw_records:
+            record = json.loads(raw)
+            by_symbol.setdefault(record.get("symbol", DEFAULT_SYMBOL), []).append(record)
+
+        series = {}
+        for symbol, records in by_symbol.items():
+            records.sort(key=lambda record: record["ts"])
+            rows = [
+                np.asarray(record["rows"], dtype=np.float64).reshape(-1, 2)
+                for record in records
+            ]
+            sentiment = [
+                np.full(len(row), record["sentiment"])
+                for row, record in zip(rows, records)
+            ]
+            outcome = [_outcome(row, record) for row, record in zip(rows, records)]
+            series[symbol] = (
+                np.concatenate(rows),
+                np.concatenate(sentiment),
+                np.concatenate(outcome),
+            )
+        return series
+
+    def mark_trained(self, added):
+        """Отметить, что обновление учло записи до счётчика added включительно."""
+        pipe = self.client.pipeline()
+        pipe.set(REPLAY_TRAINED_KEY, added)
+        pipe.set(REPLAY_LAST_UPDATE_KEY, time.time())
+        pipe.execute()
+
+    def update_due(self, pending=None):
+        """
+        Пора ли обновлять модель: накоплено REPLAY_MIN_NEW записей
+        или прошёл REPLAY_UPDATE_INTERVAL с последнего обновления.
+        """
+        pending = self.pending() if pending is None else pending
+        if pending <= 0:
+            return False
+        if pending >= getattr(settings, "REPLAY_MIN_NEW", 256):
+            return True
+        last_update = float(self.client.get(REPLAY_LAST_UPDATE_KEY) or 0)
+        interval = getattr(settings, "REPLAY_UPDATE_INTERVAL", 900)
+        return time.time() - last_update >= interval
+
+    def claim_schedule(self, ttl):
+        """
+        Занять право поставить обновление в очередь (SET NX с TTL):
+        из множества одновременных сделок задачу ставит только одна.
+        """
+        return bool(self.client.set(REPLAY_SCHEDULED_KEY, 1, nx=True, ex=ttl))
+
+    def release_schedule(self):
+        self.client.delete(REPLAY_SCHEDULED_KEY)
+
+    def lock(self, timeout):
+        """Redis-lock обновителя (single-flight между воркерами)."""
+        return self.client.lock(REPLAY_LOCK_KEY, timeout=timeout, blocking=False)
+
+
+def _outcome(rows, record):
+    """Исход сделки по строкам записи: ненулевой только на последней строке."""
+    outcome = np.zeros(len(rows))
+    direction = TRADE_DIRECTIONS.get(record.get("action"), 0)
+    if len(rows) and direction and rows[-1, 0] > 0:
+        outcome[-1] = direction * record["profit"] / rows[-1, 0] * 100
+    return outcome
@@ -0,0 +1,43 @@
+"""
+Модуль для передачи NumPy-массивов дочерним процессам через shared memory.
+
+Массив копируется в блок shared memory один раз; воркеры подключаются к нему
+по описанию (имя, форма, dtype) без сериализации данных.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def to_shared(array):
+    """
+    Копирует массив в новый блок shared memory.
+
+    :param array: NumPy-массив
+    :return: Кортеж (SharedMemory, spec); spec передаётся в attach()
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach(spec):
+    """
+    Подключается к блоку shared memory.
+
+    :param spec: Описание из to_shared()
+    :return: Кортеж (SharedMemory, массив-view); SharedMemory нужно держать,
+             пока используется массив
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def release(*blocks):
+    """Закрывает и удаляет блоки shared memory, созданные to_shared()."""
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
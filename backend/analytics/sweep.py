@@ -0,0 +1,117 @@
+"""
+Модуль параллельного перебора параметров TradingEnv (stop_loss, take_profit, hold_penalty).
+
+Сетка параметров делится на пачки, каждая пачка оценивается одним вызовом
+векторизированного backtest_batch() в пуле процессов. Цены и действия
+кладутся в shared memory один раз и подключаются воркерами без копирования.
+
+Последовательность действий одна на всю сетку: перебор оценивает параметры
+выхода для фиксированных сигналов, а не поведение политики, которая видела бы
+другой баланс после выходов по SL/TP.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .backtest import backtest_batch
+from .shared_arrays import attach, release, to_shared
+
+logger = logging.getLogger(__name__)
+
+# Массивы, подключённые воркером из shared memory (заполняются в _init_worker)
+_shared = {}
+
+
+def build_grid(stop_losses, take_profits, hold_penalties):
+    """
+    Декартово произведение значений параметров.
+
+    :return: Массив формы (N, 3): stop_loss, take_profit, hold_penalty
+    """
+    return np.array(
+        list(itertools.product(stop_losses, take_profits, hold_penalties)),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+
+
+def _init_worker(prices_spec, actions_spec, initial_balance):
+    """Инициализатор воркера: подключение к shared memory без копирования."""
+    _shared["prices_shm"], _shared["prices"] = attach(prices_spec)
+    _shared["actions_shm"], _shared["actions"] = attach(actions_spec)
+    _shared["initial_balance"] = initial_balance
+
+
+def _evaluate_chunk(params):
+    """Оценка пачки наборов параметров в воркере."""
+    return _evaluate(
+        _shared["prices"], _shared["actions"], params, _shared["initial_balance"]
+    )
+
+
+def _evaluate(prices, actions, params, initial_balance):
+    metrics = backtest_batch(
+        prices,
+        actions,
+        initial_balance=initial_balance,
+        stop_loss=params[:, 0],
+        take_profit=params[:, 1],
+        hold_penalty=params[:, 2],
+    )
+    return params, metrics
+
+
+def run_sweep(prices, actions, grid, initial_balance=10000, workers=None, chunk_size=64):
+    """
+    Оценивает все наборы параметров сетки и ранжирует их по Sharpe ratio.
+
+    Действия одинаковы для всех наборов (не пересчитываются под параметры).
+
+    :param prices: Цены закрытия длиной T + 1
+    :param actions: Действия стратегии длиной T
+    :param grid: Массив (N, 3) из build_grid()
+    :param initial_balance: Начальный баланс
+    :param workers: Количество процессов (по умолчанию os.cpu_count())
+    :param chunk_size: Количество наборов параметров на одну задачу воркера
+    :return: Список словарей (параметры + метрики), отсортированный по убыванию Sharpe
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    actions = np.ascontiguousarray(actions, dtype=np.int8)
+    grid = np.asarray(grid, dtype=np.float64).reshape(-1, 3)
+    chunks = [grid[i : i + chunk_size] for i in range(0, len(grid), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    # Демонические процессы (например, prefork-воркеры Celery) не могут порождать дочерние
+    if workers == 1 or len(chunks) == 1 or multiprocessing.current_process().daemon:
+        results = [_evaluate(prices, actions, chunk, initial_balance) for chunk in chunks]
+    else:
+        prices_shm, prices_spec = to_shared(prices)
+        actions_shm, actions_spec = to_shared(actions)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(prices_spec, actions_spec, initial_balance),
+            ) as pool:
+                results = list(pool.map(_evaluate_chunk, chunks))
+        finally:
+            release(prices_shm, actions_shm)
+
+    table = []
+    for params, metrics in results:
+        for i, (stop_loss, take_profit, hold_penalty) in enumerate(params):
+            row = {
+                "stop_loss": float(stop_loss),
+                "take_profit": float(take_profit),
+                "hold_penalty": float(hold_penalty),
+            }
+            row.update({key: value[i].item() for key, value in metrics.items()})
+            table.append(row)
+
+    table.sort(key=lambda row: row["sharpe_ratio"], reverse=True)
+    logger.info(f"Parameter sweep finished: {len(table)} points, {workers} workers")
+    return table
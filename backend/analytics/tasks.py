@@ -8,174 +8,474 @@ import logging
 import os
 from datetime import timedelta
 
-import ccxt
 import numpy as np
+import redis
 from celery import shared_task
+from django.conf import settings
 from django.db.models import Avg
 from django.utils import timezone
 from news.models import News
-from stable_baselines3 import PPO
-from textblob import TextBlob
 
 from analytics.trading_env import TradingEnv
 
-from .models import AnalyticsData, Prediction
+from .async_fetcher import sync_series_concurrently
+from .feature_cache import indicator_cache, load_features
+from .inference import InferenceUnavailable, predict_action
+from .market_dataset import MarketDataset
+from .model_registry import get_registry, make_key
+from .models import AnalyticsData, Candle, Prediction
+from .replay_buffer import REPLAY_ADDED_KEY, ReplayBuffer
+from .sweep import build_grid, run_sweep
 
 logger = logging.getLogger(__name__)
 
-_model = None
 
-
-def get_model():
+def get_model(symbol=None, timeframe="1h", strategy=None):
     """
-    Ленивая инициализация RL-модели PPO.
-    Загружает модель из файла, если существует, иначе создает новую.
+    RL-модель PPO из реестра моделей.
+
+    Модель загружается один раз на процесс и держится в LRU реестра;
+    новая опубликованная версия подхватывается без перезапуска воркера.
 
+    :param symbol: Символ актива (None — общая модель)
+    :param timeframe: Временной интервал
+    :param strategy: ID стратегии (None — общая модель)
     :return: Объект модели PPO.
     """
-    global _model
-    if _model is None:
-        model_path = "ppo_trading_model.zip"
-        if os.path.exists(model_path):
-            _model = PPO.load(model_path)
-        else:
-            _model = PPO("MlpPolicy", TradingEnv([], []), verbose=1)
-    return _model
+    return get_registry().get(make_key(symbol, timeframe, strategy))
 
 
 @shared_task
-def fetch_historical_data():
+def fetch_historical_data(timeframe="1h"):
     """
-    Получить исторические данные с использованием активных стратегий.
+    Догрузить свечи рядов активных стратегий от их высшей отметки.
 
-    :return: Сообщение об успехе или ошибке.
+    Стратегии с одним символом на одной бирже синхронизируют ряд один раз;
+    запросы по всем рядам идут параллельно (analytics.async_fetcher), новые
+    свечи дописываются в MarketDataset и Candle пакетно по ряду.
+
+    :param timeframe: Временной интервал.
+    :return: Словарь {"биржа:символ": дописано свечей или ошибка} или сообщение об ошибке.
     """
     try:
         from trading.models import Strategy
 
-        active_strategies = Strategy.objects.filter(is_active=True)
-        for strategy in active_strategies:
-            if strategy.exchange:
-                data = strategy.exchange.fetch_ohlcv(
-                    strategy.symbol, timeframe="1h", limit=100
-                )
-                for candle in data:
-                    AnalyticsData.objects.create(
-                        symbol=strategy.symbol,
-                        timestamp=candle[0] / 1000,
-                        price=candle[4],
-                        volume=candle[5],
-                        user=strategy.user,
-                    )
-        logger.info("Historical data fetched successfully")
-        return "Historical data fetched"
+        series = (
+            Strategy.objects.filter(is_active=True, api_key__isnull=False)
+            .values_list("api_key__exchange", "symbol")
+            .distinct()
+        )
+        result = sync_series_concurrently(series, timeframe)
+        logger.info(
+            f"Historical data synced: {len(result)} series, "
+            f"{sum(n for n in result.values() if isinstance(n, int))} new candles"
+        )
+        return {f"{exchange}:{symbol}": n for (exchange, symbol), n in result.items()}
     except Exception as e:
         logger.error(f"Error fetching historical data: {e}")
         return f"Error: {e}"
 
 
 @shared_task
-def train_ml_model():
+def train_ml_model(
+    symbol=None,
+    timeframe="1h",
+    exchange="binance",
+    total_timesteps=10000,
+    version=None,
+    job_id=None,
+):
     """
     Обучить ML-модель с использованием RL и данных новостей.
 
+    Если задан symbol, признаки (цена, объём, sentiment, SMA, RSI) читаются
+    из снимка признаков (analytics.feature_cache), дописанного из MarketDataset,
+    иначе используются строки AnalyticsData.
+
+    Обучение идёт как задача TrainingJob: модель периодически сохраняется
+    в чекпоинт, и прерванную задачу можно продолжить (resume_training_job).
+
+    :param symbol: Символ актива для обучения на MarketDataset (опционально).
+    :param timeframe: Временной интервал ряда.
+    :param exchange: Биржа ряда.
+    :param total_timesteps: Шагов обучения (сверх уже пройденных моделью).
+    :param version: Версия реестра для дообучения (по умолчанию последняя).
+    :param job_id: ID задачи для возобновления (опционально).
     :return: Сообщение об успехе или ошибке.
     """
-    try:
-        try:
-            from news.tasks import get_news_sentiment
-
-            news_features = np.array(get_news_sentiment()).reshape(-1, 1)
-        except ImportError:
-            news_features = np.zeros((len(data), 1))
+    from stable_baselines3 import PPO
 
-        data = list(AnalyticsData.objects.values_list("price", "volume"))
-        if not data:
-            return "No historical data available"
+    from .training_jobs import TrainingJob
+    from .vec_trading_env import VecTradingEnv
 
-        if len(news_features) != len(data):
-            news_features = np.zeros((len(data), 1))
+    job = None
+    try:
+        indicators = None
+        if symbol:
+            if not MarketDataset(symbol, timeframe, exchange).exists():
+                return f"No market dataset for {symbol} {timeframe}"
+            # Индикаторы уже рассчитаны в снимке и не пересчитываются средой
+            features = load_features(symbol, timeframe, exchange)
+            data = {"close": features["close"], "volume": features["volume"]}
+            news_features = features["sentiment"]
+            indicators = indicator_cache(features)
+        else:
+            data = list(AnalyticsData.objects.values_list("price", "volume"))
+            if not data:
+                return "No historical data available"
+
+            try:
+                from news.tasks import get_news_sentiment
+
+                news_features = np.array(get_news_sentiment()).reshape(-1, 1)
+            except ImportError:
+                news_features = np.zeros((len(data), 1))
+
+            if len(news_features) != len(data):
+                news_features = np.zeros((len(data), 1))
+
+        # N эпизодов продвигаются одним векторизированным step()
+        # Эпизоды фиксированной длины со случайным стартом покрывают всю историю
+        episode_length = getattr(settings, "RL_EPISODE_LENGTH", 0) or None
+        if episode_length and episode_length >= len(news_features):
+            episode_length = None
+        env = VecTradingEnv(
+            data,
+            news_features,
+            num_envs=getattr(settings, "RL_NUM_ENVS", 8),
+            episode_length=episode_length,
+            episode_start=getattr(settings, "RL_EPISODE_START", "stratified"),
+            indicators=indicators,
+        )
+        registry = get_registry()
+        key = make_key(symbol, timeframe)
+        if job_id:
+            job = TrainingJob.load(job_id)
+        else:
+            job = TrainingJob.create(
+                "ppo",
+                key,
+                total_timesteps,
+                params={
+                    "symbol": symbol,
+                    "timeframe": timeframe,
+                    "exchange": exchange,
+                    "total_timesteps": total_timesteps,
+                },
+                base_version=version or registry.latest_version(key),
+            )
 
-        env = TradingEnv(data, news_features)
-        model = get_model()
-        model.set_env(env)
-        model.learn(total_timesteps=10000)
-        model.save("ppo_trading_model.zip")
+        # PPO.load(env=...) допускает другое число сред, в отличие от set_env()
+        # Чекпоинт содержит и состояние оптимизатора, и счётчик num_timesteps
+        model_path = (
+            job.checkpoint_path
+            if job.has_checkpoint()
+            else registry.model_file(key, job.base_version)
+        )
+        if model_path and os.path.exists(model_path):
+            model = PPO.load(model_path, env=env)
+        else:
+            model = PPO("MlpPolicy", env, verbose=1)
+        job.start(model.num_timesteps)
+        model.learn(
+            total_timesteps=job.remaining_steps,
+            callback=job.ppo_callback(),
+            reset_num_timesteps=False,
+        )
+        # Новая версия публикуется атомарно и подхватывается воркерами без перезапуска
+        new_version = registry.publish_model(key, model)
+        job.finish(new_version)
         logger.info("Model trained with RL and news")
         return "Model trained with RL and news"
     except Exception as e:
+        if job is not None:
+            job.fail(e)
         logger.error(f"Error training model: {e}")
         return f"Error: {e}"
 
 
 @shared_task
-def predict_price():
+def train_multi_symbol(
+    symbols,
+    timeframe="1h",
+    exchange="binance",
+    episode_lengths=(None,),
+    total_timesteps=100000,
+    workers=None,
+):
+    """
+    Обучить общую PPO-модель на нескольких символах в параллельных процессах.
+
+    Ряды берутся из снимков признаков (MarketDataset + analytics.feature_cache),
+    по одной среде на символ и длину эпизода;
+    процессы и привязка к ядрам — settings.RL_TRAIN_WORKERS / RL_CPU_AFFINITY.
+    В prefork-воркере Celery среды работают в одном процессе; параллельно —
+    в воркере с -P solo/threads или через manage.py train_multi_symbol.
+
+    :param symbols: Список символов.
+    :param timeframe: Временной интервал.
+    :param exchange: Биржа рядов.
+    :param episode_lengths: Длины эпизода (None — весь ряд); каждая даёт среду на символ.
+    :param total_timesteps: Шагов обучения.
+    :param workers: Количество процессов сред.
+    :return: Сообщение об успехе или ошибке.
+    """
+    from .parallel_training import run_parallel_training
+
+    try:
+        series = {}
+        for symbol in symbols:
+            dataset = MarketDataset(symbol, timeframe, exchange)
+            if not dataset.exists():
+                logger.warning(f"No market dataset for {symbol} {timeframe}")
+                continue
+            features = load_features(
+                symbol, timeframe, exchange, ("close", "volume", "sentiment")
+            )
+            series[symbol] = np.column_stack(
+                [features["close"], features["volume"], features["sentiment"]]
+            )
+        if not series:
+            return "No market data for requested symbols"
+
+        registry = get_registry()
+        key = make_key(timeframe=timeframe)
+        model = run_parallel_training(
+            series,
+            episode_lengths=episode_lengths,
+            total_timesteps=total_timesteps,
+            workers=workers,
+            model_path=registry.model_file(key),
+        )
+        version = registry.publish_model(key, model)
+        logger.info(f"Multi-symbol model trained on {list(series)}: version {version}")
+        return f"Multi-symbol model trained: version {version}"
+    except Exception as e:
+        logger.error(f"Error in multi-symbol training: {e}")
+        return f"Error: {e}"
+
+
+def latest_observation(symbol, timeframe="1h", exchange="binance", window=256):
+    """
+    Наблюдение TradingEnv для последней свечи ряда MarketDataset.
+
+    Признаки нормализуются по последним window свечам, баланс — начальный.
+
+    :param symbol: Символ актива.
+    :param timeframe: Временной интервал.
+    :param exchange: Биржа ряда.
+    :param window: Количество последних свечей для индикаторов и нормализации.
+    :return: Массив float32 из 7 значений.
+    """
+    columns = MarketDataset(symbol, timeframe, exchange).open(("close", "volume"))
+    tail = {name: column[-window:] for name, column in columns.items()}
+    env = TradingEnv(tail, np.zeros(len(tail["close"])))
+    env.current_step = env.max_steps
+    return env._get_obs().copy()
+
+
+@shared_task
+def predict_price(symbol=None, timeframe="1h", strategy=None, local_fallback=None):
     """
     Предсказать цену с использованием RL-модели.
 
+    Предсказание выполняет сервис пакетного инференса (analytics.inference),
+    который объединяет запросы всех стратегий в один forward pass.
+    Если сервис недоступен, модель вызывается в текущем процессе только
+    с local_fallback (по умолчанию settings.INFERENCE_LOCAL_FALLBACK).
+
+    :param symbol: Символ актива (наблюдение строится из MarketDataset).
+    :param timeframe: Временной интервал.
+    :param strategy: ID стратегии для выбора модели в реестре.
+    :param local_fallback: Разрешить локальный predict (только в воркерах).
     :return: Действие предсказания или сообщение об ошибке.
+    :raises InferenceUnavailable: Сервис недоступен и локальный predict запрещён.
     """
-    from news.tasks import get_news_sentiment
-
     try:
         last_hist = AnalyticsData.objects.last()
         if not last_hist:
             return "No historical data"
 
-        try:
-            from news.tasks import get_news_sentiment
+        # Модели обучены на наблюдениях TradingEnv — без ряда символа
+        # корректное наблюдение не построить
+        dataset = MarketDataset(symbol, timeframe) if symbol else None
+        if dataset is None or not dataset.exists():
+            return f"Error: no market data for {symbol}"
+        obs = latest_observation(symbol, timeframe)
+        last_close = float(dataset.open(("close",))["close"][-1])
 
-            news_sentiment = get_news_sentiment()[0] if get_news_sentiment() else 0
-        except ImportError:
-            news_sentiment = 0
-
-        obs = np.array([last_hist.price, last_hist.volume, news_sentiment])
-
-        model = get_model()
-        action, _ = model.predict(obs)
+        action = predict_action(obs, symbol, timeframe, strategy, local_fallback)
         prediction = Prediction(
-            action=action, predicted_price=last_hist.price, user=last_hist.user
+            action=action, predicted_price=last_close, user=last_hist.user
         )
         prediction.save()
         logger.info(f"Prediction made: action {action}")
         return action
+    except InferenceUnavailable:
+        # Вызывающий код (веб, бот) отвечает быстро: 503 или пропуск тика
+        raise
     except Exception as e:
         logger.error(f"Error predicting price: {e}")
         return f"Error: {e}"
 
 
+@shared_task
+def predict_next_prices(symbols, timeframe="1h", exchange="binance"):
+    """
+    Предсказать следующую цену закрытия LSTM-моделью для нескольких символов.
+
+    Окна всех символов проходят через граф модели одним батчем;
+    модель загружается реестром один раз на процесс.
+
+    :param symbols: Список символов (ряды MarketDataset).
+    :param timeframe: Временной интервал.
+    :param exchange: Биржа рядов.
+    :return: Словарь {"prices": {символ: цена}, "latency_ms": задержка батча}.
+    """
+    try:
+        predictor = get_registry().get(make_key(timeframe=timeframe, kind="lstm"))
+        # Запас истории на прогрев индикаторов
+        history = predictor.look_back * 2 + 100
+        windows = {}
+        for symbol in symbols:
+            dataset = MarketDataset(symbol, timeframe, exchange)
+            if not dataset.exists():
+                logger.warning(f"No market data for {symbol} {timeframe}")
+                continue
+            close = dataset.open(("close",))["close"]
+            windows[symbol] = predictor.prepare_window(close[-history:])
+        if not windows:
+            return "No market data for requested symbols"
+
+        prices = predictor.predict_batch(np.stack(list(windows.values())))
+        return {
+            "prices": dict(zip(windows, prices.tolist())),
+            "latency_ms": predictor.last_latency_ms,
+        }
+    except Exception as e:
+        logger.error(f"Error predicting next prices: {e}")
+        return f"Error: {e}"
+
+
 @shared_task
 def train_model_on_trade(trade_result, historical_data, news_data):
     """
-    Обучить модель после сделки (онлайн-обучение).
+    Записать исход сделки в буфер опыта (онлайн-обучение).
 
-    :param trade_result: Результат сделки.
+    Модель не дообучается на каждой сделке: исход дописывается в ReplayBuffer,
+    а обновление ставится в очередь одной задачей, когда накопилось достаточно
+    новых записей или прошёл интервал обновления.
+
+    :param trade_result: Результат сделки: {"profit", "symbol", "action"}.
     :param historical_data: Исторические данные.
     :param news_data: Данные новостей.
     :return: Сообщение об успехе или ошибке.
     """
+    from textblob import TextBlob
+
     try:
-        reward = (
-            trade_result.get("profit", 0) if trade_result.get("profit", 0) > 0 else -1
-        )
-        news_features = (
-            np.array([TextBlob(text).sentiment.polarity for text in news_data]).reshape(
-                -1, 1
-            )
+        sentiment = (
+            float(np.mean([TextBlob(text).sentiment.polarity for text in news_data]))
             if news_data
-            else np.zeros((len(historical_data), 1))
+            else 0.0
         )
+        buffer = ReplayBuffer()
+        pending = buffer.add(
+            historical_data,
+            sentiment=sentiment,
+            profit=trade_result.get("profit", 0),
+            symbol=trade_result.get("symbol"),
+            action=trade_result.get("action"),
+        )
+        if buffer.update_due(pending) and buffer.claim_schedule(
+            getattr(settings, "REPLAY_LOCK_TIMEOUT", 1800)
+        ):
+            update_model_from_replay.delay()
+        logger.info(f"Trade outcome recorded, {pending} pending for model update")
+        return "Trade outcome recorded"
+    except Exception as e:
+        logger.error(f"Error recording trade outcome: {e}")
+        return f"Error: {e}"
+
 
-        env = TradingEnv(historical_data, news_features)
-        model = get_model()
-        model.set_env(env)
-        model.learn(total_timesteps=100, reset_num_timesteps=False)
-        model.save("ppo_trading_model.zip")
-        logger.info("Model updated after trade")
-        return "Model updated after trade"
+@shared_task
+def update_model_from_replay(force=False):
+    """
+    Одно объединённое дообучение PPO на последних записях буфера опыта.
+
+    Опыт делится по символам (по среде VecTradingEnv на символ), исходы
+    сделок входят в награду за действие на шаге сделки.
+
+    Выполняется не более чем в одном воркере одновременно (Redis-lock);
+    новая версия модели публикуется атомарно через реестр моделей.
+    Запускается из train_model_on_trade и периодически по расписанию.
+
+    :param force: Обновить модель, даже если порог записей/интервала не достигнут.
+    :return: Сообщение об успехе или ошибке.
+    """
+    from stable_baselines3 import PPO
+
+    from .vec_trading_env import VecTradingEnv
+
+    buffer = ReplayBuffer()
+    lock = buffer.lock(getattr(settings, "REPLAY_LOCK_TIMEOUT", 1800))
+    if not lock.acquire(blocking=False):
+        return "Model update already running"
+    try:
+        added = int(buffer.client.get(REPLAY_ADDED_KEY) or 0)
+        if not (force or buffer.update_due()):
+            return "No model update due"
+
+        series = {
+            symbol: values
+            for symbol, values in buffer.recent(
+                getattr(settings, "REPLAY_SAMPLE_SIZE", 4096)
+            ).items()
+            if len(values[0]) >= 2
+        }
+        if not series:
+            return "Not enough experience in replay buffer"
+
+        # Отдельная среда на символ: цены разных символов не склеиваются в один ряд
+        num_envs = getattr(settings, "RL_NUM_ENVS", 8)
+        envs = {
+            symbol: VecTradingEnv(data, sentiment, num_envs=num_envs, outcome=outcome)
+            for symbol, (data, sentiment, outcome) in series.items()
+        }
+        first_env = next(iter(envs.values()))
+        registry = get_registry()
+        key = make_key()
+        model_path = registry.model_file(key)
+        # Свежая копия с диска: модель, которой сейчас пользуется инференс, не меняется
+        if model_path and os.path.exists(model_path):
+            model = PPO.load(model_path, env=first_env)
+        else:
+            model = PPO("MlpPolicy", first_env, verbose=1)
+        # Шаги обучения делятся между символами пропорционально их опыту
+        total_timesteps = getattr(settings, "REPLAY_LEARN_TIMESTEPS", 2048)
+        total_rows = sum(len(data) for data, _, _ in series.values())
+        for symbol, env in envs.items():
+            model.set_env(env)
+            model.learn(
+                total_timesteps=max(
+                    1, total_timesteps * len(series[symbol][0]) // total_rows
+                ),
+                reset_num_timesteps=False,
+            )
+        version = registry.publish_model(key, model)
+        buffer.mark_trained(added)
+        logger.info(f"Model updated from replay buffer: version {version}")
+        return f"Model updated from replay buffer: version {version}"
     except Exception as e:
-        logger.error(f"Error training on trade: {e}")
+        logger.error(f"Error updating model from replay buffer: {e}")
         return f"Error: {e}"
+    finally:
+        buffer.release_schedule()
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # Lock истёк по таймауту — его уже мог занять другой обновитель
+            pass
 
 
 @shared_task
@@ -221,51 +521,249 @@ def analyze_data_with_news(symbol, user_id=None):
 
 
 @shared_task
-def bulk_load_historical_data(symbol, timeframe="1h", limit=1000):
+def bulk_load_historical_data(symbol, timeframe="1h", limit=1000, exchange="binance"):
     """
     Массово загрузить исторические данные для символа.
 
+    Свечи дописываются в MarketDataset и пакетно записываются в таблицу Candle.
+
     :param symbol: Символ актива.
     :param timeframe: Временной интервал.
     :param limit: Количество записей.
+    :param exchange: Биржа ccxt.
+    :return: Количество записанных свечей или сообщение об ошибке.
     """
-    exchange = ccxt.binance()
-    data = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    objects = [
-        AnalyticsData(
-            symbol=symbol,
-            timestamp=d[0],
-            open=d[1],
-            high=d[2],
-            low=d[3],
-            close=d[4],
-            volume=d[5],
-        )
-        for d in data
-    ]
-    AnalyticsData.objects.bulk_create(objects, ignore_conflicts=True)
+    try:
+        from .exchange_pool import get_exchange
+
+        data = get_exchange(exchange).fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        MarketDataset(symbol, timeframe, exchange).append(data)
+        return Candle.objects.upsert(symbol, timeframe, exchange, data)
+    except Exception as e:
+        logger.error(f"Error in bulk_load_historical_data: {e}")
+        return f"Error: {e}"
 
 
 @shared_task
-def train_lstm_model(base_dir, limit=1000, epochs=100, batch_size=32):
+def train_lstm_model(
+    base_dir,
+    limit=1000,
+    epochs=100,
+    batch_size=32,
+    version=None,
+    job_id=None,
+    symbol="BTC/USDT",
+    timeframe="1m",
+    exchange="binance",
+):
     """
     Асинхронная задача для обучения LSTM-модели.
 
+    Данные читаются из снимка признаков ряда (analytics.feature_cache):
+    с биржи догружаются только свечи новее сохранённых.
+
+    Обучение идёт как задача TrainingJob: после каждой эпохи модель сохраняется
+    в чекпоинт, и прерванную задачу можно продолжить (resume_training_job).
+
     :param base_dir: Базовая директория (например, settings.BASE_DIR).
     :param limit: Количество данных для загрузки.
     :param epochs: Эпохи обучения.
     :param batch_size: Размер батча.
+    :param version: Версия реестра для дообучения на epochs эпох (по умолчанию — новая модель).
+    :param job_id: ID задачи для возобновления (опционально).
+    :param symbol: Символ актива.
+    :param timeframe: Временной интервал.
+    :param exchange: Биржа ряда.
     :return: Сообщение о статусе.
     """
+    from .training_jobs import TrainingJob
+
+    job = None
     try:
         from .model_trainer import ModelTrainer  # Импорт из model_trainer.py
 
+        registry = get_registry()
+        key = make_key(kind="lstm")
+        if job_id:
+            job = TrainingJob.load(job_id)
+        else:
+            job = TrainingJob.create(
+                "lstm",
+                key,
+                epochs,
+                params={
+                    "base_dir": base_dir,
+                    "limit": limit,
+                    "batch_size": batch_size,
+                    "symbol": symbol,
+                    "timeframe": timeframe,
+                    "exchange": exchange,
+                },
+                base_version=version,
+            )
+
         trainer = ModelTrainer(base_dir)
-        data = trainer.load_data_from_csv(limit=limit)
-        if data is None or len(data) < 100:
+        data = trainer.load_features(symbol, timeframe, exchange, limit=limit)
+        if len(data["close"]) < 100:
+            job.fail("Not enough data")
             return "Ошибка: Недостаточно данных для обучения."
-        model, scaler = trainer.train_model(data, epochs=epochs, batch_size=batch_size)
-        return f"Модель обучена и сохранена в {trainer.model_path}. Эпох: {epochs}, GPU: {'да' if tf.config.list_physical_devices('GPU') else 'нет'}."
+        trainer.train_model(
+            data,
+            epochs=job.total_steps,
+            batch_size=batch_size,
+            base_dir=registry.version_path(key, job.base_version)
+            if job.base_version
+            else None,
+            job=job,
+        )
+        new_version = registry.publish_files(
+            key, trainer.model_path, [trainer.scaler_path, trainer.features_path]
+        )
+        job.finish(new_version)
+        return f"Модель обучена и сохранена в {trainer.model_path}. Эпох: {job.total_steps}, версия: {new_version}."
     except Exception as e:
+        if job is not None:
+            job.fail(e)
         logger.error(f"Ошибка обучения LSTM: {str(e)}")
         return f"Ошибка обучения: {str(e)}"
+
+
+@shared_task
+def resume_training_job(job_id):
+    """
+    Продолжить прерванную задачу обучения с последнего чекпоинта.
+
+    :param job_id: ID задачи (analytics.training_jobs).
+    :return: Результат задачи обучения или сообщение об ошибке.
+    """
+    from .training_jobs import TrainingJob
+
+    try:
+        job = TrainingJob.load(job_id)
+        if job.status == "completed":
+            return f"Job {job_id} already completed: version {job.record['version']}"
+        train = {"ppo": train_ml_model, "lstm": train_lstm_model}[job.kind]
+        logger.info(f"Resuming training job {job_id} at {job.done_steps}/{job.total_steps}")
+        return train(**job.params, job_id=job_id)
+    except Exception as e:
+        logger.error(f"Error resuming training job {job_id}: {e}")
+        return f"Error: {e}"
+
+
+@shared_task
+def sweep_env_parameters(
+    symbol,
+    start,
+    end,
+    timeframe="1h",
+    stop_losses=(0.02, 0.05, 0.1),
+    take_profits=(0.05, 0.1, 0.2),
+    hold_penalties=(0.0, 0.1, 0.5),
+    workers=None,
+    top=20,
+    exchange="binance",
+):
+    """
+    Перебор stop_loss / take_profit / hold_penalty TradingEnv на истории символа.
+
+    Оценивается одна фиксированная последовательность действий модели,
+    а не политика при каждом наборе параметров: действия считаются один раз
+    по наблюдениям с балансом на начальном уровне (TradingEnv.predict_actions)
+    и переиспользуются для всех наборов. Реакция модели на выходы по SL/TP
+    (изменение баланса в наблюдении) не учитывается; рейтинг показывает, как
+    параметры выхода меняют результат тех же сигналов.
+
+    История читается из локального ряда MarketDataset (analytics.ohlcv_sync),
+    без загрузки с биржи.
+
+    :param symbol: Символ актива.
+    :param start: Начало периода (ISO-дата или миллисекунды).
+    :param end: Конец периода (ISO-дата или миллисекунды).
+    :param timeframe: Временной интервал.
+    :param stop_losses: Значения stop_loss.
+    :param take_profits: Значения take_profit.
+    :param hold_penalties: Значения hold_penalty.
+    :param workers: Количество процессов.
+    :param top: Сколько лучших строк вернуть.
+    :param exchange: Биржа ряда.
+    :return: Список строк рейтинга (параметры, sharpe_ratio, max_drawdown, var_95, ...)
+             или сообщение об ошибке.
+    """
+    from .market_data import to_milliseconds
+
+    try:
+        dataset = MarketDataset(symbol, timeframe, exchange)
+        if not dataset.exists():
+            return f"Error: no market data for {symbol} {timeframe}"
+        columns = dataset.open_range(
+            to_milliseconds(start), to_milliseconds(end), ("close", "volume")
+        )
+        if len(columns["close"]) < 2:
+            return "Not enough market data"
+
+        env = TradingEnv(columns, np.zeros(len(columns["close"])))
+        grid = build_grid(stop_losses, take_profits, hold_penalties)
+        actions = env.predict_actions(get_model())
+        table = run_sweep(columns["close"], actions, grid, workers=workers)
+        logger.info(f"Parameter sweep for {symbol}: {len(grid)} points")
+        return table[:top]
+    except Exception as e:
+        logger.error(f"Error in parameter sweep: {e}")
+        return f"Error: {e}"
+
+
+@shared_task
+def walk_forward_backtest(
+    symbol,
+    start,
+    end,
+    timeframe="1h",
+    train_size=2000,
+    test_size=500,
+    step=None,
+    retrain=False,
+    train_timesteps=10000,
+    workers=None,
+):
+    """
+    Walk-forward backtesting PPO-модели на истории символа.
+
+    В prefork-воркере Celery окна считаются последовательно; пул процессов
+    доступен в команде manage.py walk_forward_backtest.
+
+    :param symbol: Символ актива.
+    :param start: Начало периода (ISO-дата или миллисекунды).
+    :param end: Конец периода (ISO-дата или миллисекунды).
+    :param timeframe: Временной интервал.
+    :param train_size: Длина train-части окна (свечей).
+    :param test_size: Длина test-части окна (свечей).
+    :param step: Сдвиг между окнами (по умолчанию test_size).
+    :param retrain: Дообучать модель на каждом окне.
+    :param train_timesteps: Шагов обучения на окно.
+    :param workers: Количество процессов.
+    :return: Словарь с результатами окон и сводкой или сообщение об ошибке.
+    """
+    from .market_data import fetch_ohlcv_range, to_milliseconds
+    from .walk_forward import run_walk_forward
+
+    try:
+        ohlcv = fetch_ohlcv_range(
+            symbol, to_milliseconds(start), to_milliseconds(end), timeframe=timeframe
+        )
+        data = np.column_stack([ohlcv[:, 4], ohlcv[:, 5], np.zeros(len(ohlcv))])
+        report = run_walk_forward(
+            data,
+            train_size,
+            test_size,
+            step=step,
+            retrain=retrain,
+            train_timesteps=train_timesteps,
+            num_envs=getattr(settings, "RL_NUM_ENVS", 8),
+            model_path=get_registry().model_file(make_key()),
+            workers=workers,
+        )
+        logger.info(f"Walk-forward for {symbol}: {report['summary']}")
+        return report
+    except Exception as e:
+        logger.error(f"Error in walk-forward backtest: {e}")
+        return f"Error: {e}"
@@ -0,0 +1,93 @@
+"""
+Тесты векторизированного backtesting: backtest_batch и simulate_batch
+совпадают с пошаговыми TradingEnv.backtest() и TradingEnv.step().
+"""
+
+import numpy as np
+import pytest
+
+from analytics.backtest import backtest_batch, simulate_batch
+from analytics.trading_env import TradingEnv
+
+
+def make_env(num_points=300, seed=0, **kwargs):
+    rng = np.random.default_rng(seed)
+    # Волатильный ряд, чтобы срабатывали стоп-лосс и тейк-профит
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, num_points)))
+    data = np.column_stack([prices, rng.uniform(1, 10, num_points)])
+    return TradingEnv(data, rng.uniform(-1, 1, num_points), **kwargs)
+
+
+def make_actions(num_steps, seed=1):
+    return np.random.default_rng(seed).integers(0, 3, num_steps)
+
+
+def step_through(env, actions):
+    env._reset_episode(0, env.max_steps)
+    rows = []
+    for action in actions:
+        _, reward, _, _ = env.step(int(action))
+        rows.append((reward, env.position, env.balance))
+    return np.array(rows)
+
+
+def assert_metrics_equal(batch, expected):
+    assert batch.keys() == expected.keys()
+    for name, value in expected.items():
+        np.testing.assert_allclose(batch[name], value, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_backtest_batch_matches_backtest():
+    env = make_env()
+    actions = make_actions(env.max_steps)
+
+    expected = env.backtest(actions.tolist())
+    assert expected["num_trades"] > 0
+    assert_metrics_equal(backtest_batch(env.prices, actions), expected)
+    assert_metrics_equal(env.backtest_vectorized(actions), expected)
+
+
+def test_backtest_batch_short_actions_are_padded_with_hold():
+    env = make_env()
+    actions = make_actions(50)
+    assert_metrics_equal(
+        backtest_batch(env.prices, actions), env.backtest(actions.tolist())
+    )
+
+
+def test_backtest_batch_matrix_matches_each_row():
+    env = make_env()
+    actions = np.stack([make_actions(env.max_steps, seed) for seed in range(4)])
+
+    batch = backtest_batch(env.prices, actions)
+    for row, row_actions in enumerate(actions):
+        expected = env.backtest(row_actions.tolist())
+        assert_metrics_equal({name: value[row] for name, value in batch.items()}, expected)
+
+
+def test_simulate_batch_matches_step():
+    env = make_env()
+    actions = make_actions(env.max_steps)
+
+    result = simulate_batch(env.prices, actions)
+    expected = step_through(env, actions)
+    np.testing.assert_allclose(result["rewards"][0], expected[:, 0], rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(result["positions"][0], expected[:, 1])
+    np.testing.assert_allclose(result["balances"][0], expected[:, 2], rtol=1e-12)
+
+
+@pytest.mark.parametrize("param", ["stop_loss", "take_profit", "hold_penalty"])
+def test_simulate_batch_parameter_arrays(param):
+    values = {"stop_loss": [0.02, 0.05], "take_profit": [0.04, 0.1]}.get(
+        param, [0.0, 0.5]
+    )
+    env = make_env()
+    actions = make_actions(env.max_steps)
+
+    result = simulate_batch(env.prices, actions, **{param: np.array(values)})
+    for row, value in enumerate(values):
+        expected = step_through(make_env(**{param: value}), actions)
+        np.testing.assert_allclose(
+            result["rewards"][row], expected[:, 0], rtol=1e-9, atol=1e-9
+        )
+        np.testing.assert_allclose(result["balances"][row], expected[:, 2], rtol=1e-12)
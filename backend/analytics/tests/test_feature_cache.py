@@ -0,0 +1,74 @@
+"""
+Тесты снимка признаков: дописывание по частям совпадает с полным расчётом
+индикаторов, а TradingEnv поверх снимка — со средой, считающей их сама.
+"""
+
+import numpy as np
+import pytest
+
+from analytics import feature_cache
+from analytics.feature_cache import (
+    RSI_PERIOD,
+    SMA_WINDOWS,
+    FeatureSnapshot,
+    indicator_cache,
+)
+from analytics.indicators import IndicatorCache
+from analytics.trading_env import TradingEnv
+
+STEP = 3600 * 1000
+
+
+def make_candles(num_points, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_points)))
+    timestamps = np.arange(num_points) * STEP
+    return np.column_stack(
+        [timestamps, close, close, close, close, rng.uniform(1, 10, num_points)]
+    )
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    # Маленькие части, чтобы проверить перезапись хвоста и сжатие частей
+    monkeypatch.setattr(feature_cache, "PART_ROWS", 64)
+    monkeypatch.setattr(feature_cache, "TAIL_PART_ROWS", 16)
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 37])
+def test_append_matches_full_recompute(tmp_path, small_parts, chunk):
+    candles = make_candles(300)
+    snapshot = FeatureSnapshot("BTC/USDT", root=str(tmp_path))
+    # Первая порция короче периода RSI: состояние без сглаженных средних
+    snapshot.append(candles[:5])
+    for start in range(5, len(candles), chunk):
+        snapshot.append(candles[start : start + chunk])
+
+    features = snapshot.read()
+    expected = IndicatorCache(candles[:, 4], SMA_WINDOWS, rsi_period=RSI_PERIOD)
+    assert len(snapshot) == len(candles)
+    np.testing.assert_array_equal(features["timestamp"], candles[:, 0])
+    np.testing.assert_allclose(features["close"], candles[:, 4])
+    np.testing.assert_allclose(
+        features[f"rsi_{RSI_PERIOD}"], expected.rsi, rtol=1e-9, equal_nan=True
+    )
+    for window in SMA_WINDOWS:
+        np.testing.assert_allclose(
+            features[f"ma_{window}"], expected.sma[window], rtol=1e-9, equal_nan=True
+        )
+
+
+def test_trading_env_from_snapshot(tmp_path, small_parts):
+    candles = make_candles(200)
+    snapshot = FeatureSnapshot("BTC/USDT", root=str(tmp_path))
+    snapshot.append(candles[:120])
+    snapshot.append(candles[120:])
+
+    features = snapshot.read()
+    data = {"close": features["close"], "volume": features["volume"]}
+    env = TradingEnv(data, features["sentiment"], indicators=indicator_cache(features))
+    expected = TradingEnv(candles[:, [4, 5]], np.zeros(len(candles)))
+    np.testing.assert_allclose(env._features, expected._features, rtol=1e-6)
+
+    actions = np.random.default_rng(1).integers(0, 3, env.max_steps).tolist()
+    assert env.backtest(actions) == expected.backtest(actions)
@@ -0,0 +1,89 @@
+"""
+Тесты IndicatorCache: дописывание по новым свечам совпадает с полным расчётом.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from analytics.indicators import IndicatorCache
+from analytics.trading_env import TradingEnv
+
+
+def make_prices(num_points, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_points)))
+
+
+def assert_same(cache, expected, tail=None):
+    tail = tail or len(expected)
+    np.testing.assert_allclose(cache.prices[-tail:], expected.prices[-tail:])
+    np.testing.assert_allclose(cache.rsi[-tail:], expected.rsi[-tail:], rtol=1e-9)
+    for window in expected.sma_windows:
+        np.testing.assert_allclose(
+            cache.sma[window][-tail:], expected.sma[window][-tail:], rtol=1e-9
+        )
+    for span in expected.ema_spans:
+        np.testing.assert_allclose(
+            cache.ema[span][-tail:], expected.ema[span][-tail:], rtol=1e-9
+        )
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 100])
+def test_update_matches_full_recompute(chunk):
+    prices = make_prices(600)
+    cache = IndicatorCache(prices[:3], ema_spans=(12,))
+    for start in range(3, len(prices), chunk):
+        cache.update(prices[start : start + chunk])
+
+    assert len(cache) == len(prices)
+    assert_same(cache, IndicatorCache(prices, ema_spans=(12,)))
+
+
+def test_update_does_not_touch_returned_arrays():
+    prices = make_prices(100)
+    cache = IndicatorCache(prices[:50])
+    rsi = cache.rsi
+    before = rsi.copy()
+    cache.update(prices[50:])
+    np.testing.assert_array_equal(rsi, before)
+
+
+def test_state_round_trip():
+    prices = make_prices(500)
+    cache = IndicatorCache(prices[:300], ema_spans=(12,))
+    state = json.loads(json.dumps(cache.state()))
+
+    restored = IndicatorCache.from_state(state).update(prices[300:])
+    assert_same(restored, IndicatorCache(prices, ema_spans=(12,)), tail=200)
+
+
+def test_state_without_averages():
+    short = IndicatorCache(make_prices(5))
+    state = short.state()
+    assert state["avg_gain"] is None and state["avg_loss"] is None
+
+    prices = make_prices(50)
+    snapshot = IndicatorCache(prices)
+    cache = IndicatorCache.from_arrays(
+        prices, sma=snapshot.sma, rsi=snapshot.rsi, rsi_period=14
+    )
+    state = json.loads(json.dumps(cache.state()))
+    assert state["avg_gain"] is None
+    # Без сглаженных значений индикаторы считаются по хвосту заново
+    assert len(IndicatorCache.from_state(state)) == len(state["prices"])
+
+    resumed = IndicatorCache.from_state(short.state()).update(prices[5:])
+    assert_same(resumed, IndicatorCache(np.concatenate((make_prices(5), prices[5:]))))
+
+
+def test_trading_env_with_updated_cache():
+    prices = make_prices(400)
+    data = np.column_stack([prices, np.ones(len(prices))])
+    cache = IndicatorCache(prices[:100]).update(prices[100:250]).update(prices[250:])
+
+    expected = TradingEnv(data, np.zeros(len(prices)))
+    env = TradingEnv(data, np.zeros(len(prices)), indicators=cache)
+    assert env.indicators is cache
+    np.testing.assert_allclose(env._features, expected._features, rtol=1e-6)
@@ -0,0 +1,72 @@
+"""
+Тесты транспорта инференса на fakeredis: срок запросов и отказ без
+локального predict.
+"""
+
+import json
+import time
+from unittest import mock
+
+import fakeredis
+import pytest
+
+from analytics.inference import (
+    INFERENCE_QUEUE_KEY,
+    InferenceServer,
+    InferenceUnavailable,
+    predict_action,
+    request_action,
+)
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+def enqueue(client, reply, deadline):
+    client.rpush(
+        INFERENCE_QUEUE_KEY,
+        json.dumps(
+            {
+                "reply": reply,
+                "key": ["default", "1h", "default", "ppo"],
+                "obs": [0.0] * 7,
+                "ts": time.time(),
+                "deadline": deadline,
+            }
+        ),
+    )
+
+
+def test_collect_drops_expired_requests(client):
+    server = InferenceServer(client=client, registry=object(), batch_window_ms=0)
+    enqueue(client, "reply:old", time.time() - 1)
+    enqueue(client, "reply:new", time.time() + 10)
+
+    requests = server.collect(block_timeout=1)
+
+    assert [request["reply"] for request in requests] == ["reply:new"]
+    assert server.expired == 1
+
+
+def test_request_action_removes_request_after_timeout(client):
+    with pytest.raises(TimeoutError):
+        request_action([0.0] * 7, timeout=0.05, client=client)
+    assert client.llen(INFERENCE_QUEUE_KEY) == 0
+
+
+def test_predict_action_fails_fast_without_local_fallback():
+    with mock.patch(
+        "analytics.inference.request_action", side_effect=TimeoutError("timeout")
+    ), mock.patch("analytics.inference.predict_local") as predict_local:
+        with pytest.raises(InferenceUnavailable):
+            predict_action([0.0] * 7, local_fallback=False)
+    predict_local.assert_not_called()
+
+
+def test_predict_action_uses_local_fallback_when_allowed():
+    with mock.patch(
+        "analytics.inference.request_action", side_effect=TimeoutError("timeout")
+    ), mock.patch("analytics.inference.predict_local", return_value=2):
+        assert predict_action([0.0] * 7, local_fallback=True) == 2
@@ -0,0 +1,31 @@
+"""
+Тесты MarketDataset: дописывание без дублей и чтение периода.
+"""
+
+import numpy as np
+
+from analytics.market_dataset import MarketDataset
+
+STEP = 3600 * 1000
+
+
+def candles(first, count):
+    return [[first + i * STEP, 1.0, 2.0, 0.5, 1.0 + i, 10.0 + i] for i in range(count)]
+
+
+def test_append_skips_known_candles(tmp_path):
+    dataset = MarketDataset("BTC/USDT", root=str(tmp_path))
+    assert dataset.append(candles(0, 5)) == 5
+    assert dataset.append(candles(3 * STEP, 4)) == 2
+    assert len(dataset) == 7
+    assert dataset.last_timestamp() == 6 * STEP
+
+
+def test_open_range(tmp_path):
+    dataset = MarketDataset("BTC/USDT", root=str(tmp_path))
+    dataset.append(candles(0, 10))
+
+    columns = dataset.open_range(2 * STEP, 5 * STEP, ("close", "volume"))
+    np.testing.assert_array_equal(columns["close"], [3.0, 4.0, 5.0])
+    np.testing.assert_array_equal(columns["volume"], [12.0, 13.0, 14.0])
+    assert len(dataset.open_range(20 * STEP, 30 * STEP, ("close",))["close"]) == 0
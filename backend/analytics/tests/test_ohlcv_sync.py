@@ -0,0 +1,81 @@
+"""
+Тесты листания OHLCV: конец листания, отсечение незакрытой свечи
+и постраничная загрузка с фейковой биржей.
+"""
+
+import asyncio
+
+import numpy as np
+
+from analytics.async_fetcher import fetch_since_async
+from analytics.ohlcv_sync import closed_candles, is_last_page, timeframe_ms
+
+STEP = 3600 * 1000
+NOW = 1_700_000_000_000 - 1_700_000_000_000 % STEP + STEP // 2  # середина часа
+
+
+class FakeAsyncExchange:
+    """Биржа со свечами до текущей (незакрытой) включительно и урезанием страниц."""
+
+    def __init__(self, first_ts, now_ms, max_page=3):
+        self.candles = [
+            [ts, 1.0, 2.0, 0.5, 1.5, 10.0] for ts in range(first_ts, now_ms, STEP)
+        ]
+        self.max_page = max_page
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls.append(since)
+        rows = [row for row in self.candles if row[0] >= since]
+        return rows[: min(limit, self.max_page)]
+
+
+def fetch(client, since, page_limit=1000):
+    return asyncio.run(
+        fetch_since_async(
+            client, "BTC/USDT", "1h", since, page_limit, NOW, asyncio.Semaphore(1)
+        )
+    )
+
+
+def test_timeframe_ms():
+    assert timeframe_ms("1h") == STEP
+    assert timeframe_ms("1m") == 60 * 1000
+
+
+def test_is_last_page_when_next_candle_not_closed():
+    last_closed = NOW - NOW % STEP - STEP
+    assert is_last_page(NOW - NOW % STEP, 0, STEP, NOW)
+    assert not is_last_page(last_closed - STEP, 0, STEP, NOW)
+
+
+def test_is_last_page_when_exchange_returns_older_candles():
+    assert is_last_page(1000, 2000, STEP, NOW)
+
+
+def test_closed_candles_drops_open_candle():
+    open_ts = NOW - NOW % STEP
+    pages = [
+        np.array([[open_ts - 2 * STEP, 1, 1, 1, 1, 1], [open_ts - STEP, 1, 1, 1, 1, 1]]),
+        np.array([[open_ts, 1, 1, 1, 1, 1]]),
+    ]
+    rows = closed_candles(pages, STEP, NOW)
+    assert rows[:, 0].tolist() == [open_ts - 2 * STEP, open_ts - STEP]
+    assert closed_candles([], STEP, NOW).shape == (0, 6)
+
+
+def test_fetch_pages_past_truncated_pages():
+    first_ts = NOW - NOW % STEP - 10 * STEP
+    client = FakeAsyncExchange(first_ts, NOW, max_page=3)
+    rows = fetch(client, first_ts)
+    # 10 закрытых свечей страницами по 3, незакрытая текущая отброшена
+    assert rows[:, 0].tolist() == [first_ts + i * STEP for i in range(10)]
+    assert len(client.calls) == 4
+    assert client.calls[1] == first_ts + 2 * STEP + 1
+
+
+def test_fetch_caught_up_series_makes_no_request():
+    client = FakeAsyncExchange(NOW - NOW % STEP - 5 * STEP, NOW)
+    rows = fetch(client, NOW - NOW % STEP)
+    assert len(rows) == 0
+    assert client.calls == []
@@ -0,0 +1,49 @@
+"""
+Тесты параллельного обучения: разбор и фильтрация ядер, привязка к ядрам
+не меняет вызывающий процесс.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from analytics.parallel_training import (
+    available_cpus,
+    parse_cpu_list,
+    run_parallel_training,
+)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8, 10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
+    assert parse_cpu_list([2, 3]) == [2, 3]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Linux only")
+def test_available_cpus_drops_missing_cpus():
+    allowed = sorted(os.sched_getaffinity(0))
+    missing = max(allowed) + 1
+    assert available_cpus(allowed + [missing]) == allowed
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Linux only")
+def test_in_process_training_keeps_caller_affinity():
+    before = os.sched_getaffinity(0)
+    cpus = ",".join(str(cpu) for cpu in sorted(before)) + f",{max(before) + 1}"
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+    data = np.column_stack([prices, np.ones(200), np.zeros(200)])
+
+    model = run_parallel_training(
+        {"BTC/USDT": data},
+        episode_lengths=(32,),
+        total_timesteps=64,
+        workers=1,
+        cpu_affinity=cpus,
+        seed=0,
+    )
+
+    assert model is not None
+    assert os.sched_getaffinity(0) == before
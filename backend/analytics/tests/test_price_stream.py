@@ -0,0 +1,95 @@
+"""
+Тесты потока цен на fakeredis: кольцевой буфер, устаревшие цены
+и догрузка с биржи, обновление последней цены без изменения.
+"""
+
+import json
+import time
+from unittest import mock
+
+import fakeredis
+import pytest
+
+from analytics.price_stream import (
+    LAST_KEY,
+    FakeExchange,
+    PriceIngestor,
+    PriceStore,
+    latest_prices,
+)
+
+
+class RecordingLayer:
+    """Channel layer, который запоминает разосланные сообщения."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+@pytest.fixture
+def store():
+    return PriceStore(fakeredis.FakeRedis(), buffer_size=3)
+
+
+def tick(price, ts, symbol="BTC/USDT", exchange="fake"):
+    return {"exchange": exchange, "symbol": symbol, "price": price, "ts": ts}
+
+
+def test_publish_trims_tick_buffer(store):
+    now_ms = int(time.time() * 1000)
+    for i in range(5):
+        store.publish([tick(100.0 + i, now_ms + i)])
+
+    history = store.history("fake", "BTC/USDT")
+    assert history == [[now_ms + 2, 102.0], [now_ms + 3, 103.0], [now_ms + 4, 104.0]]
+    assert store.history("fake", "BTC/USDT", limit=1) == [[now_ms + 4, 104.0]]
+    assert store.latest([("fake", "BTC/USDT")]) == {("fake", "BTC/USDT"): 104.0}
+
+
+def test_latest_skips_stale_and_missing(store):
+    now_ms = int(time.time() * 1000)
+    store.publish([tick(1.0, now_ms - 60_000), tick(2.0, now_ms, symbol="ETH/USDT")])
+
+    prices = store.latest(
+        [("fake", "BTC/USDT"), ("fake", "ETH/USDT"), ("fake", "SOL/USDT")], max_age=30
+    )
+    assert prices == {("fake", "ETH/USDT"): 2.0}
+
+
+def test_latest_prices_fetches_stale_once_and_stores_it(store):
+    now_ms = int(time.time() * 1000)
+    store.publish([tick(1.0, now_ms - 60_000), tick(2.0, now_ms, symbol="ETH/USDT")])
+    pairs = [("fake", "BTC/USDT"), ("fake", "ETH/USDT")]
+
+    with mock.patch(
+        "analytics.async_fetcher.fetch_prices",
+        return_value={("fake", "BTC/USDT"): 3.0},
+    ) as fetch_prices:
+        prices = latest_prices(pairs, max_age=30, store=store)
+
+    fetch_prices.assert_called_once_with({("fake", "BTC/USDT")})
+    assert prices == {("fake", "BTC/USDT"): 3.0, ("fake", "ETH/USDT"): 2.0}
+    assert store.latest(pairs, max_age=30) == prices
+
+
+def test_poll_refreshes_unchanged_price_without_new_tick(store):
+    layer = RecordingLayer()
+    ingestor = PriceIngestor(
+        exchange="fake",
+        symbols=["BTC/USDT"],
+        client=FakeExchange(volatility=0.0),
+        store=store,
+        channel_layer=layer,
+    )
+    assert len(ingestor.poll_once()) == 1
+    last_key = LAST_KEY.format(exchange="fake", symbol="BTC/USDT")
+    first_ts = json.loads(store.client.get(last_key))[0]
+    time.sleep(0.01)
+
+    assert ingestor.poll_once() == []
+    assert json.loads(store.client.get(last_key))[0] > first_ts
+    assert len(store.history("fake", "BTC/USDT")) == 1
+    assert len(layer.sent) == 1
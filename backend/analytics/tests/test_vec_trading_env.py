@@ -0,0 +1,51 @@
+"""
+Тесты VecTradingEnv: шаг N эпизодов совпадает с N копиями TradingEnv.step().
+"""
+
+import numpy as np
+
+from analytics.trading_env import TradingEnv
+from analytics.vec_trading_env import VecTradingEnv
+
+NUM_ENVS = 4
+
+
+def make_data(num_points=200, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, num_points)))
+    return np.column_stack([prices, rng.uniform(1, 10, num_points)]), rng.uniform(
+        -1, 1, num_points
+    )
+
+
+def test_step_matches_trading_env():
+    data, sentiment = make_data()
+    vec_env = VecTradingEnv(data, sentiment, num_envs=NUM_ENVS)
+    envs = [TradingEnv(data, sentiment) for _ in range(NUM_ENVS)]
+    actions = np.random.default_rng(1).integers(0, 3, (vec_env.max_steps, NUM_ENVS))
+
+    obs = vec_env.reset()
+    np.testing.assert_allclose(obs, [env.reset() for env in envs], rtol=1e-6)
+    for step_actions in actions:
+        obs, rewards, dones, infos = vec_env.step(step_actions)
+        expected = [env.step(int(action)) for env, action in zip(envs, step_actions)]
+
+        np.testing.assert_allclose(
+            rewards, [reward for _, reward, _, _ in expected], rtol=1e-5, atol=1e-5
+        )
+        np.testing.assert_array_equal(dones, [done for _, _, done, _ in expected])
+        if dones.any():
+            break
+        np.testing.assert_allclose(vec_env.balance, [env.balance for env in envs])
+        np.testing.assert_allclose(
+            obs, [observation for observation, _, _, _ in expected], rtol=1e-6
+        )
+
+    # Последний шаг ряда завершает все эпизоды и сбрасывает их
+    assert dones.all() and vec_env.current_step.max() == 0
+    for info, env in zip(infos, envs):
+        assert info["TimeLimit.truncated"] is False
+        np.testing.assert_allclose(info["terminal_observation"][3], env._get_obs()[3])
+        np.testing.assert_allclose(
+            info["episode"]["r"], env.total_reward, rtol=1e-5, atol=1e-5
+        )
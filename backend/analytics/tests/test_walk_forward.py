@@ -0,0 +1,43 @@
+"""
+Тесты walk-forward: out-of-sample признаки не зависят от будущего test-части.
+"""
+
+import numpy as np
+
+from analytics.trading_env import TradingEnv
+from analytics.walk_forward import _test_env, split_windows
+
+
+def make_data(num_points, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_points)))
+    return np.column_stack(
+        [prices, rng.uniform(1, 10, num_points), rng.uniform(-1, 1, num_points)]
+    )
+
+
+def test_split_windows():
+    assert split_windows(10, 4, 2) == [(0, 4, 6), (2, 6, 8), (4, 8, 10)]
+    assert split_windows(10, 4, 2, step=3) == [(0, 4, 6), (3, 7, 9)]
+
+
+def test_test_features_use_train_normalization():
+    data = make_data(300)
+    window = (0, 200, 300)
+    env = _test_env(data, window, {})
+
+    train_env = TradingEnv(data[:200, :2], data[:200, 2])
+    price_min, price_max = train_env.normalization_stats()["price"]
+    expected = (data[200:, 0] - price_min) / (price_max - price_min)
+    np.testing.assert_allclose(env._features[:, 0], expected, rtol=1e-6)
+
+
+def test_test_features_do_not_look_ahead():
+    data = make_data(300)
+    changed = data.copy()
+    # Выброс в конце test-части не меняет признаки более ранних шагов
+    changed[-1, 0] *= 10
+    changed[-1, 1] *= 10
+    env = _test_env(data, (0, 200, 300), {})
+    env_changed = _test_env(changed, (0, 200, 300), {})
+    np.testing.assert_array_equal(env._features[:-1], env_changed._features[:-1])
@@ -6,19 +6,29 @@
 Улучшения:
 - Награда: Добавлены штрафы за hold в убыточных позициях, бонусы за правильные действия, и компонент риска (на основе drawdown).
 - Наблюдения: Включены дополнительные фичи (SMA5, SMA10, RSI) для richer context.
-- Backtesting: Добавлен метод backtest() для симуляции и анализа производительности, включая Sharpe ratio и VaR.
+  Индикаторы считаются модулем analytics.indicators за один проход (RSI по Уайлдеру).
+- Backtesting: Добавлен метод backtest() для симуляции и анализа производительности, включая Sharpe ratio и VaR
+  (метрики считаются модулем analytics.metrics).
+- Векторизированный backtesting: backtest_vectorized() считает массив или матрицу действий через analytics.backtest.
 - Стоп-лосс/тейк-профит: Автоматические выходы из позиций при достижении уровней.
+- Эпизоды фиксированной длины: episode_length со случайным или стратифицированным стартом (analytics.episode_sampler).
 - Логирование: Добавлено для отладки и мониторинга.
 """
 
 import logging
+from collections.abc import Mapping
 
 import gym
 import numpy as np
 from django.core.exceptions import ValidationError
 from gym import spaces
 
+from .backtest import DEFAULT_COMMISSION_RATE, backtest_batch
+from .episode_sampler import EpisodeSampler
+from .indicators import IndicatorCache
+from .metrics import compute_metrics
 from .models import Prediction
+from .prediction_sink import PredictionSink
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +42,7 @@ class TradingEnv(gym.Env):
     - Observation: нормализованные [price, volume, sentiment, balance, sma5, sma10, rsi]
     - Actions: 0=hold, 1=buy (long), 2=sell (short)
     - Reward: реалистичный, учитывает profit/loss, позиции, комиссии, штрафы и риск
-    - Интеграция с Django: опциональное сохранение Prediction в БД
+    - Интеграция с Django: опциональное сохранение Prediction в БД (пакетами через PredictionSink)
     - Обработка ошибок и нормализация
     - Улучшения: штрафы за hold, дополнительные фичи, backtesting, стоп-лосс/тейк-профит, логирование
     """
@@ -46,41 +56,79 @@ class TradingEnv(gym.Env):
         stop_loss=0.05,  # 5% убыток для выхода
         take_profit=0.10,  # 10% прибыль для выхода
         hold_penalty=0.1,  # Штраф за hold в убыточной позиции
+        indicators=None,
+        prediction_sink=None,
+        episode_length=None,
+        episode_start="random",
+        seed=None,
+        features=None,
+        normalization=None,
     ):
         """
         Инициализация среды.
 
         :param historical_data: Список исторических данных [[price, volume], ...]
+            или колонки {"close": ..., "volume": ...} (например, из MarketDataset.open())
         :param news_features: Список sentiment-значений [[sentiment], ...]
         :param initial_balance: Начальный баланс
         :param user: Пользователь для сохранения в БД (опционально)
         :param stop_loss: Процент для стоп-лосс (например, 0.05 = 5%)
         :param take_profit: Процент для тейк-профит (например, 0.10 = 10%)
         :param hold_penalty: Штраф за hold в убыточной позиции
+        :param indicators: IndicatorCache для этого ряда цен, общий для нескольких сред (опционально)
+        :param prediction_sink: PredictionSink для пакетной записи Prediction
+            (по умолчанию синхронный буфер, если задан user)
+        :param episode_length: Длина эпизода в шагах (None — весь ряд от начала)
+        :param episode_start: Выбор старта эпизода: 'random' или 'stratified'
+        :param seed: Seed выбора стартов эпизодов
+        :param features: Готовая матрица признаков float32 (T, 7) этого ряда
+            (например, из shared memory); индикаторы и нормализация не пересчитываются
+        :param normalization: Границы нормализации из normalization_stats() другого
+            ряда (например, train-части) вместо min/max этого ряда
         """
         super(TradingEnv, self).__init__()
 
-        self.historical_data = np.array(historical_data)
-        self.news_features = np.array(news_features).reshape(-1, 1)
+        if isinstance(historical_data, Mapping):
+            # Колоночный источник (например, memmap из MarketDataset) — без копирования
+            self.historical_data = historical_data
+            self.prices = np.asarray(historical_data["close"])
+            self.volumes = np.asarray(historical_data["volume"])
+        else:
+            # asarray: уже готовый массив (в т.ч. memmap) не копируется
+            self.historical_data = np.asarray(historical_data)
+            if len(self.historical_data) and (
+                self.historical_data.ndim != 2 or self.historical_data.shape[1] < 2
+            ):
+                raise ValidationError(
+                    "historical_data must have at least price and volume columns"
+                )
+            self.prices = self.historical_data[:, 0] if len(self.historical_data) else []
+            self.volumes = self.historical_data[:, 1] if len(self.historical_data) else []
+        self.news_features = np.asarray(news_features).reshape(-1, 1)
 
-        if len(self.historical_data) == 0 or len(self.news_features) == 0:
+        if len(self.prices) == 0 or len(self.news_features) == 0:
             raise ValidationError("historical_data and news_features cannot be empty")
-        if len(self.historical_data) != len(self.news_features):
+        if len(self.prices) != len(self.news_features):
             raise ValidationError(
                 "historical_data and news_features must have the same length"
             )
-        if self.historical_data.shape[1] < 2:
-            raise ValidationError(
-                "historical_data must have at least price and volume columns"
-            )
 
         self.initial_balance = initial_balance
         self.balance = initial_balance
         self.current_step = 0
-        self.max_steps = len(self.historical_data) - 1
+        self.max_steps = len(self.prices) - 1
+        self.episode_sampler = (
+            EpisodeSampler(self.max_steps, episode_length, episode_start, seed=seed)
+            if episode_length
+            else None
+        )
+        self.end_step = self.max_steps
         self.position = 0  # 0=no position, 1=long, -1=short
         self.entry_price = None  # Цена входа в позицию
         self.user = user
+        if user and prediction_sink is None:
+            prediction_sink = PredictionSink()
+        self.prediction_sink = prediction_sink
         self.stop_loss = stop_loss
         self.take_profit = take_profit
         self.hold_penalty = hold_penalty
@@ -92,62 +140,150 @@ class TradingEnv(gym.Env):
         # Обновлено: 7 фич (price, volume, sentiment, balance, sma5, sma10, rsi)
         self.observation_space = spaces.Box(low=0, high=1, shape=(7,), dtype=np.float32)
 
-        # Нормализация для price, volume, sentiment
-        self.price_min = np.min(self.historical_data[:, 0])
-        self.price_max = np.max(self.historical_data[:, 0])
-        self.volume_min = np.min(self.historical_data[:, 1])
-        self.volume_max = np.max(self.historical_data[:, 1])
-        self.sentiment_min = np.min(self.news_features)
-        self.sentiment_max = np.max(self.news_features)
-
-        # Предварительный расчёт SMA и RSI
-        self._precompute_features()
-
-        # Нормализация для новых фич
-        self.sma5_min = np.min(self.sma5)
-        self.sma5_max = np.max(self.sma5)
-        self.sma10_min = np.min(self.sma10)
-        self.sma10_max = np.max(self.sma10)
-        self.rsi_min = 0  # RSI от 0 до 100
-        self.rsi_max = 100
-
-        # Коррекция для избежания деления на ноль
-        for attr in ["price", "volume", "sentiment", "sma5", "sma10", "rsi"]:
-            min_attr = getattr(self, f"{attr}_min")
-            max_attr = getattr(self, f"{attr}_max")
-            if max_attr == min_attr:
-                setattr(self, f"{attr}_min", min_attr - 1e-6)
-                setattr(self, f"{attr}_max", max_attr + 1e-6)
-
-    def _precompute_features(self):
-        """Предварительный расчёт SMA и RSI для всех шагов."""
-        prices = self.historical_data[:, 0]
-        self.sma5 = np.convolve(prices, np.ones(5) / 5, mode="valid")
-        self.sma5 = np.concatenate(
-            [np.full(4, prices[0]), self.sma5]
-        )  # Паддинг для первых шагов
-        self.sma10 = np.convolve(prices, np.ones(10) / 10, mode="valid")
-        self.sma10 = np.concatenate([np.full(9, prices[0]), self.sma10])
-
-        # RSI (простая реализация)
-        self.rsi = np.zeros(len(prices))
-        for i in range(14, len(prices)):
-            gains = np.diff(prices[i - 14 : i + 1])
-            avg_gain = np.mean(gains[gains > 0]) if np.any(gains > 0) else 0
-            avg_loss = -np.mean(gains[gains < 0]) if np.any(gains < 0) else 0
-            rs = avg_gain / avg_loss if avg_loss != 0 else 100
-            self.rsi[i] = 100 - (100 / (1 + rs))
-        # Паддинг для первых 14
-        self.rsi[:14] = 50  # Нейтральное значение
+        if features is not None:
+            features = np.asarray(features)
+            if features.shape != (len(self.prices), 7):
+                raise ValidationError("features must have shape (len(prices), 7)")
+            self._features = features
+        else:
+            # Нормализация для price, volume, sentiment
+            self.price_min = np.min(self.prices)
+            self.price_max = np.max(self.prices)
+            self.volume_min = np.min(self.volumes)
+            self.volume_max = np.max(self.volumes)
+            self.sentiment_min = np.min(self.news_features)
+            self.sentiment_max = np.max(self.news_features)
+
+            # Предварительный расчёт SMA и RSI
+            self._precompute_features(indicators)
+
+            # Нормализация для новых фич
+            self.sma5_min = np.min(self.sma5)
+            self.sma5_max = np.max(self.sma5)
+            self.sma10_min = np.min(self.sma10)
+            self.sma10_max = np.max(self.sma10)
+            self.rsi_min = 0  # RSI от 0 до 100
+            self.rsi_max = 100
+
+            # Внешние границы: out-of-sample ряд не знает собственного будущего диапазона
+            for attr, (low, high) in (normalization or {}).items():
+                setattr(self, f"{attr}_min", low)
+                setattr(self, f"{attr}_max", high)
+
+            # Коррекция для избежания деления на ноль
+            for attr in ["price", "volume", "sentiment", "sma5", "sma10", "rsi"]:
+                min_attr = getattr(self, f"{attr}_min")
+                max_attr = getattr(self, f"{attr}_max")
+                if max_attr == min_attr:
+                    setattr(self, f"{attr}_min", min_attr - 1e-6)
+                    setattr(self, f"{attr}_max", max_attr + 1e-6)
+
+            # Статические признаки нормализуются один раз; на шаге меняется только баланс
+            self._features = self._normalized_features()
+        self._obs = np.zeros(7, dtype=np.float32)
+        self._zero_obs = np.zeros(7, dtype=np.float32)
+
+    @classmethod
+    def from_dataset(cls, dataset, news_features=None, **kwargs):
+        """
+        Создать среду поверх MarketDataset через np.memmap, без загрузки ряда в память.
+
+        :param dataset: analytics.market_dataset.MarketDataset
+        :param news_features: Sentiment-значения (по умолчанию нули)
+        :param kwargs: Остальные параметры TradingEnv
+        :return: TradingEnv
+        """
+        columns = dataset.open(("close", "volume"))
+        if news_features is None:
+            news_features = np.zeros(len(columns["close"]), dtype=np.float32)
+        return cls(columns, news_features, **kwargs)
+
+    def _precompute_features(self, indicators=None):
+        """
+        Предварительный расчёт SMA и RSI для всех шагов.
+
+        :param indicators: Готовый IndicatorCache для этого ряда цен (опционально)
+        """
+        prices = self.prices
+        if indicators is None or len(indicators) != len(prices):
+            indicators = IndicatorCache(prices, sma_windows=(5, 10), rsi_period=14)
+        self.indicators = indicators
+
+        # Паддинг для первых шагов: цена начала ряда и нейтральный RSI
+        self.sma5 = np.nan_to_num(indicators.sma[5], nan=prices[0])
+        self.sma10 = np.nan_to_num(indicators.sma[10], nan=prices[0])
+        self.rsi = np.nan_to_num(indicators.rsi, nan=50)
+
+    def _normalized_features(self):
+        """
+        Нормализованные признаки для всех шагов одной матрицей.
+
+        Колонка баланса (индекс 3) заполнена нулями: она зависит от состояния эпизода.
+
+        :return: Массив float32 формы (T, 7)
+        """
+        features = np.zeros((len(self.prices), 7), dtype=np.float32)
+        features[:, 0] = (self.prices - self.price_min) / (
+            self.price_max - self.price_min
+        )
+        features[:, 1] = (self.volumes - self.volume_min) / (
+            self.volume_max - self.volume_min
+        )
+        features[:, 2] = (self.news_features[:, 0] - self.sentiment_min) / (
+            self.sentiment_max - self.sentiment_min
+        )
+        features[:, 4] = (self.sma5 - self.sma5_min) / (self.sma5_max - self.sma5_min)
+        features[:, 5] = (self.sma10 - self.sma10_min) / (
+            self.sma10_max - self.sma10_min
+        )
+        features[:, 6] = (self.rsi - self.rsi_min) / (self.rsi_max - self.rsi_min)
+        return features
+
+    def normalization_stats(self):
+        """
+        Границы нормализации признаков этого ряда.
+
+        :return: Словарь {признак: (min, max)} для параметра normalization
+        """
+        return {
+            attr: (
+                float(getattr(self, f"{attr}_min")),
+                float(getattr(self, f"{attr}_max")),
+            )
+            for attr in ("price", "volume", "sentiment", "sma5", "sma10", "rsi")
+        }
+
+    def seed(self, seed=None):
+        """Seed выбора стартов эпизодов."""
+        if self.episode_sampler is not None:
+            self.episode_sampler.seed(seed)
+        return [seed]
 
     def reset(self):
         """
         Сброс среды к начальному состоянию.
 
+        С episode_length эпизод начинается со смещения из EpisodeSampler;
+        признаки не пересчитываются, поэтому сброс выполняется за O(1).
+
+        :return: Начальное наблюдение
+        """
+        if self.episode_sampler is not None:
+            start = self.episode_sampler.sample()
+            return self._reset_episode(start, start + self.episode_sampler.episode_length)
+        return self._reset_episode(0, self.max_steps)
+
+    def _reset_episode(self, start_step, end_step):
+        """
+        Сброс состояния на эпизод [start_step, end_step).
+
         :return: Начальное наблюдение
         """
+        if self.prediction_sink is not None:
+            self.prediction_sink.flush()
         self.balance = self.initial_balance
-        self.current_step = 0
+        self.current_step = start_step
+        self.end_step = end_step
         self.position = 0
         self.entry_price = None
         self.total_reward = 0
@@ -161,16 +297,16 @@ class TradingEnv(gym.Env):
         :param action: Действие (0=hold, 1=buy, 2=sell)
         :return: Кортеж (obs, reward, done, info)
         """
-        if self.current_step >= self.max_steps:
+        if self.current_step >= self.end_step:
             return self._get_obs(), 0, True, {}
 
-        current_price = self.historical_data[self.current_step, 0]
+        current_price = self.prices[self.current_step]
         next_price = (
-            self.historical_data[self.current_step + 1, 0]
+            self.prices[self.current_step + 1]
             if self.current_step + 1 <= self.max_steps
             else current_price
         )
-        commission_rate = 0.001
+        commission_rate = DEFAULT_COMMISSION_RATE
         reward = 0
 
         # Проверка стоп-лосс/тейк-профит перед действием
@@ -230,25 +366,16 @@ class TradingEnv(gym.Env):
         self.total_reward += reward
         self.portfolio_values.append(self.balance)  # Трекинг значений портфеля
 
-        # Сохранение в БД
+        # Сохранение в БД: буферизируется и пишется пачками через bulk_create
         if self.user:
-            try:
-                prediction = Prediction(
-                    action=action,
-                    predicted_price=next_price,
-                    user=self.user,
-                    timestamp=(
-                        self.historical_data[self.current_step + 1, 0]
-                        if self.current_step + 1 <= self.max_steps
-                        else None
-                    ),
-                )
-                prediction.save()
-            except Exception as e:
-                logger.error(f"Error saving Prediction: {e}")
+            self.prediction_sink.add(
+                Prediction(action=action, predicted_price=next_price, user=self.user)
+            )
 
         self.current_step += 1
-        done = self.current_step >= self.max_steps
+        done = self.current_step >= self.end_step
+        if done and self.prediction_sink is not None:
+            self.prediction_sink.flush()
         obs = self._get_obs()
 
         logger.debug(
@@ -260,40 +387,25 @@ class TradingEnv(gym.Env):
         """
         Получить нормализованное наблюдение.
 
+        Строка предвычисленной матрицы признаков копируется в буфер среды
+        вместе с текущим балансом, без выделения нового массива на шаге;
+        сама матрица не меняется, поэтому её можно разделять между средами.
+        Вызывающий код, который хранит наблюдения, должен копировать их сам.
+
         :return: Массив нормализованных значений
         """
-        if self.current_step >= len(self.historical_data):
-            return np.zeros(7, dtype=np.float32)
-
-        price = self.historical_data[self.current_step, 0]
-        volume = self.historical_data[self.current_step, 1]
-        sentiment = self.news_features[self.current_step, 0]
-        balance_norm = self.balance / self.initial_balance
-        sma5 = self.sma5[self.current_step]
-        sma10 = self.sma10[self.current_step]
-        rsi = self.rsi[self.current_step]
-
-        price_norm = (price - self.price_min) / (self.price_max - self.price_min)
-        volume_norm = (volume - self.volume_min) / (self.volume_max - self.volume_min)
-        sentiment_norm = (sentiment - self.sentiment_min) / (
-            self.sentiment_max - self.sentiment_min
-        )
-        sma5_norm = (sma5 - self.sma5_min) / (self.sma5_max - self.sma5_min)
-        sma10_norm = (sma10 - self.sma10_min) / (self.sma10_max - self.sma10_min)
-        rsi_norm = (rsi - self.rsi_min) / (self.rsi_max - self.rsi_min)
-
-        return np.array(
-            [
-                price_norm,
-                volume_norm,
-                sentiment_norm,
-                balance_norm,
-                sma5_norm,
-                sma10_norm,
-                rsi_norm,
-            ],
-            dtype=np.float32,
-        )
+        if self.current_step >= len(self._features):
+            return self._zero_obs
+
+        obs = self._obs
+        obs[:] = self._features[self.current_step]
+        obs[3] = self.balance / self.initial_balance
+        return obs
+
+    def close(self):
+        """Дописать буфер предсказаний в БД и остановить фонового писателя."""
+        if self.prediction_sink is not None:
+            self.prediction_sink.close()
 
     def render(self, mode="human"):
         """
@@ -304,7 +416,7 @@ class TradingEnv(gym.Env):
         print(
             f"Step: {self.current_step}, Balance: {self.balance:.2f}, "
             f"Position: {self.position}, "
-            f"Price: {self.historical_data[self.current_step, 0]:.2f}, "
+            f"Price: {self.prices[self.current_step]:.2f}, "
             f"Entry Price: {self.entry_price if self.entry_price else 'None'}, "
             f"Total Reward: {self.total_reward:.2f}"
         )
@@ -314,15 +426,15 @@ class TradingEnv(gym.Env):
         Метод для backtesting: симулирует среду с заданными действиями или случайными.
         Возвращает статистику производительности, включая Sharpe ratio и VaR.
 
+        Всегда проходит весь ряд, независимо от episode_length.
+
         :param actions: Список действий (опционально, иначе случайные)
-        :return: Словарь с метриками (total_reward, win_rate, max_drawdown, sharpe_ratio, var_95, etc.)
+        :return: Словарь с метриками (total_reward, win_rate, max_drawdown, sharpe_ratio, var_95,
+                 sortino_ratio, calmar_ratio, max_drawdown_duration, cvar_95, turnover, etc.)
         """
-        self.reset()
+        self._reset_episode(0, self.max_steps)
         rewards = []
-        wins = 0
-        losses = 0
-        peak_balance = self.balance
-        max_drawdown = 0
+        positions = []
 
         for step in range(self.max_steps):
             if actions:
@@ -331,46 +443,69 @@ class TradingEnv(gym.Env):
                 action = self.action_space.sample()
             obs, reward, done, info = self.step(action)
             rewards.append(reward)
-            if reward > 0:
-                wins += 1
-            elif reward < 0:
-                losses += 1
-            # Drawdown
-            if self.balance > peak_balance:
-                peak_balance = self.balance
-            drawdown = (peak_balance - self.balance) / peak_balance
-            max_drawdown = max(max_drawdown, drawdown)
+            positions.append(self.position)
             if done:
                 break
 
         total_reward = sum(rewards)
-        win_rate = wins / (wins + losses) if (wins + losses) > 0 else 0
-
-        # Расчёт Sharpe ratio и VaR на основе portfolio_values
-        if len(self.portfolio_values) > 1:
-            returns = np.diff(self.portfolio_values) / np.array(
-                self.portfolio_values[:-1]
-            )
-            sharpe_ratio = (
-                np.mean(returns) / np.std(returns) * np.sqrt(252)
-                if np.std(returns) > 0
-                else 0
-            )  # Годовой Sharpe
-            var_95 = np.percentile(returns, 5)  # VaR 95% (нижний 5-й процентиль)
-        else:
-            sharpe_ratio = 0
-            var_95 = 0
+        # Drawdown, Sharpe, VaR и остальные метрики — векторно по portfolio_values
+        metrics = compute_metrics(
+            equity=self.portfolio_values, positions=positions, pnl=rewards
+        )
 
         logger.info(
-            f"Backtest results: Total reward {total_reward}, Sharpe {sharpe_ratio:.2f}, VaR 95% {var_95:.4f}"
+            f"Backtest results: Total reward {total_reward}, "
+            f"Sharpe {metrics['sharpe_ratio']:.2f}, VaR 95% {metrics['var']:.4f}"
         )
 
         return {
             "total_reward": total_reward,
-            "win_rate": win_rate,
-            "max_drawdown": max_drawdown,
+            "win_rate": metrics["win_rate"],
+            "max_drawdown": metrics["max_drawdown"],
             "final_balance": self.balance,
-            "num_trades": wins + losses,
-            "sharpe_ratio": sharpe_ratio,
-            "var_95": var_95,
+            "num_trades": int(np.count_nonzero(rewards)),
+            "sharpe_ratio": metrics["sharpe_ratio"],
+            "var_95": metrics["var"],
+            "sortino_ratio": metrics["sortino_ratio"],
+            "calmar_ratio": metrics["calmar_ratio"],
+            "max_drawdown_duration": metrics["max_drawdown_duration"],
+            "cvar_95": metrics["cvar"],
+            "turnover": metrics["turnover"],
         }
+
+    def predict_actions(self, model):
+        """
+        Действия модели по всем шагам среды одним батчем.
+
+        Наблюдения берутся из предвычисленной матрицы признаков с балансом
+        на начальном уровне, поэтому действия не зависят от параметров
+        stop_loss/take_profit/hold_penalty и подходят для backtest_vectorized().
+
+        :param model: Модель с методом predict (например, PPO)
+        :return: Массив действий длиной max_steps
+        """
+        observations = self._features[: self.max_steps].copy()
+        observations[:, 3] = 1.0
+        actions, _ = model.predict(observations, deterministic=True)
+        return np.asarray(actions, dtype=np.int8)
+
+    def backtest_vectorized(self, actions):
+        """
+        Векторизированный backtesting без пошагового вызова step().
+
+        Даёт те же результаты, что и backtest() на тех же действиях, но принимает
+        также матрицу (N, T) и оценивает N стратегий за один проход.
+        Состояние среды не изменяется.
+
+        :param actions: Массив действий (T,) или матрица (N, T)
+        :return: Словарь с метриками как у backtest(); для матрицы — массивы длины N
+        """
+        return backtest_batch(
+            self.prices,
+            actions,
+            initial_balance=self.initial_balance,
+            stop_loss=self.stop_loss,
+            take_profit=self.take_profit,
+            hold_penalty=self.hold_penalty,
+            commission_rate=DEFAULT_COMMISSION_RATE,
+        )
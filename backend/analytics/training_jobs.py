@@ -0,0 +1,264 @@
+"""
+Модуль возобновляемых задач обучения с чекпоинтами.
+
+Каждый запуск обучения — задача (job) со своей директорией:
+
+    TRAINING_JOBS_DIR/<job_id>/job.json   — запись: статус, прогресс, параметры
+    TRAINING_JOBS_DIR/<job_id>/model.zip  — чекпоинт PPO (или model.h5 для LSTM)
+
+Во время обучения модель вместе с состоянием оптимизатора периодически
+сохраняется в чекпоинт (атомарно, через временный файл), и в записи
+отмечается пройденный прогресс: шаги среды для PPO, эпохи для LSTM.
+После перезапуска воркера или лимита времени Celery задача продолжает
+обучение с последнего чекпоинта (resume_training_job), а не с начала.
+
+Директория задачи повторяет раскладку версии реестра (model.*, scaler.npy,
+features.json), поэтому продолжение с чекпоинта и дообучение существующей
+версии на N шагов выполняются одним кодом.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+
+from .model_registry import MODEL_KINDS, ModelKey
+
+logger = logging.getLogger(__name__)
+
+
+def jobs_root():
+    """Корневая директория задач обучения (settings.TRAINING_JOBS_DIR)."""
+    return getattr(
+        settings,
+        "TRAINING_JOBS_DIR",
+        os.path.join(settings.BASE_DIR, "models", "jobs"),
+    )
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class TrainingJob:
+    """
+    Запись задачи обучения и её чекпоинт.
+
+    Статусы: running, completed, failed (failed с чекпоинтом можно возобновить).
+    """
+
+    def __init__(self, record, root=None):
+        """
+        :param record: Словарь записи (см. create())
+        :param root: Корневая директория задач (по умолчанию jobs_root())
+        """
+        self.record = record
+        self.root = root or jobs_root()
+
+    @classmethod
+    def create(cls, kind, key, total_steps, params=None, base_version=None, root=None):
+        """
+        Создать задачу обучения.
+
+        :param kind: Тип модели: 'ppo' или 'lstm'
+        :param key: ModelKey, под которым будет опубликован результат
+        :param total_steps: Шагов среды (PPO) или эпох (LSTM) в этой задаче
+        :param params: Параметры задачи Celery для возобновления
+        :param base_version: Версия реестра, которую задача дообучает (опционально)
+        :return: TrainingJob
+        """
+        now = time.time()
+        job = cls(
+            {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "key": list(key),
+                "params": params or {},
+                "status": "running",
+                "total_steps": int(total_steps),
+                "done_steps": 0,
+                # Счётчик шагов модели на момент старта задачи (PPO.num_timesteps)
+                "start_timesteps": None,
+                "base_version": base_version,
+                "version": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            },
+            root,
+        )
+        os.makedirs(job.path, exist_ok=True)
+        job.save()
+        logger.info(f"Created training job {job.id}: {kind} {key}, {total_steps} steps")
+        return job
+
+    @classmethod
+    def load(cls, job_id, root=None):
+        """
+        Загрузить задачу по ID.
+
+        :raises FileNotFoundError: Задачи нет
+        """
+        root = root or jobs_root()
+        with open(os.path.join(root, job_id, "job.json")) as f:
+            return cls(json.load(f), root)
+
+    @property
+    def id(self):
+        return self.record["id"]
+
+    @property
+    def kind(self):
+        return self.record["kind"]
+
+    @property
+    def key(self):
+        return ModelKey(*self.record["key"])
+
+    @property
+    def params(self):
+        return self.record["params"]
+
+    @property
+    def status(self):
+        return self.record["status"]
+
+    @property
+    def base_version(self):
+        return self.record["base_version"]
+
+    @property
+    def total_steps(self):
+        return self.record["total_steps"]
+
+    @property
+    def done_steps(self):
+        return self.record["done_steps"]
+
+    @property
+    def remaining_steps(self):
+        return max(self.total_steps - self.done_steps, 0)
+
+    @property
+    def path(self):
+        return os.path.join(self.root, self.id)
+
+    @property
+    def checkpoint_path(self):
+        filename, _ = MODEL_KINDS[self.kind]
+        return os.path.join(self.path, filename)
+
+    def has_checkpoint(self):
+        return os.path.exists(self.checkpoint_path)
+
+    def save(self):
+        self.record["updated_at"] = time.time()
+        _write_json(os.path.join(self.path, "job.json"), self.record)
+
+    def update(self, **fields):
+        self.record.update(fields)
+        self.save()
+
+    def start(self, start_timesteps=0):
+        """Отметить (повторный) запуск задачи."""
+        if self.record["start_timesteps"] is None:
+            self.record["start_timesteps"] = int(start_timesteps)
+        self.update(status="running", error=None)
+
+    def checkpoint(self, save, done_steps):
+        """
+        Сохранить чекпоинт и отметить прогресс.
+
+        :param save: Функция save(path), записывающая модель в файл
+        :param done_steps: Пройдено шагов (эпох) с начала задачи
+        """
+        base, ext = os.path.splitext(self.checkpoint_path)
+        tmp_path = f"{base}.tmp{ext}"
+        save(tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+        self.update(done_steps=int(done_steps))
+        logger.info(f"Training job {self.id}: checkpoint at {done_steps}/{self.total_steps}")
+
+    def finish(self, version):
+        """Отметить завершение; чекпоинт больше не нужен."""
+        if self.has_checkpoint():
+            os.remove(self.checkpoint_path)
+        self.update(status="completed", version=version, done_steps=self.total_steps)
+
+    def fail(self, error):
+        """Отметить прерывание; чекпоинт сохраняется для возобновления."""
+        self.update(status="failed", error=str(error))
+
+    def ppo_callback(self, interval=None):
+        """Callback PPO.learn(), сохраняющий чекпоинт каждые interval шагов."""
+        from stable_baselines3.common.callbacks import BaseCallback
+
+        job = self
+        interval = interval or getattr(settings, "TRAINING_CHECKPOINT_INTERVAL", 10000)
+
+        class PPOCheckpointCallback(BaseCallback):
+            """
+            Чекпоинт PPO в начале сбора rollout: к этому моменту предыдущий
+            rollout уже учтён в весах, и num_timesteps точно соответствует модели.
+            """
+
+            def __init__(self):
+                super().__init__()
+                self._last_checkpoint = None
+
+            def _done_steps(self):
+                return self.model.num_timesteps - job.record["start_timesteps"]
+
+            def _on_rollout_start(self):
+                done = self._done_steps()
+                if self._last_checkpoint is None:
+                    self._last_checkpoint = done
+                elif done - self._last_checkpoint >= interval:
+                    job.checkpoint(self.model.save, done)
+                    self._last_checkpoint = done
+
+            def _on_step(self):
+                return True
+
+        return PPOCheckpointCallback()
+
+    def keras_callback(self):
+        """Callback Keras model.fit(), сохраняющий чекпоинт после каждой эпохи."""
+        import tensorflow as tf
+
+        job = self
+
+        class KerasCheckpointCallback(tf.keras.callbacks.Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                job.checkpoint(self.model.save, epoch + 1)
+
+        return KerasCheckpointCallback()
+
+
+def list_jobs(status=None, root=None):
+    """
+    Задачи обучения, от новых к старым.
+
+    :param status: Фильтр по статусу (опционально)
+    :return: Список TrainingJob
+    """
+    root = root or jobs_root()
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    jobs = []
+    for name in names:
+        try:
+            job = TrainingJob.load(name, root)
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            continue
+        if status is None or job.status == status:
+            jobs.append(job)
+    return sorted(jobs, key=lambda job: job.record["created_at"], reverse=True)
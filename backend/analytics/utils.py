@@ -5,14 +5,26 @@
 в облачное хранилище Amazon S3 с использованием библиотеки boto3.
 """
 
-import boto3
+from functools import lru_cache
+
 from django.conf import settings
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-)
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    Клиент S3, создаётся при первом обращении (boto3 не импортируется при загрузке модуля).
+
+    Returns:
+        botocore.client.S3: Клиент Amazon S3.
+    """
+    import boto3
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
 
 
 def save_model_to_s3(model_path, bucket_name, key):
@@ -27,7 +39,7 @@ def save_model_to_s3(model_path, bucket_name, key):
     Returns:
         None
     """
-    s3.upload_file(model_path, bucket_name, key)
+    get_s3_client().upload_file(model_path, bucket_name, key)
 
 
 def load_model_from_s3(bucket_name, key, local_path):
@@ -42,4 +54,4 @@ def load_model_from_s3(bucket_name, key, local_path):
     Returns:
         None
     """
-    s3.download_file(bucket_name, key, local_path)
+    get_s3_client().download_file(bucket_name, key, local_path)
@@ -0,0 +1,244 @@
+"""
+Модуль векторизированной RL-среды для обучения PPO.
+
+VecTradingEnv хранит N независимых эпизодов TradingEnv в виде массивов
+(позиции, балансы, цены входа, индексы шагов) и продвигает их все одним
+вызовом step(actions). Реализует интерфейс VecEnv из Stable Baselines3,
+поэтому передаётся в PPO(...) напрямую, без DummyVecEnv/SubprocVecEnv.
+
+С episode_length каждый эпизод занимает окно фиксированной длины со
+случайным или стратифицированным стартом: обучение на многолетней истории
+покрывает все участки ряда при постоянной стоимости эпизода.
+"""
+
+import logging
+
+import numpy as np
+
+# SB3 2.x работает со spaces из gymnasium
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from .backtest import DEFAULT_COMMISSION_RATE, advance_positions
+from .episode_sampler import EpisodeSampler
+from .trading_env import TradingEnv
+
+logger = logging.getLogger(__name__)
+
+
+class VecTradingEnv(VecEnv):
+    """
+    N копий TradingEnv на одном ряду данных, симулируемых массивами NumPy.
+
+    Логика шага (SL/TP, комиссии, штраф за hold, компонент риска) совпадает
+    с TradingEnv.step(). Завершившиеся эпизоды сбрасываются автоматически,
+    терминальное наблюдение кладётся в info["terminal_observation"];
+    эпизоды с episode_length завершаются по лимиту длины
+    (info["TimeLimit.truncated"] = True).
+    Сохранение Prediction в БД не поддерживается.
+    """
+
+    def __init__(
+        self,
+        historical_data,
+        news_features,
+        num_envs=8,
+        initial_balance=10000,
+        stop_loss=0.05,
+        take_profit=0.10,
+        hold_penalty=0.1,
+        indicators=None,
+        episode_length=None,
+        episode_start="random",
+        seed=None,
+        outcome=None,
+    ):
+        """
+        Инициализация векторизированной среды.
+
+        :param historical_data: Список исторических данных [[price, volume], ...]
+        :param news_features: Список sentiment-значений [[sentiment], ...]
+        :param num_envs: Количество параллельных эпизодов
+        :param initial_balance: Начальный баланс
+        :param stop_loss: Процент для стоп-лосс
+        :param take_profit: Процент для тейк-профит
+        :param hold_penalty: Штраф за hold в убыточной позиции
+        :param indicators: IndicatorCache для этого ряда цен (опционально)
+        :param episode_length: Длина эпизода в шагах (None — весь ряд от начала)
+        :param episode_start: Выбор старта эпизода: 'random' или 'stratified'
+        :param seed: Seed выбора стартов эпизодов
+        :param outcome: Награда за направление действия по шагам (T,): buy на шаге
+            получает +outcome, sell — −outcome (например, исход реальной сделки
+            из буфера опыта); по умолчанию нет
+        """
+        # Валидация и расчёт признаков переиспользуются из TradingEnv
+        template = TradingEnv(
+            historical_data,
+            news_features,
+            initial_balance=initial_balance,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            hold_penalty=hold_penalty,
+            indicators=indicators,
+        )
+        self.prices = np.asarray(template.prices, dtype=np.float64)
+        self.features = template._features
+        self.max_steps = template.max_steps
+        if outcome is not None:
+            outcome = np.asarray(outcome, dtype=np.float64)
+            if outcome.shape != self.prices.shape:
+                raise ValueError("outcome must have the same length as historical_data")
+        self.outcome = outcome
+        # Один генератор на все эпизоды: страты не повторяются между средами
+        self.episode_sampler = (
+            EpisodeSampler(self.max_steps, episode_length, episode_start, seed=seed)
+            if episode_length
+            else None
+        )
+        self.initial_balance = initial_balance
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.hold_penalty = hold_penalty
+
+        observation_space = spaces.Box(low=0, high=1, shape=(7,), dtype=np.float32)
+        action_space = spaces.Discrete(3)
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.end_step = np.full(num_envs, self.max_steps, dtype=np.int64)
+        self.position = np.zeros(num_envs)
+        self.entry_price = np.full(num_envs, np.nan)
+        self.balance = np.full(num_envs, float(initial_balance))
+        self.episode_reward = np.zeros(num_envs)
+        self.episode_length = np.zeros(num_envs, dtype=np.int64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+
+    def _reset_envs(self, mask):
+        """Сброс состояния эпизодов, отмеченных маской."""
+        if self.episode_sampler is not None:
+            start = self.episode_sampler.sample(int(np.count_nonzero(mask)))
+            self.current_step[mask] = start
+            self.end_step[mask] = start + self.episode_sampler.episode_length
+        else:
+            self.current_step[mask] = 0
+        self.position[mask] = 0
+        self.entry_price[mask] = np.nan
+        self.balance[mask] = self.initial_balance
+        self.episode_reward[mask] = 0
+        self.episode_length[mask] = 0
+
+    def _get_obs(self):
+        """
+        Наблюдения всех эпизодов.
+
+        :return: Массив float32 формы (N, 7)
+        """
+        obs = self.features[self.current_step]
+        obs[:, 3] = self.balance / self.initial_balance
+        return obs
+
+    def reset(self):
+        """
+        Сброс всех эпизодов.
+
+        :return: Начальные наблюдения (N, 7)
+        """
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        """
+        Продвинуть все эпизоды на один шаг.
+
+        :return: Кортеж (obs, rewards, dones, infos)
+        """
+        actions = self._actions
+        price = self.prices[self.current_step]
+        next_price = self.prices[self.current_step + 1]
+
+        rewards = np.zeros(self.num_envs)
+        exit_reward = advance_positions(
+            price,
+            actions == 1,
+            actions == 2,
+            self.position,
+            self.entry_price,
+            self.balance,
+            self.stop_loss,
+            self.take_profit,
+            DEFAULT_COMMISSION_RATE,
+        )
+        if exit_reward is not None:
+            rewards += exit_reward
+
+        rewards += self.position * ((next_price - price) / price * 100)
+
+        # Штраф за hold в убыточной позиции
+        pnl = self.position * (price - self.entry_price) / self.entry_price
+        rewards[(actions == 0) & (pnl < 0)] -= self.hold_penalty
+
+        # Исход реальной сделки на этом шаге: награда за то же направление
+        if self.outcome is not None:
+            direction = (actions == 1).astype(np.float64) - (actions == 2)
+            rewards += direction * self.outcome[self.current_step]
+
+        # Компонент риска
+        rewards -= np.maximum(
+            0, (self.initial_balance - self.balance) / self.initial_balance * 10
+        )
+
+        self.current_step += 1
+        self.episode_reward += rewards
+        self.episode_length += 1
+        dones = self.current_step >= self.end_step
+
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            terminal_obs = self._get_obs()
+            # Эпизод фиксированной длины обрывается по лимиту, а не по концу
+            # ряда: PPO оценивает продолжение через value терминального наблюдения
+            truncated = self.episode_sampler is not None
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = terminal_obs[i]
+                infos[i]["TimeLimit.truncated"] = truncated
+                infos[i]["episode"] = {
+                    "r": float(self.episode_reward[i]),
+                    "l": int(self.episode_length[i]),
+                }
+            self._reset_envs(dones)
+
+        return self._get_obs(), rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        """Атрибуты общие для всех эпизодов, значение повторяется по индексам."""
+        return [getattr(self, attr_name) for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
+
+    def seed(self, seed=None):
+        self.action_space.seed(seed)
+        if self.episode_sampler is not None:
+            self.episode_sampler.seed(seed)
+        return [seed for _ in range(self.num_envs)]
@@ -17,7 +17,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import AnalyticsData, Prediction, Trade
+from .inference import InferenceUnavailable
+from .models import CANDLE_COLUMNS, AnalyticsData, Candle, Prediction, Trade
 from .tasks import (
     analyze_data_with_news,
     predict_price,
@@ -54,53 +55,43 @@ class AnalyticsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def history(self, request):
         """
-        Получает исторические данные для символа, используя задачу bulk_load_historical_data.
+        Получает последние свечи символа из общей таблицы Candle.
+
+        Если свечей ряда ещё нет, запускается задача bulk_load_historical_data.
 
         Args:
-            request: HTTP-запрос с параметрами symbol и period.
+            request: HTTP-запрос с параметрами symbol, period и exchange.
 
         Returns:
             Response: Данные истории или ошибка.
         """
         symbol = request.query_params.get("symbol")
-        period = request.query_params.get(
-            "period", "1h"
-        )  # Изменено на '1h' по умолчанию, как в tasks.py
+        period = request.query_params.get("period", "1h")
+        exchange = request.query_params.get("exchange", "binance")
         if not symbol:
             return Response(
                 {"error": "Symbol required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        cache_key = f"history_{symbol}_{period}"
+        cache_key = f"history_{exchange}_{symbol}_{period}"
         cached_data = cache.get(cache_key)
         if cached_data:
             return Response({"data": cached_data})
 
         try:
-            # Вызываем задачу bulk_load_historical_data для загрузки данных
-            from .tasks import bulk_load_historical_data
-
-            bulk_load_historical_data.delay(
-                symbol, period, 100
-            )  # limit=100, как в оригинале
-
-            # После вызова задачи, получаем данные из БД (предполагаем, что задача сохранила их)
-            # Поскольку bulk_load_historical_data сохраняет данные, извлекаем их
-            analytics_data = AnalyticsData.objects.filter(
-                symbol=symbol, user=request.user
-            ).order_by("-timestamp")[:100]
+            candles = Candle.objects.arrays(symbol, period, exchange, tail=100)
+            if not len(candles["timestamp"]):
+                from .tasks import bulk_load_historical_data
+
+                bulk_load_historical_data.delay(symbol, period, 100, exchange)
+                return Response({"data": []})
+
             data = [
-                {
-                    "timestamp": obj.timestamp,
-                    "open": obj.open,
-                    "high": obj.high,
-                    "low": obj.low,
-                    "close": obj.close,
-                    "volume": obj.volume,
-                }
-                for obj in analytics_data
+                dict(zip(CANDLE_COLUMNS, row))
+                for row in zip(
+                    *(candles[name].tolist() for name in CANDLE_COLUMNS)
+                )
             ]
-
             cache.set(cache_key, data, timeout=3600)
 
             return Response({"data": data})
@@ -111,6 +102,41 @@ class AnalyticsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @action(detail=False, methods=["get"])
+    def price(self, request):
+        """
+        Получает последнюю цену и последние тики символа из потока цен.
+
+        Args:
+            request: HTTP-запрос с параметрами symbol, exchange и limit.
+
+        Returns:
+            Response: Цена и тики [ts, цена] или ошибка.
+        """
+        from .price_stream import PriceStore, current_price
+
+        symbol = request.query_params.get("symbol")
+        exchange = request.query_params.get("exchange", "binance")
+        if not symbol:
+            return Response(
+                {"error": "Symbol required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = int(request.query_params.get("limit", 100))
+            return Response(
+                {
+                    "price": current_price(symbol, exchange),
+                    "ticks": PriceStore().history(exchange, symbol, limit),
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error in price: {e}")
+            return Response(
+                {"error": "Failed to fetch price"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
     @action(detail=False, methods=["post"])
     def predict(self, request):
         """
@@ -129,10 +155,9 @@ class AnalyticsViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            # Вызываем задачу predict_price, которая использует RL-модель и сохраняет результат
-            action = (
-                predict_price.delay().get()
-            )  # predict_price не принимает параметры, использует last_hist
+            # Прямой вызов без Celery: predict_price обращается к сервису пакетного
+            # инференса, который объединяет запросы в один forward pass
+            action = predict_price(symbol, local_fallback=False)
 
             # Получаем последнее предсказание из БД
             last_prediction = Prediction.objects.filter(user=request.user).last()
@@ -146,6 +171,12 @@ class AnalyticsViewSet(viewsets.ModelViewSet):
                 )
             else:
                 return Response({"action": action})
+        except InferenceUnavailable as e:
+            logger.warning(f"Predict unavailable: {e}")
+            return Response(
+                {"error": "Inference service unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         except Exception as e:
             logger.error(f"Error in predict: {e}")
             return Response(
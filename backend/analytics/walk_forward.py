@@ -0,0 +1,244 @@
+"""
+Модуль walk-forward backtesting для TradingEnv.
+
+История делится на скользящие окна train/test. Для каждого окна модель
+(опционально) дообучается на train-части и оценивается на следующей за ней
+out-of-sample test-части через векторизированный backtest. Независимые окна
+считаются в пуле процессов, данные передаются через shared memory.
+Демонический процесс (prefork-воркер Celery) не может создать пул, поэтому
+задача walk_forward_backtest в таком воркере считает окна последовательно;
+параллельно — командой manage.py walk_forward_backtest или в воркере
+с -P solo/threads.
+
+Результаты окон кэшируются по хэшу данных окна, параметров и версии модели,
+поэтому повторный запуск на дополненной истории считает только новые окна.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.cache import cache
+from stable_baselines3 import PPO
+
+from .shared_arrays import attach, release, to_shared
+from .trading_env import TradingEnv
+from .vec_trading_env import VecTradingEnv
+
+logger = logging.getLogger(__name__)
+
+WALK_FORWARD_CACHE_TIMEOUT = 7 * 24 * 3600
+# Версия расчёта окна в ключе кэша: результаты старых версий не переиспользуются
+WALK_FORWARD_CACHE_VERSION = 2
+
+# Состояние воркера (заполняется в _init_worker)
+_worker = {}
+
+
+def split_windows(num_points, train_size, test_size, step=None):
+    """
+    Разбивает историю на скользящие окна.
+
+    :param num_points: Длина истории
+    :param train_size: Длина train-части
+    :param test_size: Длина test-части
+    :param step: Сдвиг между окнами (по умолчанию test_size — test-части не пересекаются)
+    :return: Список кортежей (train_start, train_end, test_end)
+    """
+    step = step or test_size
+    windows = []
+    start = 0
+    while start + train_size + test_size <= num_points:
+        windows.append((start, start + train_size, start + train_size + test_size))
+        start += step
+    return windows
+
+
+def _model_fingerprint(model_path):
+    """Версия файла модели для ключа кэша (mtime и размер)."""
+    if model_path and os.path.exists(model_path):
+        stat = os.stat(model_path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    return "none"
+
+
+def _window_key(data, window, params, fingerprint):
+    digest = hashlib.sha1(data[window[0] : window[2]].tobytes())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(fingerprint.encode())
+    return f"walk_forward_v{WALK_FORWARD_CACHE_VERSION}_{digest.hexdigest()}"
+
+
+def _load_model(model_path):
+    """Загрузка базовой модели один раз на процесс."""
+    if model_path not in _worker.setdefault("models", {}):
+        _worker["models"][model_path] = PPO.load(model_path)
+    return _worker["models"][model_path]
+
+
+def _evaluate_window(data, window, params, model_path):
+    """
+    Обучение (опционально) и оценка одного окна.
+
+    :param data: Массив (T, 3): price, volume, sentiment
+    :return: Словарь с границами окна и метриками backtest
+    """
+    train_start, train_end, test_end = window
+    env_params = params["env"]
+
+    if params["retrain"]:
+        train = data[train_start:train_end]
+        train_env = VecTradingEnv(
+            train[:, :2], train[:, 2], num_envs=params["num_envs"], **env_params
+        )
+        if model_path and os.path.exists(model_path):
+            model = PPO.load(model_path, env=train_env)
+        else:
+            model = PPO("MlpPolicy", train_env, verbose=0)
+        model.learn(total_timesteps=params["train_timesteps"])
+    else:
+        model = _load_model(model_path)
+
+    test_env = _test_env(data, window, env_params)
+    metrics = test_env.backtest_vectorized(test_env.predict_actions(model))
+    return {
+        "train_start": train_start,
+        "test_start": train_end,
+        "test_end": test_end,
+        **metrics,
+    }
+
+
+def _test_env(data, window, env_params):
+    """
+    Среда out-of-sample части окна без заглядывания вперёд.
+
+    Признаки нормализуются границами train-части (как у среды обучения),
+    индикаторы test-части досчитываются от train-истории, а не с нуля.
+    """
+    train_start, train_end, test_end = window
+    train = data[train_start:train_end]
+    stats = TradingEnv(train[:, :2], train[:, 2]).normalization_stats()
+    history = data[train_start:test_end]
+    features = TradingEnv(
+        history[:, :2], history[:, 2], normalization=stats
+    )._features[train_end - train_start :]
+    test = data[train_end:test_end]
+    return TradingEnv(test[:, :2], test[:, 2], features=features, **env_params)
+
+
+def _init_worker(data_spec, params, model_path):
+    _worker["data_shm"], _worker["data"] = attach(data_spec)
+    _worker["params"] = params
+    _worker["model_path"] = model_path
+
+
+def _evaluate_in_worker(window):
+    return _evaluate_window(
+        _worker["data"], window, _worker["params"], _worker["model_path"]
+    )
+
+
+def summarize(results):
+    """
+    Сводка стабильности по окнам.
+
+    :param results: Список результатов окон
+    :return: Словарь со средними и разбросом метрик
+    """
+    if not results:
+        return {"num_windows": 0}
+    sharpe = np.array([r["sharpe_ratio"] for r in results])
+    drawdown = np.array([r["max_drawdown"] for r in results])
+    return {
+        "num_windows": len(results),
+        "mean_sharpe": float(sharpe.mean()),
+        "std_sharpe": float(sharpe.std()),
+        "positive_sharpe_share": float(np.mean(sharpe > 0)),
+        "mean_max_drawdown": float(drawdown.mean()),
+        "worst_max_drawdown": float(drawdown.max()),
+    }
+
+
+def run_walk_forward(
+    data,
+    train_size,
+    test_size,
+    step=None,
+    retrain=False,
+    train_timesteps=10000,
+    num_envs=8,
+    model_path="ppo_trading_model.zip",
+    env_params=None,
+    workers=None,
+):
+    """
+    Walk-forward оценка модели на истории.
+
+    :param data: Массив (T, 3): price, volume, sentiment
+    :param train_size: Длина train-части окна
+    :param test_size: Длина test-части окна
+    :param step: Сдвиг между окнами
+    :param retrain: Дообучать PPO на train-части каждого окна
+    :param train_timesteps: Шагов обучения на окно
+    :param num_envs: Эпизодов VecTradingEnv при дообучении
+    :param model_path: Базовая модель (для оценки или как старт дообучения)
+    :param env_params: Параметры TradingEnv (stop_loss, take_profit, hold_penalty, initial_balance)
+    :param workers: Количество процессов (по умолчанию os.cpu_count();
+        в демоническом процессе окна считаются последовательно)
+    :return: Словарь {"windows": [...], "summary": {...}}
+    :raises ValueError: Без retrain, если файла базовой модели нет
+    """
+    if not retrain and not (model_path and os.path.exists(model_path)):
+        raise ValueError(
+            f"Model file not found: {model_path}; publish a model or use retrain=True"
+        )
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    params = {
+        "retrain": retrain,
+        "train_timesteps": train_timesteps,
+        "num_envs": num_envs,
+        "env": env_params or {},
+    }
+    fingerprint = _model_fingerprint(model_path)
+    windows = split_windows(len(data), train_size, test_size, step)
+    keys = [_window_key(data, window, params, fingerprint) for window in windows]
+
+    cached = cache.get_many(keys)
+    pending = [(w, key) for w, key in zip(windows, keys) if key not in cached]
+    logger.info(
+        f"Walk-forward: {len(windows)} windows, {len(windows) - len(pending)} cached"
+    )
+
+    workers = workers or os.cpu_count() or 1
+    daemon = multiprocessing.current_process().daemon
+    if daemon and workers > 1 and len(pending) > 1:
+        logger.warning(
+            f"Walk-forward in a daemonic process: {len(pending)} windows run serially; "
+            "use manage.py walk_forward_backtest for a process pool"
+        )
+    if workers == 1 or len(pending) <= 1 or daemon:
+        computed = [_evaluate_window(data, w, params, model_path) for w, _ in pending]
+    else:
+        data_shm, data_spec = to_shared(data)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                initializer=_init_worker,
+                initargs=(data_spec, params, model_path),
+            ) as pool:
+                computed = list(pool.map(_evaluate_in_worker, [w for w, _ in pending]))
+        finally:
+            release(data_shm)
+
+    results = dict(cached)
+    fresh = {key: result for (_, key), result in zip(pending, computed)}
+    cache.set_many(fresh, timeout=WALK_FORWARD_CACHE_TIMEOUT)
+    results.update(fresh)
+
+    ordered = [results[key] for key in keys]
+    return {"windows": ordered, "summary": summarize(ordered)}
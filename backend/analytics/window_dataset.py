@@ -0,0 +1,132 @@
+"""
+Модуль оконного датасета для обучения LSTM.
+
+Окна look-back не материализуются: матрица признаков (T, C) хранится один раз,
+а окна — это представление numpy.lib.stride_tricks.sliding_window_view
+(N, look_back, C) над ней без копирования. Память — O(T * C) при любом look_back.
+В Keras данные подаются батчами через tf.data-генератор: копируется только
+текущий батч.
+
+Признаки задаются именами: 'close', 'ma_<окно>', 'rsi_<период>'. Первый
+признак — цель предсказания (цена закрытия следующего шага).
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .indicators import rsi, sma
+
+DEFAULT_FEATURES = ("close", "ma_20", "rsi_14")
+
+
+def _feature_column(name, close):
+    kind, _, param = name.partition("_")
+    if kind == "close":
+        return close
+    if kind == "ma":
+        return sma(close, int(param or 20))
+    if kind == "rsi":
+        return rsi(close, int(param or 14))
+    raise ValueError(f"Unknown feature: {name}")
+
+
+def build_features(close, features=DEFAULT_FEATURES):
+    """
+    Матрица признаков по ценам закрытия.
+
+    Точки прогрева индикаторов (NaN в начале ряда) отбрасываются.
+
+    :param close: Массив цен закрытия (T,) или колонки снимка признаков
+        (analytics.feature_cache): готовые колонки берутся как есть
+    :param features: Имена признаков; первый — 'close'
+    :return: Матрица float32 (T - прогрев, C)
+    """
+    columns = close if isinstance(close, Mapping) else {}
+    close = np.asarray(columns.get("close", close), dtype=np.float64).reshape(-1)
+    if not features or features[0] != "close":
+        raise ValueError("First feature must be 'close'")
+    matrix = np.empty((len(close), len(features)), dtype=np.float32)
+    for i, name in enumerate(features):
+        matrix[:, i] = (
+            columns[name] if name in columns else _feature_column(name, close)
+        )
+    valid = ~np.isnan(matrix).any(axis=1)
+    warmup = int(np.argmax(valid)) if valid.any() else len(matrix)
+    return matrix[warmup:]
+
+
+class WindowDataset:
+    """
+    Окна look-back над матрицей признаков без копирования.
+
+    Окно i — строки [i, i + look_back), цель — признак target_column
+    строки i + look_back.
+    """
+
+    def __init__(self, features, look_back=60, target_column=0):
+        """
+        :param features: Матрица признаков (T, C) или ряд (T,)
+        :param look_back: Длина окна
+        :param target_column: Столбец цели
+        """
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features[:, None]
+        if len(features) <= look_back:
+            raise ValueError(
+                f"Series of length {len(features)} is too short for look_back={look_back}"
+            )
+        self.features = features
+        self.look_back = look_back
+        # (N, C, look_back) -> (N, look_back, C), оба — представления features
+        self.windows = sliding_window_view(features[:-1], look_back, axis=0).transpose(
+            0, 2, 1
+        )
+        self.targets = features[look_back:, target_column]
+
+    def __len__(self):
+        return len(self.targets)
+
+    @property
+    def num_features(self):
+        return self.features.shape[1]
+
+    def batches(self, batch_size=32, shuffle=True, seed=None):
+        """
+        Генератор батчей (X, y); копируется только текущий батч.
+
+        :param batch_size: Размер батча
+        :param shuffle: Перемешивать окна
+        :param seed: Seed перемешивания
+        :return: Генератор кортежей (X (B, look_back, C), y (B,))
+        """
+        rng = np.random.default_rng(seed)
+
+        def generate():
+            order = rng.permutation(len(self)) if shuffle else np.arange(len(self))
+            for start in range(0, len(order), batch_size):
+                index = order[start : start + batch_size]
+                if not shuffle:
+                    index = slice(index[0], index[-1] + 1)
+                yield np.ascontiguousarray(self.windows[index]), self.targets[index]
+
+        return generate
+
+    def to_tf_dataset(self, batch_size=32, shuffle=True, seed=None):
+        """
+        tf.data.Dataset батчей для model.fit().
+
+        Генератор вызывается заново на каждой эпохе, поэтому порядок окон
+        перемешивается каждую эпоху.
+        """
+        import tensorflow as tf
+
+        signature = (
+            tf.TensorSpec(shape=(None, self.look_back, self.num_features), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        )
+        return tf.data.Dataset.from_generator(
+            self.batches(batch_size, shuffle, seed), output_signature=signature
+        ).prefetch(tf.data.AUTOTUNE)
@@ -6,14 +6,16 @@
 
 import json
 
+from analytics.consumers import PriceSubscriptionMixin
 from channels.generic.websocket import AsyncWebsocketConsumer
 
 
-class TradingConsumer(AsyncWebsocketConsumer):
+class TradingConsumer(PriceSubscriptionMixin, AsyncWebsocketConsumer):
     """
     WebSocket-консьюмер для трейдинга.
 
-    Обрабатывает соединения, отключения и входящие сообщения. Поддерживает запуск стратегий трейдинга.
+    Обрабатывает соединения, отключения и входящие сообщения. Поддерживает запуск стратегий трейдинга
+    и подписку на тики цен (analytics.price_stream).
     """
 
     async def connect(self):
@@ -29,15 +31,16 @@ class TradingConsumer(AsyncWebsocketConsumer):
         """
         Обрабатывает отключение клиента.
 
-        Не выполняет дополнительных действий.
+        Отписывает канал от тиков цен.
         """
-        pass
+        await self.unsubscribe_prices()
 
     async def receive(self, text_data):
         """
         Обрабатывает входящие сообщения от клиента.
 
-        Если тип сообщения 'start_trading', запускает задачу трейдинга асинхронно и отправляет статус.
+        Если тип сообщения 'start_trading', запускает задачу трейдинга асинхронно и отправляет статус;
+        'subscribe_prices' — подписывает на тики цен символов.
         """
         data = json.loads(text_data)
         if data["type"] == "start_trading":
@@ -45,3 +48,5 @@ class TradingConsumer(AsyncWebsocketConsumer):
 
             run_bot.delay(data["strategy_id"])
             await self.send(text_data=json.dumps({"status": "started"}))
+        elif data["type"] == "subscribe_prices":
+            await self.subscribe_prices(data)
@@ -122,17 +122,21 @@ class Strategy(models.Model):
         """
         Возвращает экземпляр биржи (ccxt) с расшифрованными ключами.
 
+        Клиент берётся из пула процесса (analytics.exchange_pool) по отпечатку
+        зашифрованных ключей; ключи расшифровываются только при создании клиента.
         Если API-ключ не задан, возвращает None.
         """
         if self.api_key:
-            import ccxt
-
-            exchange_class = getattr(ccxt, self.api_key.exchange)
-            return exchange_class(
-                {
-                    "apiKey": self.api_key.get_decrypted_api_key(),
-                    "secret": self.api_key.get_decrypted_secret(),
-                }
+            from analytics.exchange_pool import credential_fingerprint, get_pool
+
+            api_key = self.api_key
+            return get_pool().get(
+                api_key.exchange,
+                credential_fingerprint(api_key.pk, api_key.api_key, api_key.secret),
+                lambda: {
+                    "apiKey": api_key.get_decrypted_api_key(),
+                    "secret": api_key.get_decrypted_secret(),
+                },
             )
         return None
 
@@ -208,7 +212,11 @@ class Trade(models.Model):
         """
         from analytics.tasks import train_model_on_trade
 
-        trade_result = {"profit": self.profit_loss}
+        trade_result = {
+            "profit": self.profit_loss,
+            "symbol": self.symbol,
+            "action": self.action,
+        }
         historical_data = [
             [self.price, self.amount]
         ]  # Упрощённо; расширьте для реальных данных
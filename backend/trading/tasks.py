@@ -2,22 +2,52 @@
 Модуль задач для Celery в приложении трейдинга.
 
 Определяет асинхронные задачи для размещения трейдов (с симуляцией или реальными ордерами),
-а также для запуска стратегий с предсказаниями RL-модели. Включает интеграцию с обучением модели.
+а также для запуска стратегий с предсказаниями RL-модели (по одной или пакетным тиком
+всех активных стратегий). Включает интеграцию с обучением модели.
 """
 
-from analytics.tasks import predict_price, train_model_on_trade
+import logging
+
+import numpy as np
+from analytics.inference import InferenceUnavailable, predict_batch
+from analytics.market_dataset import MarketDataset
+from analytics.metrics import compute_metrics
+from analytics.metrics import win_rate as trade_win_rate
+from analytics.model_registry import make_key
+from analytics.tasks import latest_observation, predict_price, train_model_on_trade
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
 
 from .models import Strategy, Trade
 
+logger = logging.getLogger(__name__)
+
+# Действие модели -> позиция, которую оно открывает
+ACTION_POSITIONS = {1: "long", 2: "short"}
+# Timestamp свечи, по которой стратегия уже действовала на таймфрейме
+TICK_CANDLE_KEY = "strategy_tick:{strategy_id}:{timeframe}"
+
+
+def last_trade_action(strategy_id):
+    """Действие последней сделки стратегии ('long' / 'short') или None."""
+    return (
+        Trade.objects.filter(strategy_id=strategy_id)
+        .order_by("-timestamp")
+        .values_list("action", flat=True)
+        .first()
+    )
+
 
 @shared_task
 def place_trade(action, strategy_id):
     """
     Размещает трейд на основе действия и ID стратегии.
 
-    В режиме демо симулирует трейд с фиктивной ценой. В реальном режиме создаёт ордер
+    Действие в сторону уже открытой позиции (по последней сделке стратегии)
+    пропускается. В режиме демо симулирует трейд по последней цене символа из потока цен
+    (analytics.price_stream). В реальном режиме создаёт ордер
     на бирже через ccxt. После размещения трейда запускает асинхронное обучение RL-модели
     с результатами, историческими данными и новостями.
 
@@ -29,9 +59,17 @@ def place_trade(action, strategy_id):
     - str: Сообщение о размещённом трейде или "Hold".
     """
     strategy = Strategy.objects.get(id=strategy_id)
+    # Позиция уже открыта в эту сторону — повторный ордер не нужен
+    if ACTION_POSITIONS.get(action, "hold") in ("hold", last_trade_action(strategy_id)):
+        return "Hold"
     if settings.DEMO_MODE:
-        # Симуляция трейда
-        price = 50000  # Фиктивная цена
+        # Симуляция трейда по текущей цене
+        from analytics.price_stream import current_price
+
+        exchange = strategy.api_key.exchange if strategy.api_key else "binance"
+        price = current_price(strategy.symbol, exchange)
+        if price is None:
+            return f"Error: no price for {strategy.symbol}"
         trade = Trade.objects.create(
             strategy=strategy,
             action="long" if action == 1 else "short",
@@ -54,7 +92,9 @@ def place_trade(action, strategy_id):
 
     # Обучение модели после размещения трейда
     trade_result = {
-        "profit": trade.price * 0.01 if trade.action == "short" else -trade.price * 0.01
+        "profit": trade.price * 0.01 if trade.action == "short" else -trade.price * 0.01,
+        "symbol": strategy.symbol,
+        "action": trade.action,
     }
     historical_data = [[trade.price, 1000]]
     news_data = ["Market news"]
@@ -67,7 +107,8 @@ def run_bot(strategy_id):
     """
     Запускает стратегию с предсказанием RL-модели.
 
-    Получает предсказание действия от RL-модели и асинхронно размещает трейд.
+    Получает предсказание действия от RL-модели (через сервис пакетного
+    инференса, без ожидания Celery-задачи) и асинхронно размещает трейд.
 
     Параметры:
     - strategy_id (int): ID стратегии.
@@ -75,11 +116,121 @@ def run_bot(strategy_id):
     Возвращает:
     - str: Сообщение о запуске бота.
     """
-    action = predict_price.delay().get()
+    strategy = Strategy.objects.get(id=strategy_id)
+    # Без Celery-обхода: запрос уходит напрямую в сервис пакетного инференса;
+    # при недоступном сервисе тик пропускается, модель в процесс бота не грузится
+    try:
+        action = predict_price(
+            strategy.symbol, strategy=strategy_id, local_fallback=False
+        )
+    except InferenceUnavailable as e:
+        logger.warning(f"Bot run skipped for strategy {strategy_id}: {e}")
+        return f"Error: {e}"
     place_trade.delay(action, strategy_id)
     return "Bot run with RL prediction"
 
 
+@shared_task
+def tick_strategies(timeframe="1h"):
+    """
+    Периодический тик всех активных стратегий за один проход.
+
+    Вместо run_bot на каждую стратегию: один запрос к БД за активными
+    стратегиями, одно наблюдение на символ (из MarketDataset), матрица
+    наблюдений всех стратегий и один forward pass на модель
+    (analytics.inference.predict_batch). В очередь ставятся только
+    ордера с действием, отличным от hold и от текущей позиции стратегии.
+
+    Beat запускает тик чаще, чем закрываются свечи таймфрейма, поэтому
+    стратегия действует один раз на свечу: timestamp последней свечи,
+    по которой она действовала, хранится в кэше (TICK_CANDLE_KEY), и пока
+    новая свеча не появилась, стратегия пропускается.
+
+    Параметры:
+    - timeframe (str): Временной интервал признаков и моделей.
+
+    Возвращает:
+    - dict: Количество стратегий, отправленных ордеров, пропущенных стратегий
+      и стратегий, ожидающих новую свечу.
+    """
+    last_action = Trade.objects.filter(strategy=OuterRef("pk")).order_by("-timestamp")
+    strategies = list(
+        Strategy.objects.filter(is_active=True)
+        .annotate(position=Subquery(last_action.values("action")[:1]))
+        .values_list("id", "symbol", "api_key__exchange", "position")
+    )
+    if not strategies:
+        return {"strategies": 0, "orders": 0, "skipped": 0, "waiting": 0}
+
+    # Признаки рынка и последняя свеча общие для всех стратегий одного символа
+    observations, candles = {}, {}
+    for _, symbol, exchange, _ in strategies:
+        source = (symbol, exchange or "binance")
+        if source in observations:
+            continue
+        try:
+            candles[source] = MarketDataset(symbol, timeframe, source[1]).last_timestamp()
+            observations[source] = latest_observation(symbol, timeframe, source[1])
+        except Exception as e:
+            logger.warning(f"No features for {symbol} on {source[1]}: {e}")
+            observations[source] = None
+
+    acted = cache.get_many(
+        [
+            TICK_CANDLE_KEY.format(strategy_id=strategy_id, timeframe=timeframe)
+            for strategy_id, *_ in strategies
+        ]
+    )
+    ready, waiting = [], 0
+    for strategy_id, symbol, exchange, position in strategies:
+        source = (symbol, exchange or "binance")
+        if observations[source] is None:
+            continue
+        key = TICK_CANDLE_KEY.format(strategy_id=strategy_id, timeframe=timeframe)
+        if acted.get(key) == candles[source]:
+            waiting += 1
+            continue
+        ready.append((strategy_id, symbol, position, key, candles[source], observations[source]))
+    if not ready:
+        return {
+            "strategies": len(strategies),
+            "orders": 0,
+            "skipped": len(strategies) - waiting,
+            "waiting": waiting,
+        }
+
+    matrix = np.stack([row[-1] for row in ready])
+    keys = [make_key(symbol, timeframe, strategy_id) for strategy_id, symbol, *_ in ready]
+    actions, errors = predict_batch(matrix, keys)
+
+    orders = 0
+    for (strategy_id, _, position, _, _, _), action in zip(ready, actions):
+        action = int(action)
+        if action in ACTION_POSITIONS and ACTION_POSITIONS[action] != position:
+            place_trade.delay(action, strategy_id)
+            orders += 1
+    # Свеча отмечается и для hold: следующее решение — на следующей свече
+    cache.set_many(
+        {
+            key: candle
+            for row, (_, _, _, key, candle, _) in enumerate(ready)
+            if row not in errors
+        },
+        timeout=None,
+    )
+
+    skipped = len(strategies) - waiting - len(ready) + len(errors)
+    logger.info(
+        f"Strategy tick: {len(strategies)} strategies, {orders} orders, {skipped} skipped"
+    )
+    return {
+        "strategies": len(strategies),
+        "orders": orders,
+        "skipped": skipped,
+        "waiting": waiting,
+    }
+
+
 @shared_task
 def calculate_metrics(strategy_id):
     """
@@ -90,10 +241,11 @@ def calculate_metrics(strategy_id):
     - win_rate: Процент выигрышных сделок (предполагаем, что profit > 0 — выигрыш).
     - total_profit: Общая прибыль/убыток.
     - avg_profit: Средняя прибыль на сделку.
+    - sharpe_ratio, sortino_ratio, max_drawdown, var_95, cvar_95: риск-метрики
+      по доходностям сделок (analytics.metrics), без годовой нормировки.
 
     В демо-режиме использует симулированные прибыли (на основе цены).
-    В реальном режиме — предполагает, что в модели Trade есть поле 'profit'
-    (если нет, добавьте его в модель или доработайте расчёт).
+    В реальном режиме — берёт реализованный P&L из поля Trade.profit_loss.
 
     Если стратегия не найдена, возвращает ошибку.
 
@@ -110,39 +262,48 @@ def calculate_metrics(strategy_id):
         if not trades.exists():
             return {"error": "No trades found for this strategy."}
 
-        total_trades = trades.count()
-        profits = []
-
-        for trade in trades:
-            if settings.DEMO_MODE:
-                # Симуляция прибыли: для long +1% от цены, для short -1% (упрощённо; доработайте по логике)
-                if trade.action == "long":
-                    profit = trade.price * trade.amount * 0.01  # +1% прибыль
-                elif trade.action == "short":
-                    profit = (
-                        -trade.price * trade.amount * 0.01
-                    )  # -1% убыток (или инвертируйте)
-                else:
-                    profit = 0
-                # Если в модели нет поля profit, сохраните его здесь: trade.profit = profit; trade.save()
-            else:
-                # В реальном режиме: используйте реальный profit из ордера или модели
-                profit = getattr(
-                    trade, "profit", 0
-                )  # Предполагаем поле 'profit' в модели Trade
-
-            profits.append(profit)
-
-        wins = sum(1 for p in profits if p > 0)
-        total_profit = sum(profits)
+        # Один запрос; дальше все расчёты — массивами NumPy
+        records = list(
+            trades.order_by("timestamp").values_list(
+                "action", "price", "amount", "profit_loss"
+            )
+        )
+        actions = np.array([record[0] for record in records])
+        rows = np.array([record[1:] for record in records], dtype=np.float64)
+        total_trades = len(rows)
+
+        if settings.DEMO_MODE:
+            # Симуляция прибыли: для long +1% от цены, для short -1% (упрощённо; доработайте по логике)
+            direction = np.select(
+                [actions == "long", actions == "short"], [1.0, -1.0], 0.0
+            )
+            profits = rows[:, 0] * rows[:, 1] * 0.01 * direction
+        else:
+            # В реальном режиме: реализованный P&L сделки из модели Trade
+            profits = rows[:, 2]
+
+        total_profit = float(profits.sum())
         avg_profit = total_profit / total_trades if total_trades > 0 else 0
-        win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
+        # Доля выигрышных сделок среди всех сделок (включая нулевые)
+        win_rate = trade_win_rate(profits, ignore_zero=False) * 100
+
+        # Доходность сделки относительно её объёма; метрики по сделкам, без годовой нормировки
+        notional = rows[:, 0] * rows[:, 1]
+        trade_returns = np.divide(
+            profits, notional, out=np.zeros(total_trades), where=notional > 0
+        )
+        risk = compute_metrics(returns=trade_returns, periods_per_year=1)
 
         return {
             "total_trades": total_trades,
             "win_rate": round(win_rate, 2),
             "total_profit": round(total_profit, 2),
             "avg_profit": round(avg_profit, 2),
+            "sharpe_ratio": round(risk["sharpe_ratio"], 4),
+            "sortino_ratio": round(risk["sortino_ratio"], 4),
+            "max_drawdown": round(risk["max_drawdown"], 4),
+            "var_95": round(risk["var"], 4),
+            "cvar_95": round(risk["cvar"], 4),
             "strategy_name": strategy.name,  # Дополнительно, для удобства
         }
 